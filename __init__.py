@@ -11,20 +11,44 @@ bl_info = {
     "location": "View3D > Extended Tools > AutoGrip",
     "description": "Automatically poses hand rigs",
     "category": '3D View'}
-if "bpy" in locals():
-    import imp
-    imp.reload(handrig)
+
+# Nothing gets imported here until Blender registers the add-on, so the bpy-free
+# core package (rig definitions, geometry, solvers) can be imported on its own
+# in a plain Python process.
+
+if "handrig" in locals():
+    # Reload Scripts: every submodule that's been loaded, each one after the
+    # ones it imports from
+    import importlib
+    import sys
+    for name in ("core.geometry", "core.rigs", "core.hand", "core.contact", "core.grasp",
+                 "core.schedule", "core.keys", "core.canonical", "core.cache", "core.stream",
+                 "core", "handrig", "api", "regress", "headless"):
+        if __name__ + "." + name in sys.modules:
+            importlib.reload(sys.modules[__name__ + "." + name])
     print("Reloaded Autogrip")
-else:
-    from . import handrig
-    print("Imported Autogrip") 
+
+
+# The scripting API in api.py, straight off the package (autogrip.setup(...)
+# and so on). Imported on first use, like everything else here.
+api_names = ("setup", "target", "bake", "sync", "reset", "retarget", "export_stream")
+
+
+def __getattr__(name):
+    if name in api_names:
+        from . import api
+        return getattr(api, name)
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
 
 
 def register():
+    from . import handrig
     handrig.register()
+    print("Imported Autogrip")
 
     
 def unregister():
+    from . import handrig
     handrig.unregister()
 
     
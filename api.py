@@ -0,0 +1,174 @@
+# Scripting API: the same setup, target, bake and reset the panel does, but on
+# the objects you pass in instead of whatever's active or selected, so pipeline
+# tools can drive AutoGrip from a background Blender without juggling the
+# selection or going through operators. The add-on has to be registered.
+#
+#   import autogrip
+#   autogrip.setup(rig, "LR", rig_type='RFY')
+#   autogrip.target(rig, 'R', prop)
+#   autogrip.bake(rig, 'R', 1, 120)
+#   autogrip.export_stream(rig, "//grip.agps")
+#   autogrip.reset(rig)
+#
+# Sides are 'L' and 'R' (either case, on any rig type). None of this goes
+# through the light undo log; scripts manage their own undo, if any.
+
+import contextlib
+
+import bpy
+
+from . import handrig
+
+
+@contextlib.contextmanager
+def armature_context(armature):
+
+    # Points AutoGrip at armature and makes it the view layer's active object in
+    # object mode, which the steps that go through edit mode need. Puts the
+    # active object and its mode back afterwards.
+
+    if armature is None or armature.type != 'ARMATURE':
+        raise ValueError("AutoGrip needs an armature object, got " + repr(armature))
+
+    view_layer = bpy.context.view_layer
+    previous = view_layer.objects.active
+    mode = armature.mode
+    view_layer.objects.active = armature
+    handrig.use_armature(armature)
+    try:
+        with bpy.context.temp_override(active_object=armature, object=armature):
+            if mode != 'OBJECT':
+                bpy.ops.object.mode_set(mode='OBJECT')
+            yield armature
+            if mode != 'OBJECT' and armature.mode != mode:
+                bpy.ops.object.mode_set(mode=mode)
+    finally:
+        view_layer.objects.active = previous
+
+
+def hand_sides(sides):
+    return [side for side in "LR" if side in sides.upper()]
+
+
+def setup(armature, sides="LR", rig_type=None):
+
+    # Sets up each hand in sides that isn't already. rig_type ('MHX', 'RFY' or
+    # 'ARP') sets the armature's rig type first; otherwise whatever it's set to
+    # is used. Returns the sides that were set up.
+
+    if rig_type is not None:
+        armature.global_rig_choice = rig_type
+
+    done = []
+    with armature_context(armature):
+        for side in hand_sides(sides):
+            if armature.data.get(handrig.prefix + 'hand_' + side):
+                continue
+            handrig.setup_hand(handrig.find_hand_root(side))
+            armature.data[handrig.prefix + 'hand_' + side] = True
+            done.append(side)
+    handrig.invalidate_panel()
+    return done
+
+
+def target(armature, side, mesh, proxy=None):
+
+    # Points one hand's shrinkwraps at mesh. With proxy on (or left as None and
+    # the armature's "Use Grip Proxy" ticked) they get its low poly stand-in
+    # instead. Returns the object the hand ended up gripping.
+
+    if mesh is None or mesh.type != 'MESH':
+        raise ValueError("Grip targets have to be mesh objects, got " + repr(mesh))
+
+    with armature_context(armature):
+        if proxy is None:
+            proxy = armature.autogrip_use_proxy
+        if proxy:
+            mesh = handrig.grip_proxy(mesh)
+        for finger in handrig.assemble_hand(handrig.find_hand_root(side)):
+            finger.reconstruct()
+            finger.target_shrinkwraps(mesh)
+    handrig.invalidate_panel()
+    return mesh
+
+
+def bake(armature, side, frame_start=None, frame_end=None, target=None, warm=True,
+         self_collision=True, key_tolerance=0.005, mute_constraints=True):
+
+    # Solves and keys one hand's grip over a frame range (the scene's, by
+    # default), like "Bake Grip". target defaults to whatever the hand is
+    # gripping, or its target schedule. key_tolerance None keys every frame.
+
+    scene = bpy.context.scene
+    if frame_start is None:
+        frame_start = scene.frame_start
+    if frame_end is None:
+        frame_end = scene.frame_end
+
+    with armature_context(armature):
+        handroot = handrig.find_hand_root(side)
+        fingers = handrig.assemble_hand(handroot)
+        for f in fingers:
+            f.reconstruct()
+        if target is None:
+            target = handrig.hand_target(fingers)
+        if target is None and not len(handrig.hand_schedule(side.upper())):
+            raise ValueError("The " + side.upper() + " hand of " + armature.name +
+                             " has no grip target or schedule to bake against")
+
+        solver = handrig.bake_grip(handroot, target, frame_start, frame_end, warm,
+                                   self_collision=self_collision, key_tolerance=key_tolerance)
+        if not mute_constraints:
+            handrig.mute_grip_constraints(solver.fingers, False)
+
+
+def sync(armature, sides="LR"):
+
+    # Repairs each hand in sides that's been set up, like "Sync Setup".
+    # Returns how many fingers needed fixing.
+
+    fixed = 0
+    with armature_context(armature):
+        for side in hand_sides(sides):
+            if armature.data.get(handrig.prefix + 'hand_' + side):
+                fixed += handrig.sync_hand(handrig.find_hand_root(side))
+    handrig.invalidate_panel()
+    return fixed
+
+
+def reset(armature, sides="LR"):
+
+    # Takes AutoGrip off each hand in sides, like "Reset Hand"
+
+    with armature_context(armature):
+        for side in hand_sides(sides):
+            handrig.reset_hand(handrig.find_hand_root(side))
+            armature.data[handrig.prefix + 'hand_' + side] = False
+
+
+def retarget(source, target, frame_start=None, frame_end=None, key_tolerance=0.005):
+
+    # Copies both hands' grip from source onto target, whatever rig each is,
+    # keyed over the frame range. With frame_start None it only poses the
+    # current frame. Returns the number of keys written.
+
+    frames = None
+    if frame_start is not None:
+        scene = bpy.context.scene
+        frames = range(frame_start, (scene.frame_end if frame_end is None else frame_end) + 1)
+    return handrig.retarget_grip(source, target, frames, key_tolerance)
+
+
+def export_stream(armature, path, frame_start=None, frame_end=None):
+
+    # Writes both hands' rotations over the frame range (the scene's, by
+    # default) to a binary pose stream at path, for tools outside Blender to
+    # read with autogrip.core.stream.read_stream. Returns the frames written.
+
+    scene = bpy.context.scene
+    if frame_start is None:
+        frame_start = scene.frame_start
+    if frame_end is None:
+        frame_end = scene.frame_end
+    with armature_context(armature):
+        return handrig.export_grip_stream(armature, path, frame_start, frame_end)
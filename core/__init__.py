@@ -0,0 +1,41 @@
+# The bpy-free half of AutoGrip: rig definitions and finger planning (rigs),
+# the array-backed hand model (hand), bone geometry (geometry), the NumPy
+# contact and grasp solvers (contact, grasp), grip target schedules
+# (schedule), baked key reduction (keys), the rig independent hand
+# (canonical), the live solve cache (cache) and binary pose streams (stream).
+# handrig.py is the Blender side that reads armatures into these and writes
+# the results back.
+#
+# None of this imports bpy or mathutils, so it runs in a plain Python process
+# for testing and benchmarking. Submodules are only imported the first time
+# they're used, so registering the add-on doesn't pay for NumPy up front.
+
+import importlib
+import importlib.util
+import sys
+
+submodules = ("rigs", "hand", "geometry", "contact", "grasp", "schedule", "keys", "canonical",
+              "cache", "stream")
+
+
+def __getattr__(name):
+    if name in submodules:
+        return importlib.import_module(__name__ + "." + name)
+    raise AttributeError("module " + repr(__name__) + " has no attribute " + repr(name))
+
+
+def lazy_import(name):
+
+    # A module that only really gets imported when something on it is first
+    # used. Returns the real one straight away if it's already been imported.
+
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,59 @@
+# Playback cache for live grip solves. Scrubbing back and forth over a shot
+# asks for the same answers again and again, so solves are kept by a hash of
+# everything that went into them. A frame that comes round again with the same
+# inputs gets its answer back without touching the prop's grid. The cache is
+# bounded, and the least recently used answers are dropped first.
+
+import collections
+import hashlib
+
+import numpy as np
+
+
+def input_key(*parts, decimals=6):
+
+    # A hash of arrays and plain values. Arrays are rounded first, so the float
+    # noise from evaluating the same pose twice doesn't count as a change.
+
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, (str, bytes, int, bool)) or part is None:
+            digest.update(repr(part).encode())
+        else:
+            values = np.round(np.asarray(part, dtype=np.float64), decimals) + 0.0
+            digest.update(str(values.shape).encode())
+            digest.update(values.tobytes())
+        digest.update(b'|')
+    return digest.digest()
+
+
+class SolveCache:
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,173 @@
+# Rig independent hand poses. Every rig AutoGrip knows has the same five
+# fingers under different bone names, axes and thumb settings, so a grip is
+# stored as a curl and a spread angle for each finger and joint, and a mapping
+# table per rig type and side turns that into (and out of) bone rotations.
+# Going from one rig to another is then a single array operation each way,
+# with no re-solving.
+
+import numpy as np
+
+from . import geometry
+from . import rigs
+
+
+# Canonical finger order, and how many joints each finger gets. Thumbs only
+# use the first two: the bone before them is the palm in every rig.
+fingers = ('thumb', 'index', 'middle', 'ring', 'pinky')
+joints = 3
+
+
+def canonical_finger(phalange_name):
+
+    # Which canonical finger a phalange belongs to, by name, or -1
+
+    name = phalange_name.lower()
+    for i, finger in enumerate(fingers):
+        if finger in name:
+            return i
+    return -1
+
+
+def quaternion_log(quaternions):
+
+    # Rotation vectors (axis times angle) for (..., 4) w-first quaternions
+
+    quaternions = np.asarray(quaternions, dtype=np.float64)
+    quaternions = quaternions * np.where(quaternions[..., :1] < 0.0, -1.0, 1.0)
+    vectors = quaternions[..., 1:]
+    sin = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    angle = 2.0 * np.arctan2(sin, quaternions[..., :1])
+    return vectors * np.where(sin > 1e-12, angle / np.where(sin > 1e-12, sin, 1.0), 2.0)
+
+
+def quaternion_exp(vectors):
+
+    # w-first quaternions for (..., 3) rotation vectors
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    angle = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    half = angle * 0.5
+    scale = np.where(angle > 1e-12, np.sin(half) / np.where(angle > 1e-12, angle, 1.0), 0.5)
+    return np.concatenate((np.cos(half), vectors * scale), axis=-1)
+
+
+class RigMapping:
+
+    # One side of one rig type laid out against the canonical hand. rows[f, j]
+    # is the phalange (in plan order, see phalange_names) for canonical finger
+    # f, joint j, or -1 where the rig doesn't have one. curl_axes and
+    # spread_axes are each phalange's bend and sideways axes in its own local
+    # space, straight from the rig definition's finger axis and thumb offset.
+
+    __slots__ = ('rig', 'side', 'phalange_names', 'rows', 'curl_axes', 'spread_axes')
+
+    def __init__(self, rig, side):
+        self.rig = rig
+        self.side = side
+        plans = rigs.plan_hand(rig, side)
+        self.phalange_names = tuple(name for p in plans for name in p.phalanges)
+        self.rows = np.full((len(fingers), joints), -1, dtype=np.int32)
+
+        grip = []
+        row = 0
+        for p in plans:
+            finger = canonical_finger(p.phalanges[0])
+            column, sign = geometry.axis_columns[p.axis]
+            direction = np.zeros(3)
+            direction[column] = sign
+            for j in range(len(p.phalanges)):
+                if finger >= 0 and j < joints:
+                    self.rows[finger, j] = row
+                grip.append(geometry.rodrigues(direction, (0.0, 1.0, 0.0), p.offset))
+                row += 1
+
+        # Same axes handrig's grip solver bends around: the one that turns the
+        # bone's Y toward its grip side. Spreading turns around the grip side.
+        self.spread_axes = geometry.normalized(np.array(grip).reshape(-1, 3))
+        self.curl_axes = geometry.normalized(np.cross((0.0, 1.0, 0.0), self.spread_axes))
+
+    def __len__(self):
+        return len(self.phalange_names)
+
+    def to_canonical(self, quaternions):
+
+        # Curl and spread, (..., fingers, joints) each, from (..., phalanges, 4)
+        # local rotations in phalange order. Joints the rig doesn't have are 0.
+
+        vectors = quaternion_log(quaternions)
+        curl = np.sum(vectors * self.curl_axes, axis=-1)
+        spread = np.sum(vectors * self.spread_axes, axis=-1)
+
+        present = self.rows >= 0
+        rows = np.where(present, self.rows, 0)
+        return (np.where(present, curl[..., rows], 0.0),
+                np.where(present, spread[..., rows], 0.0))
+
+    def from_canonical(self, curl, spread):
+
+        # (..., phalanges, 4) local rotations from canonical curl and spread.
+        # Phalanges with no canonical joint are left at rest.
+
+        curl = np.asarray(curl, dtype=np.float64)
+        spread = np.asarray(spread, dtype=np.float64)
+        leading = np.broadcast_shapes(curl.shape, spread.shape)[:-2]
+
+        present = self.rows >= 0
+        phalange_curl = np.zeros(leading + (len(self),))
+        phalange_spread = np.zeros(leading + (len(self),))
+        phalange_curl[..., self.rows[present]] = np.broadcast_to(curl, leading + self.rows.shape)[..., present]
+        phalange_spread[..., self.rows[present]] = np.broadcast_to(spread, leading + self.rows.shape)[..., present]
+
+        vectors = phalange_curl[..., None] * self.curl_axes + phalange_spread[..., None] * self.spread_axes
+        return quaternion_exp(vectors)
+
+
+# Mappings are worked out once per rig type and side, on first use
+mappings = {}
+
+
+def mapping(rig, side):
+    key = (rig, side)
+    if key not in mappings:
+        mappings[key] = RigMapping(rig, side)
+    return mappings[key]
+
+
+def retarget(quaternions, source, target):
+
+    # Local rotations from one RigMapping's phalanges onto another's, through
+    # the canonical hand. Works on one pose or a whole bake, (..., phalanges, 4).
+
+    return target.from_canonical(*source.to_canonical(quaternions))
+
+
+class CanonicalPose:
+
+    # A grip in canonical form: curl and spread (frames, fingers, joints) in
+    # radians, the frames they were taken on, and which joints were there to
+    # be read. Rig independent, so it can be kept and put on any rig later.
+
+    __slots__ = ('frames', 'curl', 'spread', 'mask')
+
+    def __init__(self, frames, curl, spread, mask):
+        self.frames = np.asarray(frames, dtype=np.int32)
+        self.curl = np.asarray(curl, dtype=np.float32).reshape(len(self.frames), len(fingers), joints)
+        self.spread = np.asarray(spread, dtype=np.float32).reshape(len(self.frames), len(fingers), joints)
+        self.mask = np.asarray(mask, dtype=bool).reshape(len(fingers), joints)
+
+    @classmethod
+    def read(cls, mapping, frames, quaternions):
+
+        # From (frames, phalanges, 4) local rotations on mapping's rig
+
+        curl, spread = mapping.to_canonical(quaternions)
+        return cls(frames, curl, spread, mapping.rows >= 0)
+
+    def __len__(self):
+        return len(self.frames)
+
+    def rotations(self, mapping):
+
+        # (frames, phalanges, 4) local rotations on mapping's rig
+
+        return mapping.from_canonical(self.curl, self.spread)
@@ -0,0 +1,766 @@
+# Batched contact solver for AutoGrip.
+#
+# Nothing in here touches bpy or mathutils, so it runs the same inside Blender,
+# on worker threads, and in a plain Python shell. Everything works on
+# NumPy arrays: the prop is a cloud of world-space vertices with normals, and the
+# hand is a set of finger chains in the hand root's local space.
+
+import concurrent.futures
+import os
+
+import numpy as np
+
+from .geometry import normalized, rodrigues, segment_distance
+
+
+# All 27 cells around (and including) a query cell
+neighbour_offsets = np.array([(i, j, k) for i in (-1, 0, 1)
+                              for j in (-1, 0, 1)
+                              for k in (-1, 0, 1)], dtype=np.int64)
+
+
+class SurfaceGrid:
+
+    # Spatial hash over a prop's vertices. Lookups only search the 27 cells around
+    # each query point, so cell_size is also the furthest a point can be from the
+    # surface and still get an answer; anything further away comes back as inf.
+    #
+    # Dense props get thinned out to one vertex per `resolution` sized voxel first,
+    # so a 2M vertex hero prop doesn't put thousands of vertices in every cell.
+    # resolution=0 keeps every vertex, for measuring rather than solving.
+
+    def __init__(self, verts, normals, cell_size=None, resolution=None, chunk=65536):
+        verts = np.asarray(verts, dtype=np.float32).reshape(-1, 3)
+        normals = np.asarray(normals, dtype=np.float32).reshape(-1, 3)
+        self.chunk = chunk
+
+        count = len(verts)
+        if count == 0:
+            raise ValueError("Can't build a contact grid on a mesh with no vertices")
+
+        low = verts.min(axis=0).astype(np.float64)
+        high = verts.max(axis=0).astype(np.float64)
+        extent = float((high - low).max())
+
+        if cell_size is None:
+            # Roughly a handful of vertices per occupied cell on a surface mesh
+            cell_size = extent / max(count ** (1.0 / 3.0), 1.0)
+        self.cell_size = max(float(cell_size), extent * 1e-4, 1e-6)
+        self.reach = self.cell_size
+
+        if resolution is None:
+            resolution = self.cell_size / 2.0
+        if resolution > 0.0:
+            voxels = np.floor((verts - low) / resolution).astype(np.int64)
+            voxel_dims = voxels.max(axis=0) + 1
+            voxel_keys = (voxels[:, 0] * voxel_dims[1] + voxels[:, 1]) * voxel_dims[2] + voxels[:, 2]
+            keep = np.sort(np.unique(voxel_keys, return_index=True)[1])
+        else:
+            keep = np.arange(count)
+
+        self.source_index = keep
+        self.verts = np.ascontiguousarray(verts[keep])
+        self.normals = np.ascontiguousarray(normals[keep])
+
+        # One cell of padding on every side so neighbour lookups never wrap around
+        self.origin = low - self.cell_size
+        self.dims = np.floor((high - self.origin) / self.cell_size).astype(np.int64) + 2
+
+        keys = self.cell_keys(self.cell_coords(self.verts))
+        self.order = np.argsort(keys, kind='stable')
+        self.keys, self.starts, self.counts = np.unique(keys[self.order],
+                                                        return_index=True, return_counts=True)
+
+    def cell_coords(self, points):
+        return np.floor((np.asarray(points, dtype=np.float64) - self.origin)
+                        / self.cell_size).astype(np.int64)
+
+    def cell_keys(self, coords):
+        return (coords[..., 0] * self.dims[1] + coords[..., 1]) * self.dims[2] + coords[..., 2]
+
+    def nearest(self, points):
+
+        # Nearest vertex for every point. Returns (index, distance); index is -1
+        # where nothing is within reach. Indices are into self.verts, which is the
+        # thinned out set; self.source_index maps them back to the original mesh.
+
+        points = np.asarray(points, dtype=np.float64)
+        shape = points.shape[:-1]
+        flat = points.reshape(-1, 3)
+
+        index = np.full(len(flat), -1, dtype=np.int64)
+        distance = np.full(len(flat), np.inf)
+
+        for start in range(0, len(flat), self.chunk):
+            block = flat[start:start + self.chunk]
+            i, d = self._nearest_block(block)
+            index[start:start + len(block)] = i
+            distance[start:start + len(block)] = d
+
+        return index.reshape(shape), distance.reshape(shape)
+
+    def _nearest_block(self, points):
+        count = len(points)
+        coords = self.cell_coords(points)
+
+        # (points, 27) neighbour cells, dropping any that fall off the grid
+        cells = coords[:, None, :] + neighbour_offsets[None, :, :]
+        inside = np.all((cells >= 0) & (cells < self.dims), axis=-1)
+        keys = self.cell_keys(cells)
+
+        slot = np.searchsorted(self.keys, keys)
+        slot = np.minimum(slot, len(self.keys) - 1)
+        found = inside & (self.keys[slot] == keys)
+
+        counts = np.where(found, self.counts[slot], 0).ravel()
+        starts = np.where(found, self.starts[slot], 0).ravel()
+
+        total = int(counts.sum())
+        index = np.full(count, -1, dtype=np.int64)
+        distance = np.full(count, np.inf)
+        if total == 0:
+            return index, distance
+
+        # Flatten every (point, candidate vertex) pair into one long list
+        owner = np.repeat(np.repeat(np.arange(count), 27), counts)
+        within = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+        candidate = self.order[np.repeat(starts, counts) + within]
+
+        offset = points.astype(np.float32)[owner] - self.verts[candidate]
+        d2 = np.einsum('ij,ij->i', offset, offset)
+
+        # owner comes out sorted, so each point's candidates are one contiguous run
+        per_point = np.bincount(owner, minlength=count)
+        owners = np.flatnonzero(per_point)
+        run_starts = np.cumsum(per_point) - per_point
+        best = np.minimum.reduceat(d2, run_starts[owners])
+
+        is_best = np.flatnonzero(d2 == np.repeat(best, per_point[owners]))
+        first = np.unique(owner[is_best], return_index=True)[1]
+        winners = is_best[first]
+
+        index[owner[winners]] = candidate[winners]
+        distance[owner[winners]] = np.sqrt(d2[winners])
+        return index, distance
+
+    def signed_distance(self, points):
+
+        # Distance from each point to the surface, negative when the point is
+        # behind the surface (inside the prop), and inf when out of reach. Uses the
+        # tangent plane at the nearest vertex, which is close enough to the real
+        # thing on anything but a very coarse prop.
+
+        points = np.asarray(points, dtype=np.float64)
+        index, distance = self.nearest(points)
+        hit = index >= 0
+
+        safe = np.where(hit, index, 0)
+        plane = np.sum((points - self.verts[safe]) * self.normals[safe], axis=-1)
+        return np.where(hit, plane, np.inf)
+
+
+class HandProbe:
+
+    # Rest-pose finger geometry for one hand, in the hand root's local space.
+    # Every array is padded out to the longest finger; mask says which joints are real.
+    #   heads, tails, grip: (fingers, joints, 3)
+    #   radius, mask: (fingers, joints)
+    #   palm: (points, 3) extra points on the palm that should never sink into the prop
+
+    def __init__(self, names, heads, tails, grip, radius, mask, palm):
+        self.names = list(names)
+        self.heads = np.asarray(heads, dtype=np.float64)
+        self.tails = np.asarray(tails, dtype=np.float64)
+        self.grip = normalized(np.asarray(grip, dtype=np.float64))
+        self.radius = np.asarray(radius, dtype=np.float64)
+        self.mask = np.asarray(mask, dtype=bool)
+        self.palm = np.asarray(palm, dtype=np.float64).reshape(-1, 3)
+
+        # Curling rotates each bone's Y axis toward its grip side
+        direction = normalized(self.tails - self.heads)
+        self.bend = normalized(np.cross(direction, self.grip))
+
+    def curl(self, angles):
+
+        # Forward kinematics for every finger at every curl angle at once, with each
+        # joint bent by the same amount the way the control drivers do it.
+        # angles is (steps,) for the whole hand or (steps, fingers) for each finger.
+        # Returns sample points (steps, fingers, joints * 3, 3) along each phalange.
+
+        fingers, joints = self.mask.shape
+        angles = np.asarray(angles, dtype=np.float64)
+        if angles.ndim == 1:
+            angles = angles[:, None]
+        steps = len(angles)
+        angles = np.broadcast_to(angles, (steps, fingers))
+
+        heads = np.broadcast_to(self.heads, (steps, fingers, joints, 3)).copy()
+        tails = np.broadcast_to(self.tails, (steps, fingers, joints, 3)).copy()
+        bend = np.broadcast_to(self.bend, (steps, fingers, joints, 3)).copy()
+
+        for j in range(joints):
+            # Bend joint j and carry everything further down the finger along with it
+            theta = np.where(self.mask[None, :, j], angles, 0.0)
+            pivot = heads[:, :, j, None, :]
+            axis = bend[:, :, j, None, :]
+            t = theta[:, :, None]
+
+            heads[:, :, j:] = pivot + rodrigues(heads[:, :, j:] - pivot, axis, t)
+            tails[:, :, j:] = pivot + rodrigues(tails[:, :, j:] - pivot, axis, t)
+            bend[:, :, j + 1:] = rodrigues(bend[:, :, j + 1:], axis, t)
+
+        middles = (heads + tails) * 0.5
+        points = np.stack([heads, middles, tails], axis=3)
+        return points.reshape(steps, fingers, joints * 3, 3)
+
+    def subset(self, fingers):
+
+        # Probe for just some of the fingers, by index
+
+        fingers = np.asarray(fingers, dtype=np.int64)
+        return HandProbe([self.names[i] for i in fingers], self.heads[fingers],
+                         self.tails[fingers], self.grip[fingers], self.radius[fingers],
+                         self.mask[fingers], self.palm)
+
+    def moved(self, matrix):
+
+        # The same probe carried into another space by a (4, 4) matrix. Curling
+        # it there gives the same points as curling first and moving after.
+
+        matrix = np.asarray(matrix, dtype=np.float64)
+        rotation = matrix[:3, :3]
+        scale = float(np.cbrt(abs(np.linalg.det(rotation))))
+        return HandProbe(self.names, self.heads @ rotation.T + matrix[:3, 3],
+                         self.tails @ rotation.T + matrix[:3, 3], self.grip @ rotation.T,
+                         self.radius * scale, self.mask, self.palm @ rotation.T + matrix[:3, 3])
+
+    def point_radius(self):
+        return np.repeat(self.radius, 3, axis=1)
+
+    def point_mask(self):
+        return np.repeat(self.mask, 3, axis=1)
+
+
+def join_probes(probes):
+
+    # Several probes (already in the same space) as one, fingers one after the
+    # other, padded out to the longest finger of any of them
+
+    joints = max(p.mask.shape[1] for p in probes)
+
+    def pad(values, fill=0.0):
+        width = [(0, 0), (0, joints - values.shape[1])] + [(0, 0)] * (values.ndim - 2)
+        return np.pad(values, width, constant_values=fill)
+
+    return HandProbe([n for p in probes for n in p.names],
+                     np.concatenate([pad(p.heads) for p in probes]),
+                     np.concatenate([pad(p.tails) for p in probes]),
+                     np.concatenate([pad(p.grip) for p in probes]),
+                     np.concatenate([pad(p.radius) for p in probes]),
+                     np.concatenate([pad(p.mask, False) for p in probes]),
+                     np.concatenate([p.palm for p in probes]))
+
+
+def transform_points(matrices, points):
+
+    # matrices (C, 4, 4) applied to points (..., 3), giving (C, ..., 3)
+
+    matrices = np.asarray(matrices, dtype=np.float64)
+    rotation = matrices[:, :3, :3]
+    translation = matrices[:, :3, 3]
+    flat = points.reshape(-1, 3)
+    moved = np.einsum('cij,pj->cpi', rotation, flat) + translation[:, None, :]
+    return moved.reshape((len(matrices),) + points.shape)
+
+
+def grip_contacts(grid, probe, matrices, steps=8, max_angle=np.pi / 2, tolerance=0.0):
+
+    # The batched contact solve. For every candidate hand transform, closes every
+    # finger a step at a time until it touches the prop, the same way the
+    # projectors and IK pull the fingers in. Returns a dict of:
+    #   contact (C, F): finger touched the prop before it was fully closed
+    #   step (C, F): curl step where it touched
+    #   penetration (C, F): how far that finger ended up inside the prop
+    #   open_penetration (C,): how far the open hand/palm already sits inside the prop
+
+    angles = np.linspace(0.0, max_angle, steps)
+    local = probe.curl(angles)
+    radius = probe.point_radius()
+    mask = probe.point_mask()
+
+    world = transform_points(matrices, local)
+    gap = grid.signed_distance(world) - radius
+    gap = np.where(mask, gap, np.inf)
+
+    finger_gap = gap.min(axis=-1)   # (C, S, F)
+    touching = finger_gap <= tolerance
+    contact = touching.any(axis=1)
+    step = np.where(contact, np.argmax(touching, axis=1), steps - 1)
+
+    at_contact = np.take_along_axis(finger_gap, step[:, None, :], axis=1)[:, 0, :]
+    penetration = np.where(contact, np.clip(-at_contact, 0.0, None), 0.0)
+
+    palm_gap = grid.signed_distance(transform_points(matrices, probe.palm))
+    palm_gap = palm_gap - probe.radius[probe.mask].mean()
+    open_gap = np.minimum(finger_gap[:, 0, :].min(axis=-1), palm_gap.min(axis=-1))
+    open_penetration = np.clip(-open_gap, 0.0, None)
+
+    return {
+        'contact': contact,
+        'step': step,
+        'penetration': penetration,
+        'open_penetration': open_penetration,
+    }
+
+
+def finger_gaps(grid, probe, matrix, angles):
+
+    # Closest any part of each finger gets to the prop with the hand at one
+    # transform, for (steps, fingers) curl angles. Returns (gaps, points), the
+    # gaps being (steps, fingers) and points (steps, fingers, 3) the spot on each
+    # finger that's closest.
+
+    local = probe.curl(angles)
+    world = transform_points(np.asarray(matrix)[None], local)[0]
+    gap = grid.signed_distance(world) - probe.point_radius()
+    gap = np.where(probe.point_mask(), gap, np.inf)
+
+    closest = np.argmin(gap, axis=-1)
+    points = np.take_along_axis(world, closest[..., None, None], axis=2)[:, :, 0]
+    return np.take_along_axis(gap, closest[..., None], axis=-1)[..., 0], points
+
+
+def solve_curl(grid, probe, matrix, low=None, high=None, max_angle=np.pi / 2,
+               iterations=12, tolerance=0.0):
+
+    # Finds the curl angle where each finger just touches the prop, by bisection
+    # between low (known clear) and high (known touching), all fingers at once.
+    # Fingers that don't touch even fully closed come back at max_angle, and ones
+    # already touching while open come back at 0.
+    # Returns (angles, contact points, touching).
+
+    fingers = len(probe.names)
+    if low is None:
+        low = np.zeros(fingers)
+    if high is None:
+        high = np.full(fingers, max_angle)
+    low = np.array(low, dtype=np.float64)
+    high = np.array(high, dtype=np.float64)
+
+    ends, _ = finger_gaps(grid, probe, matrix, np.stack([low, high]))
+    touching = ends[1] <= tolerance
+    already = ends[0] <= tolerance
+
+    for i in range(iterations):
+        middle = (low + high) * 0.5
+        gap, _ = finger_gaps(grid, probe, matrix, middle[None])
+        hit = gap[0] <= tolerance
+        high = np.where(hit, middle, high)
+        low = np.where(hit, low, middle)
+
+    angles = np.where(touching, high, max_angle)
+    angles = np.where(already, low, angles)
+    _, points = finger_gaps(grid, probe, matrix, angles[None])
+    return angles, points[0], touching | already
+
+
+def finger_penetration(probe, points, others):
+
+    # How far each finger's capsules (phalange head to tail, at its radius) sink
+    # into each other finger's. points is (steps, fingers, joints * 3, 3) from
+    # probe.curl, others (fingers, joints * 3, 3) the pose the other fingers are
+    # held at. Returns (steps, fingers, fingers), -inf on the diagonal.
+
+    heads = points[:, :, 0::3]
+    tails = points[:, :, 2::3]
+    other_heads = others[:, 0::3]
+    other_tails = others[:, 2::3]
+
+    # (steps, finger, other finger, joint, other joint)
+    distance = segment_distance(heads[:, :, None, :, None], tails[:, :, None, :, None],
+                                other_heads[None, None, :, None], other_tails[None, None, :, None])
+    reach = probe.radius[:, None, :, None] + probe.radius[None, :, None, :]
+    valid = probe.mask[:, None, :, None] & probe.mask[None, :, None, :]
+    valid = valid & ~np.eye(len(probe.names), dtype=bool)[:, :, None, None]
+    depth = np.where(valid, reach - distance, -np.inf)
+    return depth.max(axis=(-1, -2))
+
+
+def rest_penetration(probe):
+
+    # finger_penetration with the hand open. Fingers that already touch at rest
+    # are allowed to touch that much when curled, too.
+
+    rest = probe.curl(np.zeros((1, len(probe.names))))
+    return np.maximum(finger_penetration(probe, rest, rest[0])[0], 0.0)
+
+
+def separate_fingers(probe, angles, rest=None, rounds=3, iterations=6, tolerance=0.0,
+                     grid=None, matrix=None):
+
+    # Backs fingers off each other after they've been closed on the prop. Where
+    # two fingers overlap (beyond what they did at rest), the one curled further
+    # is opened, by bisection between open and its solved angle, until it
+    # clears the other one where it stands. All fingers bisect together, and a
+    # few rounds sort out chains of them. Returns the new (fingers,) angles.
+    # Given the prop's grid and the hand's matrix in it, every step of the
+    # bisection has to clear the prop as well, so opening a finger can never
+    # leave it somewhere inside the prop.
+
+    angles = np.array(angles, dtype=np.float64)
+    fingers = len(angles)
+    if fingers < 2:
+        return angles
+    if rest is None:
+        rest = rest_penetration(probe)
+    order = np.arange(fingers)
+
+    for r in range(rounds):
+        posed = probe.curl(angles[None])[0]
+        # Finger f gives way to finger g if g is curled less (lower index on a tie)
+        yields = (angles[None, :] < angles[:, None]) | \
+            ((angles[None, :] == angles[:, None]) & (order[None, :] < order[:, None]))
+
+        excess = finger_penetration(probe, posed[None], posed)[0] - rest
+        colliding = ((excess > tolerance) & yields).any(axis=1)
+        if not colliding.any():
+            break
+
+        low = np.zeros(fingers)
+        high = angles.copy()
+        for i in range(iterations):
+            middle = np.where(colliding, (low + high) * 0.5, angles)
+            trial = probe.curl(middle[None])
+            excess = finger_penetration(probe, trial, posed)[0] - rest
+            clear = ~((excess > tolerance) & yields).any(axis=1)
+            if grid is not None:
+                clear &= finger_gaps(grid, probe, matrix, middle[None])[0][0] > 0.0
+            low = np.where(clear, middle, low)
+            high = np.where(clear, high, middle)
+        angles = np.where(colliding, low, angles)
+
+    return angles
+
+
+def solve_window(grid, probe, matrix, low, high, max_angle=np.pi / 2, iterations=12):
+
+    # solve_curl between per-finger angle windows. Windows that no longer bracket
+    # the contact are widened to the full range first, and narrow windows take
+    # fewer halvings to get to the same precision as a full solve.
+
+    low = np.asarray(low, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+
+    if np.any((low > 0.0) | (high < max_angle)):
+        ends, _ = finger_gaps(grid, probe, matrix, np.stack([low, high]))
+        bracketed = ((ends[0] > 0.0) | (low == 0.0)) & ((ends[1] <= 0.0) | (high == max_angle))
+        low = np.where(bracketed, low, 0.0)
+        high = np.where(bracketed, high, max_angle)
+
+    width = float((high - low).max()) if len(low) else max_angle
+    iterations = max(int(np.ceil(iterations + np.log2(max(width, 1e-9) / max_angle))), 1)
+
+    return solve_curl(grid, probe, matrix, low, high, max_angle=max_angle, iterations=iterations)
+
+
+# How much detail a finger gets, by how big it is on screen: FULL fingers are
+# solved whenever they move, COARSE ones only once they've moved several times
+# as far, and HOLD ones (tiny, or off screen) keep their last answer. These
+# scale a WarmStartSolver's tolerance. Hands on their constraints use the same
+# levels (see CurlTable and handrig's stackdetail).
+FULL, COARSE, HOLD = 0, 1, 2
+detail_tolerance = np.array([1.0, 8.0, np.inf])
+
+
+def detail_levels(sizes, visible, near, far):
+
+    # Level for every finger from its length on screen (as a fraction of the
+    # frame): FULL from near up, COARSE down to far, HOLD below that or when
+    # it isn't in view at all
+
+    sizes = np.asarray(sizes, dtype=np.float64)
+    levels = np.where(sizes >= near, FULL, np.where(sizes >= far, COARSE, HOLD))
+    return np.where(visible, levels, HOLD).astype(np.int8)
+
+
+class CurlTable:
+
+    # The rotations a hand's constraints gave each finger's phalanges at each
+    # amount of closing, recorded while the finger is in full detail, so once
+    # it's too small on screen to be worth the constraints it can be posed
+    # straight from the table. Amounts from 0 to 1 are binned; a lookup blends
+    # the nearest recorded bins either side. Rotations are w-first quaternions,
+    # (joints, 4) per finger, padded to the longest finger.
+
+    def __init__(self, fingers, joints, bins=16):
+        self.bins = bins
+        self.rotations = np.zeros((fingers, bins, joints, 4))
+        self.rotations[..., 0] = 1.0
+        self.filled = np.zeros((fingers, bins), dtype=bool)
+
+    def position(self, amount):
+        return min(max(float(amount), 0.0), 1.0) * (self.bins - 1)
+
+    def record(self, finger, amount, rotations):
+        rotations = np.asarray(rotations, dtype=np.float64)
+        slot = int(round(self.position(amount)))
+        self.rotations[finger, slot, :len(rotations)] = rotations
+        self.filled[finger, slot] = True
+
+    def known(self, finger):
+        return bool(self.filled[finger].any())
+
+    def lookup(self, finger, amount):
+
+        # (joints, 4) rotations for a finger at amount, or None if it hasn't
+        # had anything recorded
+
+        filled = np.flatnonzero(self.filled[finger])
+        if not len(filled):
+            return None
+        position = self.position(amount)
+        below = filled[filled <= position]
+        above = filled[filled >= position]
+        if not len(below):
+            return self.rotations[finger, above[0]].copy()
+        if not len(above):
+            return self.rotations[finger, below[-1]].copy()
+
+        low, high = below[-1], above[0]
+        if low == high:
+            return self.rotations[finger, low].copy()
+        t = (position - low) / (high - low)
+        a = self.rotations[finger, low]
+        b = self.rotations[finger, high]
+        b = b * np.where(np.sum(a * b, axis=-1, keepdims=True) < 0.0, -1.0, 1.0)
+        return normalized((1.0 - t) * a + t * b)
+
+
+class WarmStartSolver:
+
+    # Frame to frame grip solver. Hands and props usually only move a little
+    # between frames, so each frame starts from the last one's answer:
+    #  - fingers whose rest root and tip haven't moved more than `tolerance`
+    #    relative to the prop keep last frame's angle without any queries at all
+    #  - the rest only search a small window around last frame's angle, sized by
+    #    how far their old contact point swung, and fall back to a full solve
+    #    if the contact has left that window
+    # Matrices are the hand root in the grid's space (prop local, usually).
+    # solve does all of that for one hand; plan and finish are the halves either
+    # side of the actual search, for GripSession to batch several hands.
+    # With self_collision on, the angles handed back have been through
+    # separate_fingers, against the prop as well as each other; the raw ones are
+    # kept for warm starting the next frame.
+    # detail, when set, is a level (FULL, COARSE, HOLD) for each finger.
+
+    def __init__(self, grid, probe, tolerance=None, max_angle=np.pi / 2, iterations=12,
+                 self_collision=True):
+        self.grid = grid
+        self.probe = probe
+        self.max_angle = max_angle
+        self.iterations = iterations
+        self.self_collision = self_collision
+        self.rest = rest_penetration(probe) if self_collision else None
+        scale = float(probe.radius[probe.mask].mean())
+        self.tolerance = 0.05 * scale if tolerance is None else tolerance
+
+        last = np.maximum(probe.mask.sum(axis=1) - 1, 0)
+        fingers = np.arange(len(probe.names))
+        self.anchors = np.stack([probe.heads[:, 0], probe.tails[fingers, last]], axis=1)
+        self.detail = None
+
+        self.reset()
+
+    def reset(self):
+        self.angles = None
+        self.origins = None
+        self.contacts = None
+        self.touching = None
+        self.separated = None
+        self.requeried = 0
+
+    def plan(self, matrix):
+
+        # Which fingers need solving with the hand at matrix, and the window to
+        # search for each. Returns (origins, indices, low, high).
+
+        matrix = np.asarray(matrix, dtype=np.float64)
+        origins = transform_points(matrix[None], self.anchors)[0]
+        fingers = len(self.probe.names)
+
+        if self.angles is None:
+            return origins, np.arange(fingers), np.zeros(fingers), np.full(fingers, self.max_angle)
+
+        tolerance = self.tolerance
+        if self.detail is not None:
+            tolerance = tolerance * detail_tolerance[self.detail]
+        moved = np.linalg.norm(origins - self.origins, axis=-1).max(axis=-1) > tolerance
+        indices = np.flatnonzero(moved)
+        seed = self.angles[indices]
+
+        # How far the contact could have swung, as an angle around the finger root
+        shift = np.linalg.norm(origins[indices] - self.origins[indices], axis=-1).max(axis=-1)
+        reach = np.linalg.norm(self.contacts[indices] - self.origins[indices, 0], axis=-1)
+        window = 2.0 * shift / np.maximum(reach, 1e-6) + 0.05
+        low = np.clip(seed - window, 0.0, self.max_angle)
+        high = np.clip(seed + window, 0.0, self.max_angle)
+        return origins, indices, low, high
+
+    def finish(self, origins, indices, angles, contacts, touching, matrix):
+
+        # Takes the answers for the fingers plan asked for, and returns
+        # (angles, contact points, touching) for every finger, with the hand at
+        # matrix
+
+        self.requeried = len(indices)
+        if self.angles is None:
+            self.angles, self.contacts, self.touching = angles, contacts, touching
+            self.origins = origins
+        elif len(indices):
+            self.angles = self.angles.copy()
+            self.contacts = self.contacts.copy()
+            self.touching = self.touching.copy()
+            self.origins = self.origins.copy()
+            self.angles[indices] = angles
+            self.contacts[indices] = contacts
+            self.touching[indices] = touching
+            self.origins[indices] = origins[indices]
+
+        if len(indices) or self.separated is None:
+            # Fingers too small to see sinking into each other isn't worth fixing
+            if self.self_collision and (self.detail is None or (self.detail == FULL).any()):
+                self.separated = separate_fingers(self.probe, self.angles, self.rest,
+                                                  grid=self.grid, matrix=matrix)
+            else:
+                self.separated = self.angles
+        return self.separated, self.contacts, self.touching
+
+    def solve(self, matrix):
+
+        # Returns (angles, contact points, touching) for each finger
+
+        origins, indices, low, high = self.plan(matrix)
+        if len(indices) == 0:
+            return self.finish(origins, indices, None, None, None, matrix)
+
+        angles, contacts, touching = solve_window(self.grid, self.probe.subset(indices), matrix,
+                                                  low, high, self.max_angle, self.iterations)
+        return self.finish(origins, indices, angles, contacts, touching, matrix)
+
+
+def solve_sequence(grid, probe, matrices, tolerance=None, warm=True, self_collision=True,
+                   max_angle=np.pi / 2, iterations=12):
+
+    # Solves a run of frames in order with one WarmStartSolver, each frame
+    # starting from the last (or from scratch, with warm off). matrices is
+    # (frames, 4, 4). Returns ((frames, fingers) angles, fingers re-solved).
+
+    solver = WarmStartSolver(grid, probe, tolerance, max_angle, iterations, self_collision)
+    angles = np.zeros((len(matrices), len(probe.names)))
+    requeried = 0
+    for k, matrix in enumerate(matrices):
+        if not warm:
+            solver.reset()
+        angles[k] = solver.solve(matrix)[0]
+        requeried += solver.requeried
+    return angles, requeried
+
+
+def map_threads(function, items, workers=None):
+
+    # function over items on a thread pool, results in order. NumPy lets go of
+    # the GIL for the heavy array work, so threads keep every core busy without
+    # copying the grid into other processes (which, inside Blender, would mean
+    # starting more Blenders). workers=1, or a single item, stays on this thread.
+
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(function, items))
+
+
+def solve_frames(grid, probe, matrices, tolerance=None, warm=True, self_collision=True,
+                 max_angle=np.pi / 2, iterations=12, workers=None, chunk=32, overlap=8):
+
+    # solve_sequence over a long run of frames, split into chunks of frames that
+    # are solved side by side on a thread pool. With warm start on, each chunk
+    # starts solving `overlap` frames early and throws those frames away, so it
+    # comes into its first frame already warm instead of starting cold there,
+    # and there's no seam in the grip where one chunk meets the next.
+    # Returns the same as solve_sequence, counting the warm-up frames' solves.
+
+    matrices = np.asarray(matrices, dtype=np.float64)
+    if not warm:
+        overlap = 0
+    starts = list(range(0, len(matrices), chunk))
+    if not starts:
+        return np.zeros((0, len(probe.names))), 0
+
+    def solve_chunk(start):
+        lead = min(overlap, start)
+        angles, requeried = solve_sequence(grid, probe, matrices[start - lead:start + chunk],
+                                           tolerance, warm, self_collision, max_angle, iterations)
+        return angles[lead:], requeried
+
+    results = map_threads(solve_chunk, starts, workers)
+    return np.concatenate([r[0] for r in results]), sum(r[1] for r in results)
+
+
+class GripSession:
+
+    # One prop's contact grid, shared by every hand gripping it: both hands of a
+    # character, or several characters. Each hand joins with its probe and gets a
+    # WarmStartSolver on the shared grid, and solve runs all of their fingers that
+    # need it through the grid together, so a frame costs one batched search
+    # however many hands are on the prop.
+
+    def __init__(self, grid, max_angle=np.pi / 2, iterations=12):
+        self.grid = grid
+        self.max_angle = max_angle
+        self.iterations = iterations
+        self.solvers = {}
+
+    def join(self, key, probe, tolerance=None, self_collision=True):
+        solver = WarmStartSolver(self.grid, probe, tolerance, self.max_angle, self.iterations,
+                                 self_collision)
+        self.solvers[key] = solver
+        return solver
+
+    def leave(self, key):
+        self.solvers.pop(key, None)
+
+    def solve(self, matrices):
+
+        # matrices is {key: hand root in the grid's space} for the hands to solve
+        # this frame. Returns {key: (angles, contact points, touching)}.
+
+        plans = {key: self.solvers[key].plan(matrix) for key, matrix in matrices.items()}
+        keys = [key for key in plans if len(plans[key][1])]
+
+        results = {}
+        if keys:
+            # Every hand's fingers carried into the grid's space and solved as one
+            probe = join_probes([self.solvers[key].probe.subset(plans[key][1]).moved(matrices[key])
+                                 for key in keys])
+            low = np.concatenate([plans[key][2] for key in keys])
+            high = np.concatenate([plans[key][3] for key in keys])
+            angles, contacts, touching = solve_window(self.grid, probe, np.eye(4), low, high,
+                                                      self.max_angle, self.iterations)
+
+            start = 0
+            for key in keys:
+                origins, indices = plans[key][:2]
+                end = start + len(indices)
+                results[key] = self.solvers[key].finish(origins, indices, angles[start:end],
+                                                        contacts[start:end], touching[start:end],
+                                                        matrices[key])
+                start = end
+
+        for key, (origins, indices, low, high) in plans.items():
+            if key not in results:
+                results[key] = self.solvers[key].finish(origins, indices, None, None, None,
+                                                        matrices[key])
+        return results
@@ -0,0 +1,134 @@
+# Bone geometry for AutoGrip, on plain NumPy arrays. Where handrig.py used to
+# work this out on edit bones one at a time, it now hands the numbers over here.
+
+import math
+
+import numpy as np
+
+
+# Which column of a bone's rest matrix (x, y, z axis) each finger axis setting
+# points along, and which way
+axis_columns = {'x': (0, 1.0), 'y': (1, 1.0), 'z': (2, 1.0),
+                '-x': (0, -1.0), '-y': (1, -1.0), '-z': (2, -1.0)}
+
+
+def rotation_matrix(axis, theta):
+    #This is from here https://stackoverflow.com/questions/6802577/rotation-of-3d-vector
+    """
+    Return the rotation matrix associated with counterclockwise rotation about
+    the given axis by theta radians.
+    """
+    axis = np.asarray(axis)
+    axis = axis / math.sqrt(np.dot(axis, axis))
+    a = math.cos(theta / 2.0)
+    b, c, d = -axis * math.sin(theta / 2.0)
+    aa, bb, cc, dd = a * a, b * b, c * c, d * d
+    bc, ad, ac, ab, bd, cd = b * c, a * d, a * c, a * b, b * d, c * d
+    return np.array([[aa + bb - cc - dd, 2 * (bc + ad), 2 * (bd - ac)],
+                     [2 * (bc - ad), aa + cc - bb - dd, 2 * (cd + ab)],
+                     [2 * (bd + ac), 2 * (cd - ab), aa + dd - bb - cc]])
+
+
+def rotate_around(source, rotationaxis, offset):
+
+    # Calls rotation_matrix in a way that's useful to me
+
+    return np.dot(rotation_matrix(rotationaxis, offset), source)
+
+
+def rodrigues(vectors, axes, theta):
+
+    # Rotates vectors around unit axes by theta radians. Everything broadcasts, so
+    # this does one bone or a whole crowd of them in a single pass.
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    axes = np.asarray(axes, dtype=np.float64)
+    theta = np.asarray(theta, dtype=np.float64)[..., None]
+    cos = np.cos(theta)
+    sin = np.sin(theta)
+    dot = np.sum(axes * vectors, axis=-1, keepdims=True)
+    return vectors * cos + np.cross(axes, vectors) * sin + axes * dot * (1.0 - cos)
+
+
+def normalized(vectors):
+    lengths = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(lengths == 0.0, 1.0, lengths)
+
+
+def segment_distance(p0, p1, q0, q1):
+
+    # Closest distance between segments p0-p1 and q0-q1. Everything broadcasts,
+    # so this does every pair of capsules between two fingers, or two hands, at once.
+
+    d1 = p1 - p0
+    d2 = q1 - q0
+    r = p0 - q0
+    a = np.sum(d1 * d1, axis=-1)
+    e = np.sum(d2 * d2, axis=-1)
+    f = np.sum(d2 * r, axis=-1)
+    c = np.sum(d1 * r, axis=-1)
+    b = np.sum(d1 * d2, axis=-1)
+    denominator = a * e - b * b
+
+    # Closest point on the first segment's line to the second, clamped, then the
+    # second segment's closest point to that, clamped, then the first again
+    safe_a = np.where(a > 1e-12, a, 1.0)
+    safe_e = np.where(e > 1e-12, e, 1.0)
+    s = np.where(denominator > 1e-12, (b * f - c * e) / np.where(denominator > 1e-12, denominator, 1.0), 0.0)
+    s = np.clip(s, 0.0, 1.0)
+    t = np.clip((b * s + f) / safe_e, 0.0, 1.0)
+    s = np.where(a > 1e-12, np.clip((b * t - c) / safe_a, 0.0, 1.0), 0.0)
+    t = np.where(e > 1e-12, t, 0.0)
+
+    closest = (p0 + d1 * s[..., None]) - (q0 + d2 * t[..., None])
+    return np.linalg.norm(closest, axis=-1)
+
+
+def axis_vector(x_axis, y_axis, z_axis, axis):
+
+    # One of a bone's axes picked by an axis setting like '-z'
+
+    column, sign = axis_columns[axis]
+    return np.asarray((x_axis, y_axis, z_axis)[column], dtype=np.float64) * sign
+
+
+def projector_points(head, tail, translation, y_axis, offset):
+
+    # Where a phalange's projector goes: pushed out from the phalange's head by
+    # one bone length toward the grip side (turned around the bone by offset for
+    # thumbs), pointing back at the phalange's tail, a third as long as that.
+    # Returns (head, tail). Broadcasts, so it places every projector on a hand
+    # (or a crowd) in one call with (N, 3) arrays and (N,) offsets.
+
+    head = np.asarray(head, dtype=np.float64)
+    tail = np.asarray(tail, dtype=np.float64)
+    translation = normalized(np.asarray(translation, dtype=np.float64))
+
+    translation = rodrigues(translation, normalized(np.asarray(y_axis, dtype=np.float64)), offset)
+
+    length = np.linalg.norm(tail - head, axis=-1, keepdims=True)
+    projector_head = head + normalized(translation) * length
+    return projector_head, projector_head + (tail - projector_head) / 3.0
+
+
+def control_tail(head, translation, length):
+
+    # Control bones stick straight out from the palm by its own length.
+    # Broadcasts like projector_points.
+
+    length = np.asarray(length, dtype=np.float64)[..., None]
+    return np.asarray(head, dtype=np.float64) + normalized(np.asarray(translation, dtype=np.float64)) * length
+
+
+def screen_points(projection, points):
+
+    # Points (..., 3) through a (4, 4) camera projection. Returns where they land
+    # in the frame, (..., 2) running 0 to 1 across it, and their depth (...,),
+    # which is negative behind the camera.
+
+    points = np.asarray(points, dtype=np.float64)
+    projection = np.asarray(projection, dtype=np.float64)
+    clip = points @ projection[:3, :3].T + projection[:3, 3]
+    depth = points @ projection[3, :3] + projection[3, 3]
+    safe = np.where(np.abs(depth) > 1e-12, depth, 1e-12)
+    return (clip[..., :2] / safe[..., None] + 1.0) * 0.5, depth
@@ -0,0 +1,89 @@
+# Grasp search for AutoGrip: builds candidate wrist transforms around a prop and
+# scores them with the batched contact solver in contact.py.
+#
+# Like contact.py this has no bpy in it. The operator in handrig.py does the
+# Blender side (KD-tree sampling of the prop, reading the hand), then hands the
+# arrays over to search(), which spreads the scoring across a thread pool.
+
+import numpy as np
+
+from . import contact
+from . import geometry
+
+
+def candidate_frames(points, normals, rolls, palm_point, palm_normal, finger_dir, standoff):
+
+    # One hand root transform per (surface point, roll). The palm faces into the
+    # surface along the normal, hovering standoff above it, and the fingers point
+    # along one of `rolls` evenly spaced directions in the tangent plane.
+    # Returns (points * rolls, 4, 4)
+
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    normals = geometry.normalized(np.asarray(normals, dtype=np.float64).reshape(-1, 3))
+
+    # Local hand basis: palm normal, finger direction, and their cross
+    a = geometry.normalized(np.asarray(palm_normal, dtype=np.float64))
+    b = np.asarray(finger_dir, dtype=np.float64)
+    b = geometry.normalized(b - a * np.dot(a, b))
+    local = np.stack([a, b, np.cross(a, b)], axis=1)
+
+    # Any tangent to start the rolls from, avoiding one parallel to the normal
+    helper = np.where(np.abs(normals[:, :1]) < 0.9, [[1.0, 0.0, 0.0]], [[0.0, 1.0, 0.0]])
+    tangent = geometry.normalized(np.cross(normals, helper))
+
+    angles = np.arange(rolls) * (2.0 * np.pi / rolls)
+    n = np.repeat(normals, rolls, axis=0)
+    p = np.repeat(points, rolls, axis=0)
+    t = geometry.rodrigues(np.repeat(tangent, rolls, axis=0), n, np.tile(angles, len(points)))
+
+    world = np.stack([-n, t, np.cross(-n, t)], axis=2)
+    rotation = world @ local.T
+
+    matrices = np.zeros((len(p), 4, 4))
+    matrices[:, :3, :3] = rotation
+    matrices[:, :3, 3] = p + n * standoff - rotation @ np.asarray(palm_point, dtype=np.float64)
+    matrices[:, 3, 3] = 1.0
+    return matrices
+
+
+def score_contacts(result, probe, scale, penetration_weight=4.0, open_weight=10.0):
+
+    # Turns grip_contacts output into one number per candidate. More fingers
+    # touching is better, a thumb that opposes them is better still, and anything
+    # sinking into the prop costs a lot, especially if the open hand is already inside.
+
+    touching = result['contact']
+    score = touching.sum(axis=1).astype(np.float64)
+
+    thumbs = np.array(['thumb' in name for name in probe.names], dtype=bool)
+    if thumbs.any():
+        opposed = touching[:, thumbs].any(axis=1) & touching[:, ~thumbs].any(axis=1)
+        score += opposed
+
+    score -= penetration_weight * result['penetration'].sum(axis=1) / scale
+    score -= open_weight * result['open_penetration'] / scale
+    return score
+
+
+def search(grid, probe, matrices, top_k=5, steps=8, workers=None, chunk=64):
+
+    # Scores every candidate transform and returns (indices, scores) of the top_k.
+    # Chunks are scored across a thread pool (see contact.map_threads), all
+    # reading the same grid; workers=1 scores them one after another.
+
+    matrices = np.asarray(matrices, dtype=np.float64)
+    scale = float(probe.radius[probe.mask].mean())
+    tolerance = 0.25 * scale
+
+    chunks = [matrices[i:i + chunk] for i in range(0, len(matrices), chunk)]
+    if not chunks:
+        return np.zeros(0, dtype=np.int64), np.zeros(0)
+
+    def score_chunk(chunk_matrices):
+        result = contact.grip_contacts(grid, probe, chunk_matrices, steps=steps, tolerance=tolerance)
+        return score_contacts(result, probe, scale)
+
+    scores = np.concatenate(contact.map_threads(score_chunk, chunks, workers))
+
+    order = np.argsort(-scores, kind='stable')[:top_k]
+    return order, scores[order]
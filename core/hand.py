@@ -0,0 +1,224 @@
+# Compact, array-backed model of one hand: every finger's bones, rest
+# geometry and settings in a handful of flat arrays instead of an object per
+# finger. Planning, mirroring and anything geometric runs over the whole hand
+# at once. No bpy; handrig.py fills the rest arrays in from the armature.
+#
+# Phalanges are stored flat, finger after finger. finger_of says which finger
+# each phalange row belongs to, and starts/counts give each finger's rows.
+
+import numpy as np
+
+from . import geometry
+from . import rigs
+
+
+def mirror_name(name):
+
+    # Swaps the side suffix on a bone name ('.L' <-> '.R', '.l' <-> '.r')
+
+    swaps = {'L': 'R', 'R': 'L', 'l': 'r', 'r': 'l'}
+    if len(name) > 1 and name[-2] == '.' and name[-1] in swaps:
+        return name[:-1] + swaps[name[-1]]
+    return name
+
+
+class HandModel:
+
+    __slots__ = ('rig', 'side', 'finger_names', 'palm_names', 'phalange_names',
+                 'finger_of', 'starts', 'counts', 'axes', 'axis_column', 'axis_sign', 'offsets',
+                 'bone_index', 'palm_index', 'matrices', 'heads', 'tails',
+                 'palm_matrices', 'palm_heads', 'palm_tails', 'control_layer', 'project_layer')
+
+    def __init__(self, rig, side, plans):
+        self.rig = rig
+        self.side = side
+        self.finger_names = tuple(p.name for p in plans)
+        self.palm_names = tuple(p.palm for p in plans)
+        self.phalange_names = tuple(name for p in plans for name in p.phalanges)
+
+        self.counts = np.array([len(p.phalanges) for p in plans], dtype=np.int32)
+        self.starts = (np.cumsum(self.counts) - self.counts).astype(np.int32)
+        self.finger_of = np.repeat(np.arange(len(plans), dtype=np.int32), self.counts)
+
+        self.axes = tuple(p.axis for p in plans)
+        self.axis_column = np.array([geometry.axis_columns[a][0] for a in self.axes], dtype=np.int8)
+        self.axis_sign = np.array([geometry.axis_columns[a][1] for a in self.axes], dtype=np.float32)
+        self.offsets = np.array([p.offset for p in plans], dtype=np.float32)
+
+        self.control_layer, self.project_layer = rigs.layers_for(rig, side)
+
+        # Filled in by read_rest
+        self.bone_index = np.full(len(self.phalange_names), -1, dtype=np.int32)
+        self.palm_index = np.full(len(plans), -1, dtype=np.int32)
+        self.matrices = None
+        self.heads = None
+        self.tails = None
+        self.palm_matrices = None
+        self.palm_heads = None
+        self.palm_tails = None
+
+    @classmethod
+    def plan(cls, rig, side):
+        return cls(rig, side, rigs.plan_hand(rig, side))
+
+    def __len__(self):
+        return len(self.finger_names)
+
+    def rows(self, finger):
+
+        # Phalange rows belonging to one finger, as a slice
+
+        return slice(int(self.starts[finger]), int(self.starts[finger] + self.counts[finger]))
+
+    def plans(self):
+        return [rigs.fingerplan(self.finger_names[i], self.palm_names[i],
+                                list(self.phalange_names[self.rows(i)]), self.axes[i],
+                                float(self.offsets[i]))
+                for i in range(len(self))]
+
+    def subset(self, fingers):
+
+        # The same hand with only some of its fingers, by index
+
+        plans = self.plans()
+        model = HandModel(self.rig, self.side, [plans[i] for i in fingers])
+        rows = np.concatenate([np.arange(self.starts[i], self.starts[i] + self.counts[i])
+                               for i in fingers]) if len(fingers) else np.zeros(0, dtype=np.int64)
+        model.bone_index = self.bone_index[rows]
+        model.palm_index = self.palm_index[list(fingers)]
+        if self.matrices is not None:
+            model.matrices = self.matrices[rows]
+            model.heads = self.heads[rows]
+            model.tails = self.tails[rows]
+            model.palm_matrices = self.palm_matrices[list(fingers)]
+            model.palm_heads = self.palm_heads[list(fingers)]
+            model.palm_tails = self.palm_tails[list(fingers)]
+        return model
+
+    def find_bones(self, index_of):
+
+        # Looks every bone up with index_of(name) -> index (or -1), and drops
+        # fingers that are missing any of their bones. Returns the dropped names.
+
+        self.bone_index = np.array([index_of(n) for n in self.phalange_names], dtype=np.int32)
+        self.palm_index = np.array([index_of(n) for n in self.palm_names], dtype=np.int32)
+
+        missing = np.zeros(len(self), dtype=bool)
+        np.logical_or.at(missing, self.finger_of, self.bone_index < 0)
+        missing |= self.palm_index < 0
+        if not missing.any():
+            return []
+
+        kept = self.subset(np.flatnonzero(~missing))
+        for name in self.__slots__:
+            setattr(self, name, getattr(kept, name))
+        return [n for n, m in zip(self.palm_names, missing) if m]
+
+    def read_rest(self, bone_matrices, bone_heads, bone_tails):
+
+        # Pulls this hand's rest pose out of whole-armature arrays (bones, 4, 4)
+        # and (bones, 3), indexed by the bone indices from find_bones
+
+        self.matrices = np.asarray(bone_matrices, dtype=np.float64)[self.bone_index]
+        self.heads = np.asarray(bone_heads, dtype=np.float64)[self.bone_index]
+        self.tails = np.asarray(bone_tails, dtype=np.float64)[self.bone_index]
+        self.palm_matrices = np.asarray(bone_matrices, dtype=np.float64)[self.palm_index]
+        self.palm_heads = np.asarray(bone_heads, dtype=np.float64)[self.palm_index]
+        self.palm_tails = np.asarray(bone_tails, dtype=np.float64)[self.palm_index]
+
+    def lengths(self):
+        return np.linalg.norm(self.tails - self.heads, axis=-1)
+
+    def axis_directions(self, matrices, fingers):
+
+        # Each finger's axis setting picked off the matching rest matrix
+
+        column = self.axis_column[fingers]
+        return matrices[np.arange(len(matrices)), :3, column] * self.axis_sign[fingers][:, None]
+
+    def grip_directions(self):
+
+        # Which way every phalange's projector sits, in armature space: the
+        # finger's axis setting picked off each rest matrix, turned around the
+        # bone by the finger's offset. Same direction projector_points uses.
+
+        direction = self.axis_directions(self.matrices, self.finger_of)
+        return geometry.rodrigues(geometry.normalized(direction),
+                                  geometry.normalized(self.matrices[:, :3, 1]),
+                                  self.offsets[self.finger_of])
+
+    def projector_points(self, matrices=None, heads=None, tails=None):
+
+        # Heads and tails of every phalange's projector, (phalanges, 3) each, in
+        # one pass. Uses the rest pose unless given edit bone arrays in
+        # phalange order.
+
+        if matrices is None:
+            matrices, heads, tails = self.matrices, self.heads, self.tails
+        return geometry.projector_points(heads, tails, self.axis_directions(matrices, self.finger_of),
+                                         matrices[:, :3, 1], self.offsets[self.finger_of])
+
+    def control_points(self, palm_matrices=None, palm_heads=None, palm_tails=None):
+
+        # Heads and tails of every finger's control bone, (fingers, 3) each:
+        # from the palm's tail, straight out the back of the hand (the other way
+        # from the projectors) by the palm's length
+
+        if palm_matrices is None:
+            palm_matrices, palm_heads, palm_tails = self.palm_matrices, self.palm_heads, self.palm_tails
+        fingers = np.arange(len(self))
+        translation = -self.axis_directions(palm_matrices, fingers)
+        lengths = np.linalg.norm(palm_tails - palm_heads, axis=-1)
+        return palm_tails, geometry.control_tail(palm_tails, translation, lengths)
+
+    def control_names(self):
+        return ["control_" + name + '.' + self.side for name in self.finger_names]
+
+    def projector_names(self):
+        return ["projector_" + name for name in self.phalange_names]
+
+    def bend_axes(self):
+
+        # Axis every phalange curls around, in armature space: the one that turns
+        # its Y axis toward its grip side
+
+        direction = geometry.normalized(self.tails - self.heads)
+        return geometry.normalized(np.cross(direction, self.grip_directions()))
+
+    def padded(self, values, fill=0.0):
+
+        # Per-phalange values laid out (fingers, longest finger, ...) with a mask,
+        # which is how the contact solver wants them
+
+        joints = int(self.counts.max()) if len(self) else 0
+        shape = (len(self), joints) + np.shape(values)[1:]
+        out = np.full(shape, fill, dtype=np.float64)
+        mask = np.zeros((len(self), joints), dtype=bool)
+        joint_of = np.arange(len(self.phalange_names)) - self.starts[self.finger_of]
+        out[self.finger_of, joint_of] = values
+        mask[self.finger_of, joint_of] = True
+        return out, mask
+
+    def mirrored(self):
+
+        # The other hand, reflected across the armature's X = 0 plane, with
+        # names swapped over and thumb offsets turned the other way
+
+        other = {'L': 'R', 'R': 'L', 'l': 'r', 'r': 'l'}[self.side]
+        plans = [rigs.fingerplan(p.name, mirror_name(p.palm), [mirror_name(n) for n in p.phalanges],
+                                 p.axis, -p.offset) for p in self.plans()]
+        model = HandModel(self.rig, other, plans)
+        model.bone_index = np.full(len(model.phalange_names), -1, dtype=np.int32)
+        model.palm_index = np.full(len(model), -1, dtype=np.int32)
+
+        if self.matrices is not None:
+            flip = np.diag([-1.0, 1.0, 1.0, 1.0])
+            # Reflect positions, then flip X again on the bone's own side so the
+            # axes stay right handed, the way Blender's symmetrize does it
+            model.matrices = flip @ self.matrices @ flip
+            model.palm_matrices = flip @ self.palm_matrices @ flip
+            model.heads = self.heads * [-1.0, 1.0, 1.0]
+            model.tails = self.tails * [-1.0, 1.0, 1.0]
+            model.palm_heads = self.palm_heads * [-1.0, 1.0, 1.0]
+            model.palm_tails = self.palm_tails * [-1.0, 1.0, 1.0]
+        return model
@@ -0,0 +1,68 @@
+# Keyframe reduction for baked grips. A bake keys every channel on every frame;
+# most of those keys sit on a straight line between their neighbours and can go.
+# This is Ramer-Douglas-Peucker, but run on every channel and every open
+# segment at once: each pass finds the worst frame in every segment that's
+# still off by more than the tolerance and keeps it, until none are.
+
+import numpy as np
+
+
+def linear_error(times, values, keep):
+
+    # How far every sample is from the straight line between the kept keys
+    # either side of it, for (frames, channels) values. Also returns the index
+    # of the kept key before each sample, which is what segments are keyed on.
+
+    frames, channels = values.shape
+    index = np.arange(frames)[:, None]
+    before = np.maximum.accumulate(np.where(keep, index, 0), axis=0)
+    after = np.minimum.accumulate(np.where(keep, index, frames - 1)[::-1], axis=0)[::-1]
+
+    column = np.arange(channels)[None, :]
+    t0 = times[before]
+    t1 = times[after]
+    v0 = values[before, column]
+    v1 = values[after, column]
+    span = np.where(t1 > t0, t1 - t0, 1.0)
+    line = v0 + (v1 - v0) * ((times[:, None] - t0) / span)
+    return np.abs(values - line), before
+
+
+def reduce_keys(times, values, tolerance, fixed=None):
+
+    # Which keys to keep, per channel, so that linear interpolation between them
+    # never strays more than tolerance from every baked value. times is
+    # (frames,), values (frames, channels), tolerance a number or one per
+    # channel, and fixed an optional (frames,) mask of keys that have to stay
+    # (the ends of gaps in the bake, say). Returns a (frames, channels) mask.
+
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = values[:, None]
+    frames, channels = values.shape
+    tolerance = np.broadcast_to(np.asarray(tolerance, dtype=np.float64), (channels,))
+
+    keep = np.zeros((frames, channels), dtype=bool)
+    if frames == 0:
+        return keep
+    keep[0] = True
+    keep[-1] = True
+    if fixed is not None:
+        keep |= np.asarray(fixed, dtype=bool)[:, None]
+
+    # Segments are keyed by channel and the kept key that starts them
+    segment_of = np.arange(channels)[None, :] * frames
+
+    while True:
+        error, before = linear_error(times, values, keep)
+        error = np.where(keep | (error <= tolerance[None, :]), -1.0, error)
+        if not (error >= 0.0).any():
+            break
+
+        segments = (segment_of + before).ravel()
+        worst = np.full(frames * channels, -1.0)
+        np.maximum.at(worst, segments, error.ravel())
+        keep |= (error >= 0.0) & (error == worst[segments].reshape(frames, channels))
+
+    return keep
@@ -0,0 +1,185 @@
+# Rig definitions for every armature type AutoGrip knows, and the finger
+# planning that turns one into a list of fingers. Plain Python, no bpy: this
+# works on bone names only, and handrig.py looks the bones up.
+
+# Which rig types there are, for the drop-down. Descriptions double as tooltips.
+rig_items = [
+    ('MHX', "MHX", "MakeHuman Exchange\n" +
+     "Puts control bones on layers 7 and 23 for Fingers" +
+     "\nPuts projectors on layer 24"),
+    ('RFY', "Rigify", "Modular armature from the Rigify add-on.\n" +
+     "Puts control bones on layer 6 for Fingers (Detail)\n" +
+     "Puts projectors on layer 23"),
+    ('ARP', "Auto-Rig Pro", "Armature from the Auto-Rig Pro add-on.\n" +
+     "Puts control bones and projectors on layer 16")
+    #('GUESS', "Best Guess", "This will do its best to reconstruct some hands from\n" +
+    #"any given armature. Not implemented yet"),
+]
+
+
+# Palm (or thumb root) bone: the phalanges hanging off it, in order
+
+makehuman_dictionary = {
+
+    "palm_index.L": ["f_index.01.L", "f_index.02.L", "f_index.03.L"],
+    "palm_middle.L": ["f_middle.01.L", "f_middle.02.L", "f_middle.03.L"],
+    "palm_ring.L": ["f_ring.01.L", "f_ring.02.L", "f_ring.03.L"],
+    "palm_pinky.L": ["f_pinky.01.L", "f_pinky.02.L", "f_pinky.03.L"],
+
+    "palm_index.R": ["f_index.01.R", "f_index.02.R", "f_index.03.R"],
+    "palm_middle.R": ["f_middle.01.R", "f_middle.02.R", "f_middle.03.R"],
+    "palm_ring.R": ["f_ring.01.R", "f_ring.02.R", "f_ring.03.R"],
+    "palm_pinky.R": ["f_pinky.01.R", "f_pinky.02.R", "f_pinky.03.R"],
+
+
+    "thumb.01.L": ["thumb.02.L", "thumb.03.L"],
+    "thumb.01.R": ["thumb.02.R", "thumb.03.R"]
+}
+
+rigify_dictionary = {
+    "ORG-palm.01.L": ["f_index.01.L", "f_index.02.L", "f_index.03.L"],
+    "ORG-palm.02.L": ["f_middle.01.L", "f_middle.02.L", "f_middle.03.L"],
+    "ORG-palm.03.L": ["f_ring.01.L", "f_ring.02.L", "f_ring.03.L"],
+    "ORG-palm.04.L": ["f_pinky.01.L", "f_pinky.02.L", "f_pinky.03.L"],
+
+    "ORG-palm.01.R": ["f_index.01.R", "f_index.02.R", "f_index.03.R"],
+    "ORG-palm.02.R": ["f_middle.01.R", "f_middle.02.R", "f_middle.03.R"],
+    "ORG-palm.03.R": ["f_ring.01.R", "f_ring.02.R", "f_ring.03.R"],
+    "ORG-palm.04.R": ["f_pinky.01.R", "f_pinky.02.R", "f_pinky.03.R"],
+
+    "ORG-thumb.01.L": ["thumb.02.L", "thumb.03.L"],
+    "ORG-thumb.01.R": ["thumb.02.R", "thumb.03.R"]
+}
+
+autorig_dictionary = {
+    'c_index1_base.l': ['c_index1.l', 'c_index2.l', 'c_index3.l'],
+    'c_middle1_base.l': ['c_middle1.l', 'c_middle2.l', 'c_middle3.l'],
+    'c_ring1_base.l': ['c_ring1.l', 'c_ring2.l', 'c_ring3.l'],
+    'c_pinky1_base.l': ['c_pinky1.l', 'c_pinky2.l', 'c_pinky3.l'],
+    'c_thumb1.l': ['c_thumb2.l', 'c_thumb3.l'],
+
+    'c_index1_base.r': ['c_index1.r', 'c_index2.r', 'c_index3.r'],
+    'c_middle1_base.r': ['c_middle1.r', 'c_middle2.r', 'c_middle3.r'],
+    'c_ring1_base.r': ['c_ring1.r', 'c_ring2.r', 'c_ring3.r'],
+    'c_pinky1_base.r': ['c_pinky1.r', 'c_pinky2.r', 'c_pinky3.r'],
+    'c_thumb1.r': ['c_thumb2.r', 'c_thumb3.r'],
+}
+
+dictionaries = {
+    'MHX': makehuman_dictionary,
+    'RFY': rigify_dictionary,
+    'ARP': autorig_dictionary,
+}
+
+# The bone every finger on each hand hangs off
+hand_roots = {
+    'MHX': {'L': 'hand0.L', 'R': 'hand0.R'},
+    'RFY': {'L': 'DEF-hand.L', 'R': 'DEF-hand.R'},
+    'ARP': {'L': 'hand.l', 'R': 'hand.r'},
+}
+
+# The controls each rig type poses its hands with, IK first. The hand roots
+# above are deform bones that follow one of these, so anything moving a whole
+# hand (Find Grasp) has to move the control or the rig puts the hand straight
+# back. Armatures with none of them get the hand root moved instead.
+hand_controls = {
+    'MHX': {'L': ('hand.ik.L', 'hand.fk.L'), 'R': ('hand.ik.R', 'hand.fk.R')},
+    'RFY': {'L': ('hand_ik.L', 'hand_fk.L'), 'R': ('hand_ik.R', 'hand_fk.R')},
+    'ARP': {'L': ('c_hand_ik.l', 'c_hand_fk.l'), 'R': ('c_hand_ik.r', 'c_hand_fk.r')},
+}
+
+# Thumbs don't bend the same way as the other fingers, so each rig gets a
+# projector axis and an offset around the bone (radians) for each thumb,
+# keyed by the thumb's first phalange. Other fingers just use finger_axes.
+thumb_settings = {
+    'MHX': {"thumb.02.L": ('z', 0.8), "thumb.02.R": ('z', -0.8)},
+    'RFY': {"thumb.02.L": ('z', -0.7), "thumb.02.R": ('z', 0.7)},
+}
+
+finger_axes = {'MHX': 'z', 'RFY': 'z', 'ARP': '-z'}
+
+# Armature layers (0-31) the control bones and projectors go on, per side.
+# Same as the tooltips in rig_items, which count from 1.
+layers = {
+    'MHX': {'L': (6, 24), 'R': (22, 24)},
+    'RFY': {'L': (6, 23), 'R': (6, 23)},
+    'ARP': {'L': (16, 16), 'R': (16, 16)},
+}
+
+
+# Blender 4 replaced armature layers with bone collections. There, each of
+# the layers above becomes the collection named here, or "AutoGrip <layer>".
+layer_collections = {
+    'RFY': {6: "Fingers (Detail)"},
+}
+
+
+def collection_for(rig_choice, layer):
+
+    # Bone collection name for a layer (0-31) on a rig type
+
+    return layer_collections.get(rig_choice, {}).get(layer, "AutoGrip " + str(layer + 1))
+
+
+def layers_for(rig_choice, direction):
+
+    # (control layer, projector layer) for one side of a rig type
+
+    return layers.get(rig_choice, {}).get(direction.upper(), (29, 30))
+
+
+def hand_root_name(rig_choice, direction):
+    return hand_roots[rig_choice][direction.upper()]
+
+
+def hand_control_names(rig_choice, direction):
+    return hand_controls.get(rig_choice, {}).get(direction.upper(), ())
+
+
+class fingerplan:
+
+    # Everything needed to build one finger, by bone name
+
+    def __init__(self, name, palm, phalanges, axis, offset=0.0):
+        self.name = name
+        self.palm = palm
+        self.phalanges = phalanges
+        self.axis = axis
+        self.offset = offset
+
+    def __repr__(self):
+        return ("fingerplan(" + self.name + ", " + self.palm + ", " + str(self.phalanges) +
+                ", " + self.axis + ", " + str(self.offset) + ")")
+
+
+def finger_name(rig_choice, palm, phalanges):
+
+    # What a finger gets called, which is also what its control bone is named after.
+    # Has to match what older versions did, or reconstruct can't find existing setups.
+
+    if rig_choice == 'ARP':
+        return palm.split('_')[1][:-1]
+    return phalanges[0].split('.')[0]
+
+
+def plan_hand(rig_choice, direction):
+
+    # Lists the fingers on one side ('L'/'R', or 'l'/'r' for Auto-Rig Pro,
+    # the last character of the hand bone's name) of a rig type
+
+    chosen_dictionary = dictionaries.get(rig_choice, {})
+    plans = []
+
+    for palm, phalanges in chosen_dictionary.items():
+        if palm[-1] != direction:
+            continue
+
+        name = finger_name(rig_choice, palm, phalanges)
+        axis = finger_axes[rig_choice]
+        offset = 0.0
+        if 'thumb' in name:
+            axis, offset = thumb_settings.get(rig_choice, {}).get(phalanges[0], (axis, 0.0))
+
+        plans.append(fingerplan(name, palm, list(phalanges), axis, offset))
+
+    return plans
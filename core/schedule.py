@@ -0,0 +1,75 @@
+# Grip target schedules: which prop a hand holds over which frames. A schedule
+# is resolved once into a per-frame table of slots, so looking up the target
+# for a frame during playback or a bake is an array index, not a search.
+
+import json
+
+import numpy as np
+
+
+class TargetSchedule:
+
+    # entries are (first frame, last frame, target name), both frames included.
+    # Where ranges overlap, the later entry wins. targets lists every prop the
+    # schedule uses, and slots[frame - start] is the index into it for each
+    # frame, -1 where the hand isn't holding anything.
+
+    def __init__(self, entries):
+        self.entries = [(int(first), int(last), str(name)) for first, last, name in entries
+                        if int(last) >= int(first)]
+
+        self.targets = []
+        for first, last, name in self.entries:
+            if name not in self.targets:
+                self.targets.append(name)
+
+        if self.entries:
+            self.start = min(e[0] for e in self.entries)
+            self.end = max(e[1] for e in self.entries)
+        else:
+            self.start, self.end = 0, -1
+
+        self.slots = np.full(self.end - self.start + 1, -1, dtype=np.int16)
+        for first, last, name in self.entries:
+            self.slots[first - self.start:last - self.start + 1] = self.targets.index(name)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def slot(self, frame):
+        frame = int(frame)
+        if frame < self.start or frame > self.end:
+            return -1
+        return int(self.slots[frame - self.start])
+
+    def target(self, frame):
+        slot = self.slot(frame)
+        return None if slot < 0 else self.targets[slot]
+
+    def frame_slots(self, frame_start, frame_end):
+
+        # Slot for every frame in a range, including frames outside the schedule
+
+        frames = np.arange(frame_start, frame_end + 1)
+        inside = (frames >= self.start) & (frames <= self.end)
+        slots = np.full(len(frames), -1, dtype=np.int16)
+        slots[inside] = self.slots[frames[inside] - self.start]
+        return slots
+
+    def switches(self):
+
+        # (frame, target name or None) for every frame where the target changes
+
+        changed = np.flatnonzero(np.diff(self.slots, prepend=-1) != 0)
+        return [(self.start + int(i), self.target(self.start + int(i))) for i in changed] + \
+            ([(self.end + 1, None)] if self.entries else [])
+
+    def added(self, first, last, name):
+        return TargetSchedule(self.entries + [(first, last, name)])
+
+    def to_json(self):
+        return json.dumps(self.entries)
+
+    @classmethod
+    def from_json(cls, text):
+        return cls(json.loads(text) if text else [])
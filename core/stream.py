@@ -0,0 +1,101 @@
+# Baked grips as a flat binary pose stream, for game and crowd tools that only
+# want the finger rotations and shouldn't need Blender to get them. One file
+# is a fixed header, a small JSON block saying which bone each canonical joint
+# came from on the source rig, and then one float32 quaternion (w, x, y, z)
+# for every frame, hand and canonical joint:
+#
+#   data[frame, hand, finger, joint] -> (w, x, y, z)
+#
+# with fingers and joints in core.canonical order. The rotations are each
+# bone's own local rotation on the source rig; joints the rig doesn't have are
+# identity and marked missing in the JSON. Everything's little endian, and the
+# data starts on a 64 byte boundary so it can be mapped straight into memory.
+
+import json
+import struct
+
+import numpy as np
+
+from . import canonical
+
+
+magic = b'AGPS'
+version = 1
+
+# magic, version, hands, frames, fingers, joints, first frame, fps, JSON length,
+# data offset
+header_format = '<4sHHIHHifIQ'
+header_size = struct.calcsize(header_format)
+alignment = 64
+
+dtype = np.dtype('<f4')
+
+
+def data_offset(json_length):
+    end = header_size + json_length
+    return (end + alignment - 1) // alignment * alignment
+
+
+def write_stream(path, quaternions, first_frame, fps, mappings):
+
+    # quaternions is (frames, hands, fingers, joints, 4), one RigMapping per
+    # hand for the header. Written straight out of the array in one go.
+
+    quaternions = np.ascontiguousarray(quaternions, dtype=dtype)
+    frames, hands, fingers, joints, _ = quaternions.shape
+    meta = json.dumps({
+        'fingers': list(canonical.fingers),
+        'rig': mappings[0].rig if mappings else None,
+        'hands': [{'side': m.side,
+                   'bones': [[m.phalange_names[r] if r >= 0 else None for r in row] for row in m.rows]}
+                  for m in mappings],
+    }).encode('utf-8')
+
+    offset = data_offset(len(meta))
+    header = struct.pack(header_format, magic, version, hands, frames, fingers, joints,
+                         int(first_frame), float(fps), len(meta), offset)
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(meta)
+        f.write(b'\0' * (offset - header_size - len(meta)))
+        quaternions.tofile(f)
+
+
+def read_header(path):
+
+    # (header values as a dict, JSON block as a dict)
+
+    with open(path, 'rb') as f:
+        values = struct.unpack(header_format, f.read(header_size))
+        if values[0] != magic:
+            raise ValueError(path + " isn't an AutoGrip pose stream")
+        header = dict(zip(('magic', 'version', 'hands', 'frames', 'fingers', 'joints',
+                           'first_frame', 'fps', 'json_length', 'data_offset'), values))
+        meta = json.loads(f.read(header['json_length']).decode('utf-8'))
+    if header['version'] > version:
+        raise ValueError(path + " is a newer pose stream (version " + str(header['version']) + ")")
+    return header, meta
+
+
+def read_stream(path):
+
+    # (header, meta, quaternions) with the quaternions memory mapped, not read
+    # in: (frames, hands, fingers, joints, 4)
+
+    header, meta = read_header(path)
+    shape = (header['frames'], header['hands'], header['fingers'], header['joints'], 4)
+    data = np.memmap(path, dtype=dtype, mode='r', offset=header['data_offset'], shape=shape)
+    return header, meta, data
+
+
+def canonical_quaternions(mapping, quaternions):
+
+    # (frames, fingers, joints, 4) from (frames, phalanges, 4) local rotations
+    # in mapping's phalange order, identity where the rig has no such joint
+
+    quaternions = np.asarray(quaternions)
+    present = mapping.rows >= 0
+    out = np.zeros((len(quaternions),) + mapping.rows.shape + (4,), dtype=dtype)
+    out[..., 0] = 1.0
+    out[:, present] = quaternions[:, mapping.rows[present]]
+    return out
@@ -31,6 +31,10 @@ have options for "Grip Target R" and "Grip Target L." These actually set the tar
 constraints to that other mesh you have selected, so the hand can grab on properly. You can also 
 set a different target later without having to run the initial setup again.
 
+"Find Grasp R" and "Find Grasp L" search the selected mesh for a spot to put the hand, closing the 
+fingers at a spread of points and wrist angles and keeping the ones where the most fingers touch 
+without sinking in. The redo panel steps through the next best proposals without searching again.
+
 I'm going to add more options to fine-tune the "collision" results, but most of the time, the 
 control bones will have all you need. Scaling them affects the offset of the shrinkwrap constraints
  and can help with a bit of clipping.
@@ -50,77 +54,36 @@ bl_info = {
 
 import bpy
 from bpy import context
+import bmesh
 import mathutils
-import numpy as np
-import math
+from mathutils import kdtree
+import csv
+import json
+import uuid
+
+# The geometry and solving lives in core, which doesn't need bpy. Only the rig
+# definitions are needed to register, so NumPy and the solvers load on first use.
+from . import core
+from .core import rigs
+
+np = core.lazy_import("numpy")
 
 # I put this prefix on all the constraints and such I make with this add-on,
 # so that they're easy to locate and remove on a reset
 prefix = "AutoGrip_"
 
 
-makehuman_dictionary = {
-        
-    "palm_index.L": ["f_index.01.L", "f_index.02.L", "f_index.03.L"],
-    "palm_middle.L": ["f_middle.01.L", "f_middle.02.L", "f_middle.03.L"],
-    "palm_ring.L": ["f_ring.01.L", "f_ring.02.L", "f_ring.03.L"],
-    "palm_pinky.L": ["f_pinky.01.L", "f_pinky.02.L", "f_pinky.03.L"],
-        
-    "palm_index.R": ["f_index.01.R", "f_index.02.R", "f_index.03.R"],
-    "palm_middle.R": ["f_middle.01.R", "f_middle.02.R", "f_middle.03.R"],
-    "palm_ring.R": ["f_ring.01.R", "f_ring.02.R", "f_ring.03.R"],
-    "palm_pinky.R": ["f_pinky.01.R", "f_pinky.02.R", "f_pinky.03.R"],
-        
-        
-    "thumb.01.L": ["thumb.02.L", "thumb.03.L"],
-    "thumb.01.R": ["thumb.02.R", "thumb.03.R"]
-}
-    
-rigify_dictionary = {
-    "ORG-palm.01.L": ["f_index.01.L", "f_index.02.L", "f_index.03.L"],
-    "ORG-palm.02.L": ["f_middle.01.L", "f_middle.02.L", "f_middle.03.L"],
-    "ORG-palm.03.L": ["f_ring.01.L", "f_ring.02.L", "f_ring.03.L"],
-    "ORG-palm.04.L": ["f_pinky.01.L", "f_pinky.02.L", "f_pinky.03.L"],
-        
-    "ORG-palm.01.R": ["f_index.01.R", "f_index.02.R", "f_index.02.R"],
-    "ORG-palm.02.R": ["f_middle.01.R", "f_middle.02.R", "f_middle.02.R"],
-    "ORG-palm.03.R": ["f_ring.01.R", "f_ring.02.R", "f_ring.03.R"],
-    "ORG-palm.04.R": ["f_pinky.01.R", "f_pinky.02.R", "f_pinky.03.R"],
-        
-    "ORG-thumb.01.L": ["thumb.02.L", "thumb.03.L"],
-    "ORG-thumb.01.R": ["thumb.02.R", "thumb.03.R"]
-}
-    
-autorig_dictionary = {
-    'c_index1_base.l': ['c_index1.l', 'c_index2.l', 'c_index3.l'],        
-    'c_middle1_base.l': ['c_middle1.l', 'c_middle2.l', 'c_middle3.l'],        
-    'c_ring1_base.l': ['c_ring1.l', 'c_ring2.l', 'c_ring3.l'],
-    'c_pinky1_base.l': ['c_pinky1.l', 'c_pinky2.l', 'c_pinky3.l'],        
-    'c_thumb1.l': ['c_thumb2.l', 'c_thumb3.l'],
-        
-    'c_index1_base.r': ['c_index1.r', 'c_index2.r', 'c_index3.r'],
-    'c_middle1_base.r': ['c_middle1.r', 'c_middle2.r', 'c_middle3.r'],    
-    'c_ring1_base.r': ['c_ring1.r', 'c_ring2.r', 'c_ring3.r'],        
-    'c_pinky1_base.r': ['c_pinky1.r', 'c_pinky2.r', 'c_pinky3.r'],
-    'c_thumb1.r': ['c_thumb2.r', 'c_thumb3.r'],
-}
-
 class fingerchain:
-    phalanges = []
-    control_bone = None
-    axis = ''
-    offset = 0.0
-    projectors = [] 
-    
-    palmroot = None
-    name = ''
-    
-    prop = None
-    control_layer = 29
-    project_layer = 30
-    
-    def __init__(self, boneslist, axis='x', name="Default", offset = 0.0):   # Use X as bend axis by default, unless
-                                               # set otherwise on initiation
+
+    # One finger's live bones. The rig-independent description of it (names, rest
+    # geometry, axis, offset, layers) lives in hand, a core.hand.HandModel shared
+    # by every finger on the same hand, at row index.
+
+    __slots__ = ('phalanges', 'control_bone', 'axis', 'offset', 'projectors', 'palmroot',
+                 'name', 'prop', 'control_layer', 'project_layer', 'hand', 'index')
+
+    def __init__(self, boneslist, axis='x', name="Default", offset = 0.0, hand=None, index=0):
+        # Use X as bend axis by default, unless set otherwise on initiation
         print("Finger created")
         self.phalanges = boneslist
         self.axis = axis
@@ -128,17 +91,19 @@ class fingerchain:
         self.palmroot = boneslist[0].parent
         self.name = name
         self.control_bone = None
-        
+        self.prop = None
+        self.hand = hand
+        self.index = index
+
+        if hand is None:
+            self.control_layer = 29
+            self.project_layer = 30
+        else:
+            self.control_layer = hand.control_layer
+            self.project_layer = hand.project_layer
+
         self.projectors = []
     
-    def setup(self):    # Setup: calls the functions to create projectors, 
-            # put IK constraints between phalanges and
-                        # those projectors, and create control bone
-        print("Setting up finger " + self.name)
-        self.create_projectors()    
-        self.constrain_IK()
-        self.create_control()
-    
     def view(self):
         print("\nFinger named " +self.name + ", of length " + str(len(self.phalanges)) + 
         ", starting bone " + self.phalanges[0].name, end = '')
@@ -167,160 +132,6 @@ class fingerchain:
             print(f.name, end=' ')
         print()
         
-    def create_control(self):    
-        # Creates control bone, does not rig up constraints for it
-        
-        # If it creates the control bones and tries to parent them to the hand when
-        # the model is in a pose, they end up offset. Still function correctly,
-        # but I'm putting it to rest position real quick to avoid that.
-        prev_position = activeArmature.pose_position
-        activeArmature.pose_position = 'REST'
-        
-        print("Creating control bone for finger " + self.name)
-        
-        palmroot_tail_loc = self.palmroot.tail       
-        palmroot_name = self.palmroot.name
-        #print("palmroot name is " + palmroot_name)
-        
-        postfix = palmroot_name[-1]
-        
-        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-        ebs = obj.data.edit_bones
-        
-        control = ebs.new("control_" + self.name + '.' + postfix)
-        
-        control.head = palmroot_tail_loc
-        
-        singlebone = self.palmroot
-        axis = self.axis
-        #print(axis)
-        
-        if type(axis) is str:
-            #print("axis is string")
-            if axis == '-x': 
-                translation = singlebone.x_axis 
-            elif axis == '-y':
-                translation = singlebone.y_axis
-            elif axis == '-z':
-                translation = singlebone.z_axis
-            elif axis == 'x':
-                translation = - singlebone.x_axis 
-            elif axis == 'y':
-                translation = - singlebone.y_axis
-            elif axis == 'z':
-                translation = - singlebone.z_axis
-        else:
-            print("no valid control axis found")
-            translation = (0.0, 0.0, 0.0)
-            
-        # It may be worth repeating the vector math to apply finger offset to this
-    
-        translation.length = singlebone.length  
-        
-        loc = control.head + mathutils.Vector(translation)
-
-        control.tail = loc
-        
-        control.parent = name_to_editbone(self.palmroot.name)
-        
-        control.use_deform = False
-        
-        control.align_roll(self.palmroot.y_axis)
-        
-        stringholder = control.name
-        
-        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-        
-        self.control_bone = name_to_posebone(stringholder)
-        
-        activeArmature.pose_position = prev_position
-        
-    def create_projectors(self):    
-        # Creates projectors, does not set up constraints
-         # Calls new_single_projector for each one
-        print("creating projectors for finger " + self.name)
-        
-        created_list = []
-        
-        chain = self.phalanges
-        palmroot = self.palmroot
-        
-        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
-        ebs = obj.data.edit_bones
-        
-        editchain = []
-        
-        for posebone in chain[:]:
-            namematch = name_to_editbone(posebone.name)
-            editchain.append(namematch)
-            
-        """
-    print("full editbones chain: ")
-        for printbone in editchain[:]:
-            print(printbone.name, end=' ')
-        print()
-    """
-        
-        #print("looping projector creation")
-        for phalange in editchain[:]:
-            created_list.append(self.new_single_projector(ebs, phalange))
-        
-        nameslist = []
-        for i in created_list:
-            nameslist.append(i.name)
-        
-        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
-                
-        for newprojector in nameslist:
-            posematch = name_to_posebone(newprojector)
-            self.projectors.append(posematch)
-            #print(newprojector + " added to " + self.name + " projectors list")
-            
-    def new_single_projector(self, editbones, singlebone):     
-        #Creates a single projector off a
-        # single phalange bone
-        #Singlebone needs to be editbone
-        
-        axis = self.axis
-        
-        #print("creating projector off bone " + singlebone.name)
-        first = editbones.new("projector_" + singlebone.name)
-        
-        if type(axis) is str:
-            #print('axis is string')
-            if axis == '-x':
-                translation = - singlebone.x_axis 
-            elif axis == '-y':
-                translation = - singlebone.y_axis
-            elif axis == '-z':
-                translation = - singlebone.z_axis
-            elif axis == 'x':
-                translation = singlebone.x_axis 
-            elif axis == 'y':
-                translation = singlebone.y_axis
-            elif axis == 'z':
-                translation = singlebone.z_axis
-        else:
-            print("no valid finger axis found")
-            translation = (0.0, 0.0, 0.0)
-        
-        if self.offset != 0:
-            print(self.name + " has a set offset of " + str(self.offset) + " radians")
-            translation = rotate_around(translation, singlebone.y_axis, self.offset)
-            
-        translation.length = singlebone.length  
-        #print(translation) 
-        
-        loc = singlebone.head + mathutils.Vector(translation)
-        #print(first.name + " loc: " + str(loc))
-        first.head = loc
-        first.tail = singlebone.tail
-        first.parent = singlebone.parent
-        first.length = first.length / 3
-        first.use_deform = False
-        
-        return first
-                
     def damped_track_projectors(self):   
         #Adds damped track modifiers to each projector, 
         # attaching them to the corresponding phalange
@@ -373,60 +184,12 @@ class fingerchain:
         for joint in self.phalanges:
             namestring = "projector_" + joint.name
             aim = obj.pose.bones[namestring]
-            addIK(joint, aim)
+            existing = joint.constraints.get(prefix + "IK")
+            if existing is None:
+                addIK(joint, aim)
+            elif existing.subtarget != aim.name:
+                existing.subtarget = aim.name
                 
-    def clean_layers(self):
-        
-        # Moves all the project bones and the control bone to designated layers.
-    # You'd expect this to take an input, but I defined that out in 
-    # set_armature_layers instead. May rearrange that for some clarity
-        
-        for joint in self.projectors:
-            i = 0
-            joint.bone.layers[self.project_layer] = True
-            # Doing this in a weird order bc it won't let me set all layers to false
-            while (i < 32):
-                if self.project_layer != i:
-                    joint.bone.layers[i] = False
-                i = i+1
-        i = 0
-        self.control_bone.bone.layers[self.control_layer] = True
-        while (i<32):
-            if self.control_layer != i:
-                self.control_bone.bone.layers[i] = False
-            i = i+1
-    
-    def set_armature_layers(self):
-        
-        rig_choice = bpy.props.EnumProperty(
-            name="Rig selection",
-            description="Select an option",
-            
-            items = [ 
-                ('MHX', "MHX", "MakeHuman Exchange"),
-                ('RFY', "Rigify", "Modular armature from the Rigify add-on"),
-                ('ARP', "AutoRig Pro", "Auto rig pro"),
-            ]
-        )
-    
-        rig_choice = obj.global_rig_choice
-        
-        if rig_choice == 'MHX':
-            if self.control_bone.name[-1] == 'R':
-                print("setting layer for RIGHT finger")
-                self.control_layer = 22
-            elif self.control_bone.name[-1] == 'L':
-                print("setting layer for LEFT finger")
-                self.control_layer = 6
-            self.project_layer = 24
-        elif rig_choice == 'RFY':
-            self.control_layer = 6
-            self.project_layer = 23
-        elif rig_choice == 'ARP':
-            self.control_layer = 16
-            self.project_layer = 16
-        self.clean_layers()
-            
     def reconstruct(self):
         # When the finger already has a bonechain, finds projectors and control bone
         
@@ -465,31 +228,23 @@ def name_to_bone(key):
     return obj.data.bones[key]
 def name_to_posebone(key):
     return obj.pose.bones[key]
+
+def use_armature(armature):
+    
+    # Points everything at an armature the way the operators do with the active
+    # object, for running things from scripts and the command line
+    
+    global obj
+    obj = armature
+    global activeArmature
+    activeArmature = armature.data
     
     
-def rotation_matrix(axis, theta):
-    #This is from here https://stackoverflow.com/questions/6802577/rotation-of-3d-vector
-    """
-    Return the rotation matrix associated with counterclockwise rotation about
-    the given axis by theta radians.
-    """
-    axis = np.asarray(axis)
-    axis = axis / math.sqrt(np.dot(axis, axis))
-    a = math.cos(theta / 2.0)
-    b, c, d = -axis * math.sin(theta / 2.0)
-    aa, bb, cc, dd = a * a, b * b, c * c, d * d
-    bc, ad, ac, ab, bd, cd = b * c, a * d, a * c, a * b, b * d, c * d
-    return np.array([[aa + bb - cc - dd, 2 * (bc + ad), 2 * (bd - ac)],
-                     [2 * (bc - ad), aa + cc - bb - dd, 2 * (cd + ab)],
-                     [2 * (bd + ac), 2 * (cd - ab), aa + dd - bb - cc]])
-
 def rotate_around(source, rotationaxis, offset):
     
-    # Calls rotation_matrix in a way that's useful to me
+    # core.geometry.rotate_around, handing back a Vector
     
-    arr = np.dot(rotation_matrix(rotationaxis, offset), source)
-    vector_arr = mathutils.Vector(tuple(arr))
-    return vector_arr    
+    return mathutils.Vector(tuple(core.geometry.rotate_around(source, rotationaxis, offset)))
 
 def addIK(posebone, target):
     
@@ -526,184 +281,271 @@ def create_single_shrinkwrap(projectorbone):
     #setting distance relative to bone length for the moment. Not perfect but it will do
     newProject.distance = 0.15 * projectorbone.length 
         
+def bone_arrays(bones, matrix="matrix_local", head="head_local", tail="tail_local"):
+    
+    # Matrices (bones, 4, 4), heads and tails (bones, 3) of every bone in a bones
+    # or edit_bones collection, in armature space, read in bulk rather than bone by bone
+    
+    count = len(bones)
+    matrices = np.empty(count * 16, dtype=np.float32)
+    heads = np.empty(count * 3, dtype=np.float32)
+    tails = np.empty(count * 3, dtype=np.float32)
+    bones.foreach_get(matrix, matrices)
+    bones.foreach_get(head, heads)
+    bones.foreach_get(tail, tails)
+    # foreach_get hands matrices over column by column
+    matrices = matrices.reshape(count, 4, 4).transpose(0, 2, 1)
+    return matrices, heads.reshape(count, 3), tails.reshape(count, 3)
+
+def rest_arrays(armature):
+    return bone_arrays(armature.data.bones)
+
+def hand_model(handbone):
+    
+    # The core.hand.HandModel for the hand hanging off handbone: planned from the
+    # rig type, bones looked up by index, rest pose read in one go. Fingers the
+    # armature doesn't have are left out.
+    
+    model = core.hand.HandModel.plan(obj.global_rig_choice, handbone.name[-1])
+    for palm in model.find_bones(obj.data.bones.find):
+        print("\n", palm, "FINGER NOT FOUND.")
+    # The palm is whatever the rig actually parents the finger to, which on
+    # Rigify isn't the ORG- bone the dictionary is keyed on
+    bones = obj.data.bones
+    parents = [bones[model.phalange_names[start]].parent for start in model.starts]
+    model.palm_index = np.array([index if parent is None else bones.find(parent.name)
+        for parent, index in zip(parents, model.palm_index)], dtype=np.int32)
+    model.read_rest(*rest_arrays(obj))
+    return model
+
 def assemble_hand(handbone):
     
     # Puts likely finger bones together in chains, 
-    # then makes basic fingers out of them. Most of the rewriting to let this work on 
-    # other armatures happens here.
+    # then makes basic fingers out of them. Which bones and which way they bend
+    # comes from the hand model, this just hands each finger its pose bones.
      
     # Returns a list of fingers
     
-    rig_choice = bpy.props.EnumProperty(
-        name="Rig selection",
-        description="Select an option",
-        
-        items = [ 
-            ('MHX', "MHX", "MakeHuman Exchange"),
-            ('RFY', "Rigify", "Modular armature from the Rigify add-on"),
-            ('ARP', "AutoRig Pro", "Auto rig pro"),
-            ('GUESS', "Best Guess", "Any armature this doesn't explicitly support. Unreliable"),
-        ]
-    )
-    
-    rig_choice = obj.global_rig_choice
+    print("Assembling hand off of " + handbone.name + ", with rig choice " + obj.global_rig_choice)
     
-    fingerlist = []
-    fingerroots = []
+    model = hand_model(handbone)
+    posebones = obj.pose.bones
     
-    print("Assembling hand off of " + handbone.name + ", with rig choice " + rig_choice)
+    return [fingerchain([posebones[j] for j in model.phalange_names[model.rows(i)]],
+                        model.axes[i], model.finger_names[i], float(model.offsets[i]), model, i)
+            for i in range(len(model))]
+
+def finger_model(fingers):
     
-    chosen_dictionary = {}
+    # The hand model covering just these fingers (all from the same hand)
     
-    if rig_choice == 'MHX':
-        chosen_dictionary = makehuman_dictionary
-    elif rig_choice == "RFY":
-        chosen_dictionary = rigify_dictionary
-    elif rig_choice == "ARP":
-        chosen_dictionary = autorig_dictionary
-        
-    print("choice = " + rig_choice)
-    direction = handbone.name[-1]
+    model = fingers[0].hand
+    indices = [f.index for f in fingers]
+    if indices == list(range(len(model))):
+        return model
+    return model.subset(indices)
+
+def build_hand_bones(fingers):
     
+    # Creates the projectors and control bones for all these fingers (all from the
+    # same hand) in a single trip into edit mode. Where they go is worked out for
+    # every bone at once by the hand model from the edit bones' arrays, and the
+    # heads and tails are written back in bulk. Doesn't set up constraints.
     
-    for key in chosen_dictionary:
-        if key[-1] == direction:
-            print("# " + key)
-            fingerroots.append(obj.pose.bones[key])     
-            
-    # And then THIS assembles the fingers off each palm. I've got a dictionary set up 
-    # that tells it the whole list of fingers it should be looking for for 
-    # each rig type. Elegant? No. Fast? Yes
+    # If it creates the control bones and tries to parent them to the hand when
+    # the model is in a pose, they end up offset. Still function correctly,
+    # but I'm putting it to rest position real quick to avoid that.
+    prev_position = activeArmature.pose_position
+    activeArmature.pose_position = 'REST'
     
-    # Now that I've got all 3 options using a dictionary, I should probably
-    # merge more of these into one function
+    model = finger_model(fingers)
+    print("Creating projectors and control bones for " + str(len(fingers)) + " fingers")
     
-    for loop_palm in fingerroots:
-        try:
-            print()
-            bonechain = []
-            
-            nameslist = chosen_dictionary[loop_palm.name]
+    bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+    ebs = obj.data.edit_bones
+    
+    matrices, heads, tails = bone_arrays(ebs, "matrix", "head", "tail")
+    rows = np.array([ebs.find(name) for name in model.phalange_names])
+    # The palm is whatever the rig actually parents the finger to
+    palms = [ebs[f.phalanges[0].name].parent for f in fingers]
+    palm_rows = np.array([ebs.find(p.name) for p in palms])
+    
+    projector_heads, projector_tails = model.projector_points(matrices[rows], heads[rows], tails[rows])
+    control_heads, control_tails = model.control_points(matrices[palm_rows], heads[palm_rows],
+        tails[palm_rows])
+    
+    created = []
+    for name, row in zip(model.projector_names(), rows):
+        projector = ebs.new(name)
+        projector.parent = ebs[int(row)].parent
+        projector.use_deform = False
+        created.append(projector)
+    controls = []
+    for name, palm in zip(model.control_names(), palms):
+        control = ebs.new(name)
+        control.parent = palm
+        control.use_deform = False
+        controls.append(control)
+    created += controls
+    
+    # One write for every new bone's head and tail
+    new_rows = np.array([ebs.find(b.name) for b in created])
+    heads = np.empty(len(ebs) * 3, dtype=np.float32)
+    tails = np.empty(len(ebs) * 3, dtype=np.float32)
+    ebs.foreach_get("head", heads)
+    ebs.foreach_get("tail", tails)
+    heads = heads.reshape(-1, 3)
+    tails = tails.reshape(-1, 3)
+    heads[new_rows] = np.concatenate([projector_heads, control_heads])
+    tails[new_rows] = np.concatenate([projector_tails, control_tails])
+    ebs.foreach_set("head", heads.ravel())
+    ebs.foreach_set("tail", tails.ravel())
+    
+    for control, palm in zip(controls, palms):
+        control.align_roll(palm.y_axis)
+    
+    projector_names = [b.name for b in created[:len(rows)]]
+    control_names = [b.name for b in controls]
+    
+    bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+    
+    for i, f in enumerate(fingers):
+        f.projectors = [name_to_posebone(n) for n in projector_names[model.rows(i)]]
+        f.control_bone = name_to_posebone(control_names[i])
+    
+    activeArmature.pose_position = prev_position
 
-            for j in nameslist:
-                print(j, end=', ')
-                bonechain.append(obj.pose.bones[j])
-                
-            if rig_choice == 'ARP':
-                rootname = loop_palm.name
-                fingername = rootname.split('_')[1]
-                fingername = fingername[:-1]
-            else:
-                fingername = bonechain[0].basename
-                
-            
-            if 'thumb' in fingername:
-                if rig_choice == 'MHX':
-                    if bonechain[0].name == "thumb.02.L":
-                        print("\nCREATING LEFT MAKEHUMAN THUMB")
-                        newfinger = fingerchain(bonechain, 'z', fingername, 0.8)
-                    elif bonechain[0].name ==  "thumb.02.R":
-                        print("\nCREATING RIGHT MAKEHUMAN THUMB")
-                        newfinger = fingerchain(bonechain, 'z', fingername, -0.8)
-                elif rig_choice == 'RFY':
-                    if bonechain[0].name == "thumb.02.L":
-                        print("\nCREATING LEFT RIGIFY THUMB")
-                        newfinger = fingerchain(bonechain, 'z', fingername, -0.7)
-                    elif bonechain[0].name ==  "thumb.02.R":
-                        print("\nCREATING RIGHT RIGIFY THUMB")
-                        newfinger = fingerchain(bonechain, 'z', fingername, 0.7)
-                elif rig_choice == 'ARP':
-                    print("\nCREATING AUTORIG THUMB")
-                    newfinger = fingerchain(bonechain, '-z', fingername)
-                    
-            else:
-                print("creating other finger")
-                if rig_choice == 'ARP':
-                    newfinger = fingerchain(bonechain, '-z', fingername)
-                else:
-                    newfinger = fingerchain(bonechain, 'z', fingername)
-            
-            fingerlist.append(newfinger)
-        except:
-            print("\n",aloop_palm.name, "FINGER NOT FOUND.")
-        
-    return fingerlist
+def ik_driver_path(phalange_name):
+    return 'pose.bones["' + phalange_name + '"].constraints["' + prefix + 'IK"].influence'
 
-def control_drivers(finger):
+def shrinkwrap_driver_path(projector_name):
+    return 'pose.bones["' + projector_name + '"].constraints["' + prefix + 'shrinkwrap"].distance'
+
+def existing_drivers():
     
-    # Puts rotation limits on control bone, then hooks up the influence of all those IK constraints
-    # to depend on control bone rotation. Maybe the rotation limit part should be somewhere else
+    # The armature's driver F-curves, or None if it has no animation data yet
     
-    finger.control_bone.rotation_mode = "XYZ"
+    return obj.animation_data.drivers if obj.animation_data else None
+
+def missing_drivers(finger, drivers=None):
+    
+    # Whether any of a finger's IK influence or shrinkwrap distance drivers are gone
     
-    print("\nApplying rotation limits to " + finger.name + " control bone")
-    rotationlock = finger.control_bone.constraints.new("LIMIT_ROTATION")
-    rotationlock.owner_space = "LOCAL"
-    rotationlock.name = prefix + "Rotation Limit"
-    rotationlock.use_limit_x = True
-    rotationlock.max_x = 3.14159 / 2
-    rotationlock.use_limit_y = True
-    rotationlock.use_limit_z = True
-    
-    print("Applying angle drivers")
-    for joint in finger.phalanges:
-        #print('driver for bone ' + joint.name)
-        driver = obj.driver_add('pose.bones["' + joint.name + '"].constraints["' + prefix + 'IK"].influence').driver 
-        v = driver.variables.new()
-        v.name = 'gripcontrol'
-        
-        v.targets[0].id        = obj
-        v.targets[0].data_path = 'pose.bones["' + finger.control_bone.name + '"].rotation_euler[0]'
-        
-        driver.expression = v.name + " * 0.637"
-        
-    print("Applying scale drivers")
-    for p in finger.projectors:
-        #print(p.name)
-        stringholder = p.name
-        scaledriver = obj.driver_add('pose.bones["' + stringholder + '"].constraints["' + prefix 
-        + 'shrinkwrap"].distance').driver
-        v = scaledriver.variables.new()
-        v.name = 'gripscale'
-        
-        v.targets[0].id = obj
-        v.targets[0].data_path = 'pose.bones["' + finger.control_bone.name + '"].scale[0]'
-        
-        scaledriver.expression = v.name + " * 0.005"
+    if drivers is None:
+        drivers = existing_drivers()
+    if drivers is None:
+        return True
+    paths = [ik_driver_path(j.name) for j in finger.phalanges]
+    paths += [shrinkwrap_driver_path(p.name) for p in finger.projectors]
+    return any(drivers.find(path) is None for path in paths)
 
-def find_hand_root(direction):
+# Every driver AutoGrip makes reads one channel off a finger's control bone
+# through a single variable, into an expression Blender's simple expression
+# evaluator runs without going through Python. By template name:
+# (variable name, control bone channel, expression)
+driver_templates = {
+    'curl': ('gripcontrol', 'rotation_euler[0]', "gripcontrol * 0.637"),
+    'thickness': ('gripscale', 'scale[0]', None),
+}
+
+def driver_specs(fingers, radii=None):
+    
+    # (driven data path, template, control bone name, expression) for every IK
+    # influence and shrinkwrap distance driver on these fingers. Shrinkwrap
+    # expressions come from radii (measured skin thickness per phalange).
+    
+    radii = radii or {}
+    specs = []
+    for f in fingers:
+        control = f.control_bone.name
+        specs += [(ik_driver_path(j.name), 'curl', control, driver_templates['curl'][2])
+                  for j in f.phalanges]
+        specs += [(shrinkwrap_driver_path(p.name), 'thickness', control,
+                   thickness_expression(p.name, radii)) for p in f.projectors]
+    return specs
+
+def build_drivers(specs):
+    
+    # Creates every driver in specs in one pass. The armature's driver F-curves
+    # are indexed once up front; ones that already exist are re-used and only
+    # touched where they differ from the spec, and new ones come from
+    # drivers.new, which (unlike driver_add) doesn't put a Generator modifier on
+    # every curve for each evaluation to run through. Returns how many were new.
+    
+    if obj.animation_data is None:
+        obj.animation_data_create()
+    drivers = obj.animation_data.drivers
+    existing = {fcurve.data_path: fcurve for fcurve in drivers if fcurve.array_index == 0}
+    
+    created = 0
+    slow = []
+    for path, template, control, expression in specs:
+        name, channel, _ = driver_templates[template]
+        source = 'pose.bones["' + control + '"].' + channel
+        fcurve = existing.get(path)
+        if fcurve is None:
+            fcurve = drivers.new(path)
+            created += 1
+        driver = fcurve.driver
+        if driver.type != 'SCRIPTED':
+            driver.type = 'SCRIPTED'
+        
+        variables = driver.variables
+        if not (len(variables) == 1 and variables[0].name == name and
+                variables[0].type == 'SINGLE_PROP' and variables[0].targets[0].id == obj and
+                variables[0].targets[0].data_path == source):
+            for v in list(variables):
+                variables.remove(v)
+            v = variables.new()
+            v.name = name
+            v.type = 'SINGLE_PROP'
+            v.targets[0].id = obj
+            v.targets[0].data_path = source
+        if driver.expression != expression:
+            driver.expression = expression
+        if driver.use_self:
+            driver.use_self = False
+        if not driver.is_simple_expression:
+            slow.append(path)
+    
+    if slow:
+        print(str(len(slow)) + " AutoGrip drivers can't use the simple expression evaluator, first: " +
+            slow[0])
+    return created
+
+def limit_control(finger):
     
-    rig_choice = bpy.props.EnumProperty(
-        name="Rig selection",
-        description="Select an option",
-        
-        items = [ 
-            ('MHX', "MHX", "MakeHuman Exchange"),
-            ('RFY', "Rigify", "Modular armature from the Rigify add-on"),
-            ('ARP', "AutoRig Pro", "Auto rig pro"),
-            ('GUESS', "Best Guess", "Any armature this doesn't explicitly support. Unreliable"),
-        ]
-    )
+    # Keeps a finger's control bone from curling it past closed
     
-    rig_choice = obj.global_rig_choice
+    finger.control_bone.rotation_mode = "XYZ"
+    if finger.control_bone.constraints.get(prefix + "Rotation Limit") is None:
+        print("\nApplying rotation limits to " + finger.name + " control bone")
+        rotationlock = finger.control_bone.constraints.new("LIMIT_ROTATION")
+        rotationlock.owner_space = "LOCAL"
+        rotationlock.name = prefix + "Rotation Limit"
+        rotationlock.use_limit_x = True
+        rotationlock.max_x = 3.14159 / 2
+        rotationlock.use_limit_y = True
+        rotationlock.use_limit_z = True
+
+def control_drivers(fingers, radii=None):
+    
+    # Puts rotation limits on each control bone, then hooks the influence of all
+    # those IK constraints up to the control bone rotation, and the shrinkwrap
+    # distances up to its scale, for every finger at once. Drivers that are
+    # already there are re-used, so this can be run again to fill gaps.
+    
+    radii = radii or {}
+    for finger in fingers:
+        limit_control(finger)
+    print("Applying angle and scale drivers")
+    return build_drivers(driver_specs(fingers, radii))
+
+def find_hand_root(direction):
     
     try:
-        if rig_choice == 'MHX':
-            if direction.lower() == 'l':
-                return obj.pose.bones['hand0.L']
-            elif direction.lower() == 'r':
-                return obj.pose.bones['hand0.R']
-        elif rig_choice == 'RFY':
-            if direction.lower() == 'l':
-                return obj.pose.bones['DEF-hand.L']
-            elif direction.lower() == 'r':
-                return obj.pose.bones['DEF-hand.R']
-        elif rig_choice == 'ARP':
-            if direction.lower() == 'r':
-                return obj.pose.bones['hand.r']
-            elif direction.lower() == 'l':
-                return obj.pose.bones['hand.l']
-    except:
+        return obj.pose.bones[rigs.hand_root_name(obj.global_rig_choice, direction)]
+    except KeyError:
         # I'm trying to figure out how to report a more elegant error to the user if they're
         # on the wrong rig, without them needing to have open a console view. This is
         # not ideal but it'll take more research.
@@ -713,19 +555,389 @@ def find_hand_root(direction):
 def setup_hand(targetroot):
     
     # Takes a root hand bone, calls assemble_hand to get a list of fingers out of it
-    # Then runs setup(), damped_track_projectors(), control_drivers(), and add_shrinkwraps()
-    # on each one
+    # Then builds every finger's bones in one go, runs constrain_IK(),
+    # damped_track_projectors() and add_shrinkwraps() on each one, and
+    # control_drivers() on all of them together
     
     # Needs to run control_drivers after add_shrinkwraps
     
     fingers_list = assemble_hand(targetroot)
+    radii = finger_radii(fingers_list)
+    build_hand_bones(fingers_list)
          
     for finger in fingers_list:
-        finger.setup()
+        finger.constrain_IK()
         finger.damped_track_projectors()
         finger.add_shrinkwraps()
-        control_drivers(finger)
-        finger.set_armature_layers()
+    control_drivers(fingers_list, radii)
+    place_layers(fingers_list)
+
+def layer_placements(fingers):
+    
+    # (bone name, layer) for every projector and control bone on these fingers.
+    # The layers come from the rig definition, through each finger's hand model.
+    
+    placements = []
+    for f in fingers:
+        if f.control_bone is not None:
+            placements.append((f.control_bone.name, f.control_layer))
+        placements += [(p.name, f.project_layer) for p in f.projectors]
+    return placements
+
+def bone_collection(armature, name):
+    collection = armature.collections.get(name)
+    if collection is None:
+        collection = armature.collections.new(name)
+    return collection
+
+def place_layers(fingers):
+    
+    # Puts every projector and control bone on these fingers on its layer, and
+    # only that layer, in one write for the whole armature: every bone's layers
+    # read into an array, these bones' rows replaced, and the lot set back.
+    # Blender 4 has bone collections instead of layers, so there each layer
+    # becomes the collection the rig definition names for it.
+    
+    placements = layer_placements(fingers)
+    if not placements:
+        return
+    armature = obj.data
+    bones = armature.bones
+    
+    if hasattr(armature, "collections"):
+        for name, layer in placements:
+            bone = bones[name]
+            wanted = bone_collection(armature, rigs.collection_for(obj.global_rig_choice, layer))
+            for collection in list(bone.collections):
+                if collection != wanted:
+                    collection.unassign(bone)
+            wanted.assign(bone)
+        return
+    
+    layers = np.zeros(len(bones) * 32, dtype=bool)
+    bones.foreach_get("layers", layers)
+    layers = layers.reshape(len(bones), 32)
+    rows = np.array([bones.find(name) for name, layer in placements])
+    layers[rows] = False
+    layers[rows, [layer for name, layer in placements]] = True
+    bones.foreach_set("layers", layers.ravel())
+    armature.update_tag()
+
+def layers_stale(finger):
+    
+    # Whether a finger's projectors or control bone have strayed off their layers
+    
+    armature = obj.data
+    for name, layer in layer_placements([finger]):
+        bone = armature.bones[name]
+        if hasattr(armature, "collections"):
+            wanted = rigs.collection_for(obj.global_rig_choice, layer)
+            if [c.name for c in bone.collections] != [wanted]:
+                return True
+        elif not bone.layers[layer] or sum(bone.layers) != 1:
+            return True
+    return False
+
+def sync_hand(handroot):
+    
+    # Brings a hand up to date with what setup_hand would have made, touching only
+    # what's missing or stale: fingers that have lost any of their bones (or are
+    # new to the rig) are stripped and rebuilt, and on the rest only missing
+    # constraints, drivers, layers and grip targets get put back. On a hand
+    # that's intact this only reads. Returns how many fingers it fixed.
+    
+    fingers = assemble_hand(handroot)
+    model = finger_model(fingers)
+    bones = obj.data.bones
+    target = None
+    
+    projectors = model.projector_names()
+    controls = model.control_names()
+    broken = [i for i in range(len(model))
+        if controls[i] not in bones or any(n not in bones for n in projectors[model.rows(i)])]
+    
+    if broken:
+        print("Rebuilding " + ", ".join(model.finger_names[i] for i in broken))
+        # Hang on to the grip target in case every finger is being rebuilt
+        for f in fingers:
+            f.projectors = [obj.pose.bones[n] for n in projectors[model.rows(f.index)] if n in bones]
+        target = hand_target(fingers)
+        strip_hand(model.subset(broken))
+        fingers = assemble_hand(handroot)
+        build_hand_bones([fingers[i] for i in broken])
+        # Edit mode leaves every pose bone reference stale, so look them all up again
+        fingers = assemble_hand(handroot)
+    
+    for f in fingers:
+        f.reconstruct()
+    if target is None:
+        target = hand_target(fingers)
+    
+    drivers = existing_drivers()
+    needs_drivers = [f for f in fingers if f.index in broken or missing_drivers(f, drivers)]
+    radii = finger_radii(needs_drivers) if needs_drivers else {}
+    
+    fixed = 0
+    moved = []
+    redrive = []
+    for f in fingers:
+        rebuilt = f.index in broken
+        # Cheap checks first, so an intact finger costs a handful of lookups
+        stale_ik = rebuilt or any(j.constraints.get(prefix + "IK") is None or
+            j.constraints[prefix + "IK"].subtarget != "projector_" + j.name for j in f.phalanges)
+        stale_wrap = rebuilt or any(not any('hrinkwrap' in c.name for c in p.constraints)
+            for p in f.projectors)
+        stale_drivers = (f in needs_drivers or
+            f.control_bone.constraints.get(prefix + "Rotation Limit") is None)
+        stale_layers = rebuilt or layers_stale(f)
+        
+        if stale_ik:
+            f.constrain_IK()
+        if rebuilt:
+            f.damped_track_projectors()
+        if stale_wrap:
+            f.add_shrinkwraps()
+        if stale_drivers:
+            redrive.append(f)
+        if stale_layers:
+            moved.append(f)
+        
+        untargeted = target is not None and any(c.target is None for p in f.projectors
+            for c in p.constraints if 'hrinkwrap' in c.name)
+        if untargeted:
+            f.target_shrinkwraps(target)
+        
+        if stale_ik or stale_wrap or stale_drivers or stale_layers or untargeted:
+            print("Synced finger " + f.name)
+            fixed += 1
+    
+    if redrive:
+        control_drivers(redrive, radii)
+    place_layers(moved)
+    return fixed
+
+# AutoGrip's own undo. Setting up, syncing, targeting and quick posing still
+# push a normal undo step, so Ctrl+Z always lands on them. With Light Undo on,
+# each one also records what it created and changed here, and Undo AutoGrip
+# takes just that back, even after other edits. It's a convenience, not a
+# speed-up: the record costs a snapshot before and after, on top of the normal
+# step, so it's off unless asked for. Steps are kept per armature, newest
+# last, under an id written on the armature's data (so renaming doesn't lose
+# them), and don't survive closing the file.
+#
+# Every step gets a serial number that's also written on the armature, so the
+# file says which steps it contains: Ctrl+Z takes the serial back with
+# everything else, and those steps stop being offered until they're redone.
+change_log = {}
+change_log_depth = 32
+
+def log_key(armature, create=False):
+
+    # What an armature's steps are logged under, made the first time one is
+    # logged
+
+    key = armature.data.get(prefix + 'undo_log')
+    if key is None and create:
+        key = uuid.uuid4().hex
+        armature.data[prefix + 'undo_log'] = key
+    return key
+
+def logged_steps(armature):
+
+    # Steps on this armature that are still in the file, oldest first
+
+    if armature.data is None:
+        return []
+    serial = armature.data.get(prefix + 'undo_serial', 0)
+    return [step for step in change_log.get(log_key(armature), []) if step['serial'] <= serial]
+
+def autogrip_state():
+    
+    # Just enough of the armature to tell afterwards what an operator did:
+    # bone names, AutoGrip constraints and their targets, AutoGrip drivers,
+    # every pose bone's transform channels, and the set up flags
+    
+    posebones = obj.pose.bones
+    constraints = {}
+    for bone in posebones:
+        for c in bone.constraints:
+            if prefix in c.name:
+                target = getattr(c, 'target', None)
+                constraints[(bone.name, c.name)] = None if target is None else target.name
+    
+    drivers = existing_drivers()
+    paths = set() if drivers is None else {d.data_path for d in drivers if prefix in d.data_path}
+    
+    count = len(posebones)
+    channels = {}
+    for channel, width in (("location", 3), ("rotation_euler", 3), ("rotation_quaternion", 4)):
+        values = np.empty(count * width, dtype=np.float32)
+        posebones.foreach_get(channel, values)
+        channels[channel] = values.reshape(count, width)
+    
+    flags = {side: activeArmature.get(prefix + 'hand_' + side) for side in ('L', 'R')}
+    
+    return {'bones': list(obj.data.bones.keys()), 'constraints': constraints, 'drivers': paths,
+        'channels': channels, 'flags': flags}
+
+def undo_snapshot():
+
+    # The autogrip_state an operator hands to log_changes, or None with light
+    # undo off, which costs nothing
+
+    return autogrip_state() if obj.autogrip_light_undo else None
+
+def log_changes(label, before):
+    
+    # Compares the armature with a snapshot from undo_snapshot and records the
+    # difference as one step. With light undo off, there's only the normal undo
+    # step the operator pushes.
+    
+    if before is None:
+        return None
+    
+    after = autogrip_state()
+    old_bones = set(before['bones'])
+    names = after['bones']
+    
+    step = {'label': label}
+    step['bones'] = [name for name in names if name not in old_bones]
+    created = set(step['bones'])
+    step['constraints'] = [key for key in after['constraints']
+        if key not in before['constraints'] and key[0] not in created]
+    step['drivers'] = sorted(after['drivers'] - before['drivers'])
+    step['targets'] = [(key, target) for key, target in before['constraints'].items()
+        if key in after['constraints'] and after['constraints'][key] != target]
+    
+    # Pose channels, only for bones that were there before and only where they moved
+    channels = []
+    if len(names) == len(before['bones']) and names == before['bones']:
+        for channel, values in before['channels'].items():
+            moved = np.flatnonzero(np.any(values != after['channels'][channel], axis=1))
+            channels += [(names[i], channel, tuple(float(v) for v in values[i])) for i in moved]
+    step['channels'] = channels
+    step['flags'] = {side: value for side, value in before['flags'].items()
+        if after['flags'][side] != value}
+    
+    if not any(step[key] for key in ('bones', 'constraints', 'drivers', 'targets', 'channels', 'flags')):
+        return None
+    
+    # Anything logged past the file's serial was undone with Ctrl+Z, and this
+    # step replaces it
+    serial = activeArmature.get(prefix + 'undo_serial', 0) + 1
+    step['serial'] = serial
+    activeArmature[prefix + 'undo_serial'] = serial
+    
+    invalidate_panel()
+    steps = change_log.setdefault(log_key(obj, create=True), [])
+    steps[:] = [s for s in steps if s['serial'] < serial]
+    steps.append(step)
+    del steps[:-change_log_depth]
+    return step
+
+def revert_step(step):
+    
+    # Takes one logged step back off the active armature. Anything that's since
+    # been renamed or deleted by hand is skipped.
+    
+    invalidate_panel()
+    posebones = obj.pose.bones
+    
+    drivers = existing_drivers()
+    if drivers is not None:
+        for path in step['drivers']:
+            fcurve = drivers.find(path)
+            if fcurve is not None:
+                drivers.remove(fcurve)
+    
+    for bone_name, constraint_name in step['constraints']:
+        bone = posebones.get(bone_name)
+        if bone is not None and bone.constraints.get(constraint_name) is not None:
+            bone.constraints.remove(bone.constraints[constraint_name])
+    
+    for (bone_name, constraint_name), target in step['targets']:
+        bone = posebones.get(bone_name)
+        c = None if bone is None else bone.constraints.get(constraint_name)
+        if c is not None:
+            c.target = None if target is None else bpy.data.objects.get(target)
+    
+    for bone_name, channel, values in step['channels']:
+        bone = posebones.get(bone_name)
+        if bone is not None:
+            setattr(bone, channel, values)
+    
+    for side, value in step['flags'].items():
+        if value is None:
+            activeArmature.pop(prefix + 'hand_' + side, None)
+        else:
+            activeArmature[prefix + 'hand_' + side] = value
+    
+    doomed = [name for name in step['bones'] if name in obj.data.bones]
+    if doomed:
+        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+        ebs = activeArmature.edit_bones
+        for name in doomed:
+            ebs.remove(ebs[name])
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)
+
+class UndoAutoGrip(bpy.types.Operator):
+    """Take back the last AutoGrip setup, sync, target or quick pose on this armature"""
+    bl_idname = "object.autogrip_undo"
+    bl_label = "Undo AutoGrip"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    @classmethod
+    def poll(cls, context):
+        active = context.active_object
+        return active is not None and bool(logged_steps(active))
+
+    def execute(self, context):
+
+        global obj 
+        obj = bpy.context.active_object
+        
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+        
+        # The step stays logged; dropping the serial below it is what marks it
+        # undone, so a Ctrl+Z of this brings it back along with the file
+        step = logged_steps(obj)[-1]
+        revert_step(step)
+        activeArmature[prefix + 'undo_serial'] = step['serial'] - 1
+        self.report({'INFO'}, "Undid " + step['label'])
+        return {'FINISHED'}
+
+class AutoGripSync(bpy.types.Operator):
+    """Repair or extend the AutoGrip setup on both hands, only rebuilding what's missing"""
+    bl_idname = "object.autogrip_sync"
+    bl_label = "Sync Setup"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+
+        global obj 
+        obj = bpy.context.active_object
+        
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+        before = undo_snapshot()
+        
+        fixed = 0
+        synced = 0
+        for side in ('L', 'R'):
+            if not activeArmature.get(prefix + 'hand_' + side):
+                continue
+            fixed += sync_hand(find_hand_root(side))
+            synced += 1
+        
+        if synced == 0:
+            self.report({'WARNING'}, "No hands are set up yet, run Setup first")
+        elif fixed == 0:
+            self.report({'INFO'}, "Everything's in place")
+        else:
+            self.report({'INFO'}, "Fixed " + str(fixed) + " fingers")
+        log_changes(self.bl_label, before)
+        return {'FINISHED'}
 
 class AutoGripSetup(bpy.types.Operator):
     """Set up AutoGrip rig"""
@@ -741,6 +953,7 @@ class AutoGripSetup(bpy.types.Operator):
         
         global activeArmature
         activeArmature = bpy.context.active_object.data
+        before = undo_snapshot()
         print("skeleton is " + activeArmature.name)
             
         lefthandroot = find_hand_root('L')
@@ -769,6 +982,7 @@ class AutoGripSetup(bpy.types.Operator):
             activeArmature[(prefix + 'hand_R')] = True
         
 
+        log_changes(self.bl_label, before)
         return {'FINISHED'}
             
             
@@ -779,193 +993,2324 @@ class AutoGripLeft(bpy.types.Operator):
     bl_options = {'REGISTER', 'UNDO'}
 
     def execute(self, context):
-        print("\n~~~~~~~~~~~START~~~~~~~~~~~~\n")
-        
-        global obj 
+        print("\n~~~~~~~~~~~START~~~~~~~~~~~~\n")
+        
+        global obj 
+        obj = bpy.context.active_object
+        
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+        before = undo_snapshot()
+        
+        print("skeleton is " + activeArmature.name)
+        
+        if (prefix + 'hand_L') in activeArmature:
+            if activeArmature[(prefix + 'hand_L')] == True:
+                print("Left hand already set up.")
+                return {'FINISHED'}
+            
+        # I'm gonna wrap this up better into a find_handroot function
+        
+        lefthandroot = find_hand_root('l')
+        
+        setup_hand(lefthandroot)
+        
+        activeArmature[(prefix + 'hand_L')] = True
+        
+        log_changes(self.bl_label, before)
+        return {'FINISHED'}
+    
+
+            
+class AutoGripRight(bpy.types.Operator):
+    """Set up AutoGrip rig for right hand only"""
+    bl_idname = "object.autogrip_setup_right"
+    bl_label = "Setup Right"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        print("\n~~~~~~~~~~~START~~~~~~~~~~~~\n")
+        
+        global obj 
+        obj = bpy.context.active_object
+        
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+        before = undo_snapshot()
+        print("skeleton is " + activeArmature.name)
+        
+        if (prefix + 'hand_R') in activeArmature:
+            if activeArmature[(prefix + 'hand_R')] == True:
+                print("Right hand already set up.")
+                return {'FINISHED'}
+
+        righthandroot = find_hand_root('r')
+        
+        setup_hand(righthandroot)
+        
+        activeArmature[(prefix + 'hand_R')] = True
+        
+        log_changes(self.bl_label, before)
+        return {'FINISHED'}
+            
+
+# Measured skin radius of each phalange, by (mesh, armature), along with the
+# mesh_stamp it was measured at so an edited mesh gets measured again
+thickness_cache = {}
+
+# What the shrinkwrap offset falls back to, per unit of control bone scale,
+# when there's no skinned mesh to measure
+default_thickness = 0.005
+
+def vertex_group_names(phalange_name):
+
+    # The deforming vertex group for a phalange isn't always named after the bone
+    # in the dictionaries. Rigify deforms with DEF- bones, Auto-Rig Pro drops the c_
+
+    names = [phalange_name, "DEF-" + phalange_name]
+    if phalange_name.startswith("c_"):
+        names.append(phalange_name[2:])
+    return names
+
+def skinned_meshes():
+
+    # Every mesh in the scene deformed by the active armature
+
+    meshes = []
+    for candidate in bpy.context.scene.objects:
+        if candidate.type != 'MESH':
+            continue
+        for m in candidate.modifiers:
+            if m.type == 'ARMATURE' and m.object == obj:
+                meshes.append(candidate)
+                break
+    return meshes
+
+def group_percentile(values, owners, groups, q):
+
+    # q-th percentile of values within each owner group, all groups in one sort.
+    # Groups with nothing in them come back as nan.
+
+    order = np.lexsort((values, owners))
+    counts = np.bincount(owners, minlength=groups)
+    starts = np.cumsum(counts) - counts
+    pick = starts + np.rint(q * np.maximum(counts - 1, 0)).astype(np.int64)
+    result = np.full(groups, np.nan)
+    filled = counts > 0
+    result[filled] = values[order][pick[filled]]
+    return result
+
+def phalange_vertices(meshobj, phalanges):
+
+    # Which vertices of a skinned mesh belong to which phalange (by bone name),
+    # going by whichever vertex group holds at least half their weight.
+    # Returns (rows, members): the index into phalanges and the vertex index
+    # for every vertex found, as arrays.
+
+    wanted = {}
+    for row, phalange in enumerate(phalanges):
+        for group_name in vertex_group_names(phalange):
+            group = meshobj.vertex_groups.get(group_name)
+            if group is not None:
+                wanted[group.index] = row
+                break
+
+    if not wanted:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    # Group membership has no bulk accessor, so the deform layer is read in one
+    # bmesh pass, flattened to (vertex, group, weight) arrays and masked in NumPy
+    bm = bmesh.new()
+    bm.from_mesh(meshobj.data)
+    layer = bm.verts.layers.deform.active
+    deform = [] if layer is None else [v[layer].items() for v in bm.verts]
+    bm.free()
+
+    counts = np.fromiter(map(len, deform), dtype=np.int64, count=len(deform))
+    entries = np.array([item for items in deform for item in items], dtype=np.float64).reshape(-1, 2)
+    vertex = np.repeat(np.arange(len(deform), dtype=np.int64), counts)
+    groups = entries[:, 0].astype(np.int64)
+
+    lookup = np.full(max(len(meshobj.vertex_groups), int(groups.max(initial=-1)) + 1), -1, dtype=np.int64)
+    lookup[list(wanted)] = list(wanted.values())
+    rows = lookup[groups]
+    keep = (rows >= 0) & (entries[:, 1] >= 0.5)
+    return rows[keep], vertex[keep]
+
+def measure_finger_radii(meshobj, fingers, percentile=0.9):
+
+    # Skin thickness on the gripping side of every phalange, straight from the
+    # mesh: grabs the vertices each phalange's vertex group holds, measures how
+    # far they sit from the bone's axis in one pass over all of them, and takes
+    # a high percentile per phalange so stray verts don't count.
+    # Returns {phalange name: radius} in armature space.
+
+    mesh = meshobj.data
+    model = finger_model(fingers)
+    names = model.phalange_names
+
+    owners, members = phalange_vertices(meshobj, names)
+    if len(members) == 0:
+        return {}
+
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    to_armature = np.array(obj.matrix_world.inverted() @ meshobj.matrix_world)
+    points = co.reshape(-1, 3)[members] @ to_armature[:3, :3].T + to_armature[:3, 3]
+
+    heads = model.heads[owners]
+    axes = model.tails[owners] - heads
+    grips = model.grip_directions()[owners]
+
+    # Closest point on each vertex's own bone segment
+    along = np.sum((points - heads) * axes, axis=1) / np.maximum(np.sum(axes * axes, axis=1), 1e-12)
+    offsets = points - (heads + np.clip(along, 0.0, 1.0)[:, None] * axes)
+    distances = np.linalg.norm(offsets, axis=1)
+
+    # Only the palm side matters for gripping, as long as there's enough of it
+    palm_side = np.sum(offsets * grips, axis=1) > 0.0
+    enough = np.bincount(owners[palm_side], minlength=len(names)) >= 3
+    keep = palm_side | ~enough[owners]
+
+    radii = group_percentile(distances[keep], owners[keep], len(names), percentile)
+    return {name: float(r) for name, r in zip(names, radii) if np.isfinite(r) and r > 0.0}
+
+def finger_radii(fingers, remeasure=False):
+
+    # Measured radius of every phalange on these fingers that any skinned mesh
+    # can tell us about, cached per mesh
+
+    radii = {}
+    for meshobj in skinned_meshes():
+        key = (meshobj.name, obj.name)
+        stamp = mesh_stamp(meshobj)
+        cached = thickness_cache.get(key)
+        if remeasure or cached is None or cached[0] != stamp:
+            print("Measuring finger thickness on " + meshobj.name)
+            cached = (stamp, {})
+            thickness_cache[key] = cached
+        measured = cached[1]
+
+        missing = [f for f in fingers if any(p.name not in measured for p in f.phalanges)]
+        if missing:
+            measured.update(measure_finger_radii(meshobj, missing))
+
+        for name, r in measured.items():
+            radii.setdefault(name, r)
+    return radii
+
+def thickness_expression(projector_name, radii):
+
+    # Shrinkwrap distance driver expression for one projector: control bone scale
+    # times the phalange's skin radius, or the old flat offset if it wasn't measured
+
+    phalange_name = projector_name[len("projector_"):]
+    thickness = radii.get(phalange_name, default_thickness)
+    # Plain decimals, so the expression stays a simple one
+    return "gripscale * " + format(thickness, '.6f')
+
+def mesh_arrays(meshobj, world=True):
+
+    # Vertex positions and normals of the evaluated mesh, pulled out with
+    # foreach_get instead of looping over vertices. World space by default,
+    # otherwise the object's own local space
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    evaluated = meshobj.evaluated_get(depsgraph)
+    mesh = evaluated.to_mesh()
+
+    count = len(mesh.vertices)
+    co = np.empty(count * 3, dtype=np.float32)
+    no = np.empty(count * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    mesh.vertices.foreach_get("normal", no)
+    evaluated.to_mesh_clear()
+
+    co = co.reshape(-1, 3)
+    no = no.reshape(-1, 3)
+    if world:
+        matrix = np.array(meshobj.matrix_world)
+        co = co @ matrix[:3, :3].T + matrix[:3, 3]
+        no = core.geometry.normalized(no @ np.linalg.inv(matrix[:3, :3]))
+
+    return co, no
+
+def hand_probe(handroot, fingers=None):
+
+    # Reads the rest pose of every finger on this hand into a core.contact.HandProbe,
+    # all in the hand root's local space so it can be moved around as one piece
+
+    if fingers is None:
+        fingers = assemble_hand(handroot)
+    if len(fingers) == 0:
+        raise RuntimeError("No fingers found on " + handroot.name)
+
+    model = finger_model(fingers)
+    radii = finger_radii(fingers)
+
+    # Everything into the hand root's space in one go
+    root_inv = np.linalg.inv(np.array(handroot.bone.matrix_local))
+    rotation = root_inv[:3, :3]
+    heads = model.heads @ rotation.T + root_inv[:3, 3]
+    tails = model.tails @ rotation.T + root_inv[:3, 3]
+    grip = model.grip_directions() @ rotation.T
+    palms = model.palm_heads @ rotation.T + root_inv[:3, 3]
+
+    # Measured skin thickness, or a rough guess off the bone length
+    lengths = model.lengths()
+    radius = np.array([radii.get(name, 0.2 * length)
+                       for name, length in zip(model.phalange_names, lengths)])
+
+    heads, mask = model.padded(heads)
+    tails, _ = model.padded(tails)
+    grip, _ = model.padded(grip)
+    radius, _ = model.padded(radius)
+
+    # Palm head and first knuckle of every finger, in that order
+    palm = np.stack([palms, heads[:, 0]], axis=1).reshape(-1, 3)
+
+    return core.contact.HandProbe(list(model.finger_names), heads, tails, grip, radius, mask, palm)
+
+def sample_surface(verts, normals, spacing, count, seed=0):
+
+    # Picks up to `count` surface points spread at least `spacing` apart.
+    # Walks the vertices in random order and uses a KD-tree to knock out
+    # everything near each one it keeps. A dense prop is thinned to a couple of
+    # vertices per `spacing` first, in NumPy, so the tree only gets a few
+    # thousand points put in it one at a time however many the mesh has.
+
+    thinned = core.contact.SurfaceGrid(verts, normals, cell_size=spacing, resolution=0.5 * spacing)
+    verts, normals = thinned.verts, thinned.normals
+
+    tree = kdtree.KDTree(len(verts))
+    for i, co in enumerate(verts):
+        tree.insert(co, i)
+    tree.balance()
+
+    covered = np.zeros(len(verts), dtype=bool)
+    picked = []
+    for i in np.random.default_rng(seed).permutation(len(verts)):
+        if covered[i]:
+            continue
+        picked.append(i)
+        if len(picked) >= count:
+            break
+        for (co, index, dist) in tree.find_range(verts[i], spacing):
+            covered[index] = True
+
+    return verts[picked], normals[picked]
+
+# Search results, kept so that changing which proposal to use in the redo panel
+# doesn't run the whole search again. Keyed on where the prop is and the shape
+# it's in as well, so moving or editing it searches again. Made on first use.
+grasp_results = None
+grasp_cache_size = 32
+
+def find_grasp(handroot, target, samples=64, rolls=8, top_k=5):
+
+    # Searches for wrist placements where this hand grips the target mesh.
+    # Returns (world matrices, scores) for the top_k, best first.
+
+    global grasp_results
+    if grasp_results is None:
+        grasp_results = core.cache.SolveCache(grasp_cache_size)
+    key = core.cache.input_key(obj.name, handroot.name, target.name, samples, rolls, top_k,
+                               np.array(target.matrix_world), mesh_stamp(target))
+    result = grasp_results.get(key)
+    if result is not None:
+        return result
+
+    probe = hand_probe(handroot)
+    scale = float(probe.radius[probe.mask].mean())
+
+    # Palm centre, the way the palm faces, and the way the fingers point,
+    # averaged over everything that isn't a thumb
+    fingers = np.array(['thumb' not in name for name in probe.names], dtype=bool)
+    if not fingers.any():
+        fingers[:] = True
+    palm_point = probe.palm.mean(axis=0)
+    palm_normal = probe.grip[fingers, 0].mean(axis=0)
+    finger_dir = (probe.tails[fingers, 0] - probe.heads[fingers, 0]).mean(axis=0)
+    span = float(np.linalg.norm(probe.tails[probe.mask] - palm_point, axis=-1).max())
+
+    verts, normals = mesh_arrays(target)
+    print("Searching grasps on " + target.name + " (" + str(len(verts)) + " vertices)")
+
+    # The grid only needs to see a few finger widths out from the surface
+    grid = core.contact.SurfaceGrid(verts, normals, cell_size=3.0 * scale)
+    points, point_normals = sample_surface(grid.verts, grid.normals, 0.25 * span, samples)
+
+    matrices = core.grasp.candidate_frames(points, point_normals, rolls, palm_point, palm_normal,
+        finger_dir, 1.5 * scale)
+    print(str(len(matrices)) + " candidate placements")
+
+    order, scores = core.grasp.search(grid, probe, matrices, top_k=top_k)
+    result = (matrices[order], scores)
+    grasp_results.put(key, result)
+    return result
+
+def hand_control(handroot):
+
+    # The pose bone the rig moves this hand with (see rigs.hand_controls), or
+    # None if the armature doesn't have one
+
+    for name in rigs.hand_control_names(obj.global_rig_choice, handroot.name[-1]):
+        if name in obj.pose.bones:
+            return obj.pose.bones[name]
+    return None
+
+def apply_grasp(handroot, matrix):
+
+    # Puts the hand root at a world space matrix from find_grasp. On a real rig
+    # it's the hand control that moves, keeping where it sits relative to the
+    # hand root at rest, so the hand ends up there once the rig evaluates.
+    # Returns the bone that was moved.
+
+    world = obj.matrix_world.inverted() @ mathutils.Matrix(np.asarray(matrix).tolist())
+    control = hand_control(handroot)
+    if control is None:
+        handroot.matrix = world
+        return handroot
+    control.matrix = world @ handroot.bone.matrix_local.inverted() @ control.bone.matrix_local
+    return control
+
+def grasp_target():
+    for t in bpy.context.selected_objects:
+        if t != obj and t.type == 'MESH':
+            return t
+    return None
+
+class FindGraspLeft(bpy.types.Operator):
+    """Search for wrist placements where the left hand grips the selected mesh"""
+    bl_idname = "object.autogrip_find_grasp_l"
+    bl_label = "Find Grasp L"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    samples: bpy.props.IntProperty(name="Samples", default=64, min=1, max=4096,
+        description="How many points on the prop to try the hand at")
+    rolls: bpy.props.IntProperty(name="Rolls", default=8, min=1, max=64,
+        description="How many wrist rotations to try at each point")
+    top_k: bpy.props.IntProperty(name="Proposals", default=5, min=1, max=50,
+        description="How many of the best placements to keep")
+    proposal: bpy.props.IntProperty(name="Use Proposal", default=0, min=0,
+        description="Which of the proposals to put the hand at, 0 being the best")
+
+    def execute(self, context):
+
+        global obj
+        obj = bpy.context.active_object
+
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+
+        target = grasp_target()
+        if target is None:
+            self.report({'ERROR'}, "Select a mesh to grip as well as the armature")
+            return {'CANCELLED'}
+
+        lefthandroot = find_hand_root('L')
+        matrices, scores = find_grasp(lefthandroot, target, self.samples, self.rolls, self.top_k)
+        if not len(matrices):
+            self.report({'WARNING'}, "No placement found where the left hand grips " + target.name)
+            return {'CANCELLED'}
+
+        choice = min(self.proposal, len(matrices) - 1)
+        moved = apply_grasp(lefthandroot, matrices[choice])
+
+        self.report({'INFO'}, "Proposal " + str(choice) + " of " + str(len(matrices)) +
+            ", score " + str(round(float(scores[choice]), 2)) + ", moved " + moved.name)
+        return {'FINISHED'}
+
+class FindGraspRight(bpy.types.Operator):
+    """Search for wrist placements where the right hand grips the selected mesh"""
+    bl_idname = "object.autogrip_find_grasp_r"
+    bl_label = "Find Grasp R"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    samples: bpy.props.IntProperty(name="Samples", default=64, min=1, max=4096,
+        description="How many points on the prop to try the hand at")
+    rolls: bpy.props.IntProperty(name="Rolls", default=8, min=1, max=64,
+        description="How many wrist rotations to try at each point")
+    top_k: bpy.props.IntProperty(name="Proposals", default=5, min=1, max=50,
+        description="How many of the best placements to keep")
+    proposal: bpy.props.IntProperty(name="Use Proposal", default=0, min=0,
+        description="Which of the proposals to put the hand at, 0 being the best")
+
+    def execute(self, context):
+
+        global obj
+        obj = bpy.context.active_object
+
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+
+        target = grasp_target()
+        if target is None:
+            self.report({'ERROR'}, "Select a mesh to grip as well as the armature")
+            return {'CANCELLED'}
+
+        righthandroot = find_hand_root('R')
+        matrices, scores = find_grasp(righthandroot, target, self.samples, self.rolls, self.top_k)
+        if not len(matrices):
+            self.report({'WARNING'}, "No placement found where the right hand grips " + target.name)
+            return {'CANCELLED'}
+
+        choice = min(self.proposal, len(matrices) - 1)
+        moved = apply_grasp(righthandroot, matrices[choice])
+
+        self.report({'INFO'}, "Proposal " + str(choice) + " of " + str(len(matrices)) +
+            ", score " + str(round(float(scores[choice]), 2)) + ", moved " + moved.name)
+        return {'FINISHED'}
+
+def mesh_stamp(target):
+
+    # Cheap fingerprint of a mesh's shape, so anything cached off it (proxies,
+    # finger thickness) can tell when it's been edited
+
+    mesh = target.data
+    co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get("co", co)
+    return [len(mesh.vertices), len(mesh.polygons), len(target.modifiers),
+        round(float(co.sum(dtype=np.float64)), 4)]
+
+def triangle_count(mesh):
+    loops = np.empty(len(mesh.polygons), dtype=np.int32)
+    mesh.polygons.foreach_get("loop_total", loops)
+    return int(loops.sum()) - 2 * len(loops)
+
+def build_proxy_mesh(target, budget, method):
+
+    # Low poly copy of the evaluated prop, in its local space. HULL wraps it in a
+    # convex hull first; either way it then gets decimated down to the budget.
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    mesh = bpy.data.meshes.new_from_object(target.evaluated_get(depsgraph))
+
+    if method == 'HULL':
+        bm = bmesh.new()
+        bm.from_mesh(mesh)
+        hull = bmesh.ops.convex_hull(bm, input=bm.verts)
+        bmesh.ops.delete(bm, geom=hull["geom_interior"] + hull["geom_unused"], context='VERTS')
+        bm.to_mesh(mesh)
+        bm.free()
+
+    tris = triangle_count(mesh)
+    if tris <= budget:
+        return mesh
+
+    # bmesh doesn't do collapse decimation, so borrow the modifier on a throwaway object
+    temp = bpy.data.objects.new(prefix + "decimate", mesh)
+    bpy.context.scene.collection.objects.link(temp)
+    decimate = temp.modifiers.new(prefix + "decimate", 'DECIMATE')
+    decimate.ratio = budget / tris
+    decimate.use_collapse_triangulate = True
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    depsgraph.update()
+    decimated = bpy.data.meshes.new_from_object(temp.evaluated_get(depsgraph))
+
+    bpy.data.objects.remove(temp)
+    bpy.data.meshes.remove(mesh)
+    return decimated
+
+def grip_proxy(target, budget=None, method=None):
+
+    # Returns the cached low poly stand-in for a grip target, building or
+    # rebuilding it if it's missing, stale, or was made with different settings.
+    # The proxy is parented to the prop so it follows it around, and stays out of renders.
+
+    if prefix + 'proxy_source' in target:
+        # Already a proxy
+        return target
+
+    if budget is None:
+        budget = obj.autogrip_proxy_budget
+    if method is None:
+        method = obj.autogrip_proxy_method
+
+    name = prefix + "proxy_" + target.name
+    stamp = mesh_stamp(target)
+    proxy = bpy.data.objects.get(name)
+
+    if proxy is not None:
+        if (proxy.get(prefix + 'proxy_budget') == budget and
+                proxy.get(prefix + 'proxy_method') == method and
+                list(proxy.get(prefix + 'proxy_stamp', [])) == stamp):
+            return proxy
+        print("Rebuilding grip proxy for " + target.name)
+        old_mesh = proxy.data
+        proxy.data = build_proxy_mesh(target, budget, method)
+        bpy.data.meshes.remove(old_mesh)
+    else:
+        print("Building grip proxy for " + target.name)
+        proxy = bpy.data.objects.new(name, build_proxy_mesh(target, budget, method))
+        for collection in target.users_collection:
+            collection.objects.link(proxy)
+        proxy.parent = target
+        proxy.matrix_parent_inverse = mathutils.Matrix.Identity(4)
+        proxy.display_type = 'WIRE'
+        proxy.hide_render = True
+        proxy.hide_select = True
+
+    proxy[prefix + 'proxy_source'] = target.name
+    proxy[prefix + 'proxy_budget'] = budget
+    proxy[prefix + 'proxy_method'] = method
+    proxy[prefix + 'proxy_stamp'] = stamp
+    print("Grip proxy " + proxy.name + " has " + str(triangle_count(proxy.data)) + " triangles")
+    return proxy
+
+def proxy_source(target):
+
+    # The full resolution prop behind a proxy, or the target itself if it isn't one
+
+    if target is not None and prefix + 'proxy_source' in target:
+        source = bpy.data.objects.get(target[prefix + 'proxy_source'])
+        if source is not None:
+            return source
+    return target
+
+def update_proxy_toggle(self, context):
+
+    # Flips every AutoGrip shrinkwrap on this armature between the proxies and
+    # the full meshes when "Use Grip Proxy" changes, and re-arms any target
+    # schedules so their next switch picks the same kind
+
+    global obj
+    obj = self
+    if self.pose is None:
+        return
+    global activeArmature
+    activeArmature = self.data
+
+    for bone in self.pose.bones:
+        for c in bone.constraints:
+            if prefix in c.name and 'hrinkwrap' in c.name and c.target is not None:
+                if self.autogrip_use_proxy:
+                    c.target = grip_proxy(proxy_source(c.target))
+                else:
+                    c.target = proxy_source(c.target)
+
+    for side in ('L', 'R'):
+        if (self.name, side) in scheduled_hands:
+            try:
+                arm_schedule(find_hand_root(side), side)
+            except (KeyError, RuntimeError):
+                print("Couldn't arm the target schedule on " + self.name + " again")
+                scheduled_hands.pop((self.name, side), None)
+
+def remeasure_hand(handroot):
+
+    # Measures the fingers again and points the existing shrinkwrap distance
+    # drivers at the new thickness, without touching anything else
+
+    fingers = assemble_hand(handroot)
+    for f in fingers:
+        f.reconstruct()
+    radii = finger_radii(fingers, remeasure=True)
+
+    drivers = obj.animation_data.drivers if obj.animation_data else []
+    for f in fingers:
+        for p in f.projectors:
+            fcurve = drivers.find(shrinkwrap_driver_path(p.name))
+            if fcurve is not None:
+                fcurve.driver.expression = thickness_expression(p.name, radii)
+    return radii
+
+class MeasureFingers(bpy.types.Operator):
+    """Measure finger thickness from the skinned mesh and update the shrinkwrap offsets"""
+    bl_idname = "object.autogrip_measure_fingers"
+    bl_label = "Measure Fingers"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+
+        global obj
+        obj = bpy.context.active_object
+
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+
+        measured = 0
+        for side in ('L', 'R'):
+            if activeArmature.get(prefix + 'hand_' + side):
+                measured += len(remeasure_hand(find_hand_root(side)))
+
+        if measured == 0:
+            self.report({'WARNING'}, "No phalanges could be measured, kept the flat offset")
+        else:
+            self.report({'INFO'}, "Measured " + str(measured) + " phalanges")
+        return {'FINISHED'}
+
+class TargetLeft(bpy.types.Operator):
+    """Set Grip Target for left hand"""
+    bl_idname = "object.autogrip_target_l"
+    bl_label = "Grip Target L"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        
+        #print(obj.name)
+        
+        global obj 
+        obj = bpy.context.active_object
+        
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+        print("skeleton is " + activeArmature.name)
+        
+        target = grasp_target()
+        if target is None:
+            self.report({'ERROR'}, "Select a mesh to grip as well as the armature")
+            return {'CANCELLED'}
+        before = undo_snapshot()
+
+        lefthandroot = find_hand_root('L')
+
+        if obj.autogrip_use_proxy:
+            target = grip_proxy(target)
+        print("Grip target is " + target.name)
+        
+        left_hand_list = assemble_hand(lefthandroot)
+        
+        for i in left_hand_list:
+            i.reconstruct()
+            print("set target for left hand finger " + i.name)
+            i.target_shrinkwraps(target)
+        
+        log_changes(self.bl_label, before)
+        return {'FINISHED'}
+    
+class TargetRight(bpy.types.Operator):
+    """Set Grip Target for right hand"""
+    bl_idname = "object.autogrip_target_r"
+    bl_label = "Grip Target R"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    def execute(self, context):
+        
+        #print(obj.name)
+        
+        global obj 
+        obj = bpy.context.active_object
+        
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+        print("skeleton is " + activeArmature.name)
+        
+        target = grasp_target()
+        if target is None:
+            self.report({'ERROR'}, "Select a mesh to grip as well as the armature")
+            return {'CANCELLED'}
+        before = undo_snapshot()
+
+        righthandroot = find_hand_root('R')
+
+        if obj.autogrip_use_proxy:
+            target = grip_proxy(target)
+        print("Grip target is " + target.name)
+        
+        right_hand_list = assemble_hand(righthandroot)
+        
+        for i in right_hand_list:
+            i.reconstruct()
+            print("set target for right hand finger " + i.name)
+            i.target_shrinkwraps(target)
+        
+        log_changes(self.bl_label, before)
+        return {'FINISHED'}
+
+
+def hand_target(fingers):
+
+    # Whatever the hand's shrinkwraps are currently pointed at, if anything
+
+    for finger in fingers:
+        for p in finger.projectors:
+            for c in p.constraints:
+                if 'hrinkwrap' in c.name and c.target is not None:
+                    return c.target
+    return None
+
+def mute_grip_constraints(fingers, mute):
+
+    # Turns the AutoGrip constraints on a hand off (or back on), so baked or
+    # live-solved rotations aren't fought over by the IK and shrinkwraps
+
+    for finger in fingers:
+        for bone in finger.phalanges + finger.projectors:
+            for c in bone.constraints:
+                if prefix in c.name:
+                    c.mute = mute
+
+def control_amounts(armature, control_names):
+
+    # How closed each finger should be, read off the control bones the same
+    # way the IK influence drivers do it. Fingers without one are fully closed.
+
+    bones = armature.pose.bones
+    amounts = np.ones(len(control_names))
+    for i, name in enumerate(control_names):
+        if name is not None and name in bones:
+            amounts[i] = min(max(bones[name].rotation_euler[0] * 0.637, 0.0), 1.0)
+    return amounts
+
+def bone_rotation(posebone):
+
+    # A pose bone's rotation channels as a quaternion, whatever its rotation mode
+
+    if posebone.rotation_mode == 'QUATERNION':
+        return posebone.rotation_quaternion.copy()
+    elif posebone.rotation_mode == 'AXIS_ANGLE':
+        angle, x, y, z = posebone.rotation_axis_angle
+        return mathutils.Quaternion((x, y, z), angle)
+    return posebone.rotation_euler.to_quaternion()
+
+def set_bone_rotation(posebone, quaternion):
+
+    # Sets a pose bone's rotation from a quaternion in whatever rotation mode
+    # it uses, and returns the data path that was set
+
+    if posebone.rotation_mode == 'QUATERNION':
+        posebone.rotation_quaternion = quaternion
+        return 'rotation_quaternion'
+    elif posebone.rotation_mode == 'AXIS_ANGLE':
+        axis, angle = quaternion.to_axis_angle()
+        posebone.rotation_axis_angle = (angle, axis[0], axis[1], axis[2])
+        return 'rotation_axis_angle'
+    else:
+        posebone.rotation_euler = quaternion.to_euler(posebone.rotation_mode)
+        return 'rotation_euler'
+
+# One core.contact.GripSession per prop, by name, along with the mesh_stamp it
+# was built at: the prop's contact grid, built once and shared by every hand
+# solving against it, on any armature
+grip_sessions = {}
+
+def grip_session(target, scale, stamp=None):
+
+    # The prop's grip session, built (or rebuilt, if the mesh changed) on first
+    # use. The grid lives in the prop's local space, so a prop that's only moving
+    # around doesn't need it rebuilt. Its cell size comes from whichever hand
+    # asked first. stamp is the prop's mesh_stamp, if the caller has it already.
+
+    if stamp is None:
+        stamp = mesh_stamp(target)
+    cached = grip_sessions.get(target.name)
+    if cached is None or cached[0] != stamp:
+        verts, normals = mesh_arrays(target, world=False)
+        grid = core.contact.SurfaceGrid(verts, normals, cell_size=3.0 * scale)
+        cached = (stamp, core.contact.GripSession(grid))
+        grip_sessions[target.name] = cached
+    return cached[1]
+
+class gripsolver:
+
+    # Frame by frame grip solve for one hand against one prop, without the
+    # constraint stack. Everything that stays the same between frames (the
+    # fingers, the prop's contact grid, each phalange's bend axis) is worked out
+    # once here, and a core.contact.WarmStartSolver carries the answer from one frame
+    # to the next. Bones are kept by name so this survives undo.
+
+    def __init__(self, handroot, target, tolerance=None, self_collision=True):
+        self.armature_name = obj.name
+        self.hand_name = handroot.name
+        self.tolerance = tolerance
+        self.self_collision = self_collision
+
+        self.fingers = assemble_hand(handroot)
+        for f in self.fingers:
+            f.reconstruct()
+
+        self.probe = hand_probe(handroot, self.fingers)
+        self.scale = float(self.probe.radius[self.probe.mask].mean())
+
+        # A session and solver per prop, so a scheduled hand can switch between them
+        self.solvers = {}
+        self.target_name = None
+        self.solver = None
+        self.stamp = None
+        self.use_target(target)
+
+        # Bend axes in each phalange's own local space, which is what its
+        # rotation channels are in
+        model = finger_model(self.fingers)
+        root_rotation = np.array(handroot.bone.matrix_local.to_3x3())
+        bend = self.probe.bend[self.probe.mask] @ root_rotation.T
+        local = np.einsum('pji,pj->pi', model.matrices[:, :3, :3], bend)
+        self.phalange_names = [list(model.phalange_names[model.rows(i)]) for i in range(len(model))]
+        self.local_axes = [[mathutils.Vector(a) for a in local[model.rows(i)]]
+                           for i in range(len(model))]
+
+        # Answers already solved while scrubbing, by everything that went into them
+        self.cache = core.cache.SolveCache(solve_cache_size)
+        # The camera the level of detail was last worked out for
+        self.detail_camera = None
+
+        self.control_names = []
+        for f in self.fingers:
+            if f.control_bone is None:
+                self.control_names.append(None)
+            else:
+                self.control_names.append(f.control_bone.name)
+
+    def key(self):
+
+        # What this hand is known by in grip sessions. A bake and a live solve of
+        # the same hand are different solvers, so they get different keys.
+
+        return (self.armature_name, self.hand_name, id(self))
+
+    def prepare(self, target, stamp=None):
+
+        # This hand's place in the prop's grip session, joined the first time
+        # it's asked for and again whenever the session has been rebuilt under
+        # it (the prop's mesh was edited, and some hand on it noticed first).
+        # Returns (grid, warm start solver).
+
+        session = grip_session(target, self.scale, stamp)
+        joined = self.solvers.get(target.name)
+        if joined is None or joined[0] is not session:
+            if joined is not None:
+                # Everything solved against the old mesh is stale
+                self.cache.clear()
+            joined = (session, session.join(self.key(), self.probe, self.tolerance,
+                                            self.self_collision))
+            self.solvers[target.name] = joined
+        return session.grid, joined[1]
+
+    def release(self):
+
+        # Leaves every grip session this hand joined
+
+        for session, solver in self.solvers.values():
+            session.leave(self.key())
+        self.solvers = {}
+        self.target_name = None
+        self.solver = None
+
+    def use_target(self, target, stamp=None):
+
+        # Switches the prop being solved against, or catches up with its mesh
+        # having changed. Whatever the solver last answered on a different prop
+        # or mesh is stale by now, so it starts cold.
+
+        grid, solver = self.prepare(target, stamp)
+        if target.name == self.target_name and solver is self.solver:
+            return
+        self.grid, self.solver = grid, solver
+        self.solver.reset()
+        self.target_name = target.name
+        self.stamp = grip_sessions[target.name][0]
+
+    def armature(self):
+        return bpy.data.objects[self.armature_name]
+
+    def hand_matrix(self):
+
+        # Hand root in the prop's local space, as it is on the current frame
+
+        armature = self.armature()
+        target = bpy.data.objects[self.target_name]
+        world = armature.matrix_world @ armature.pose.bones[self.hand_name].matrix
+        return np.array(target.matrix_world.inverted() @ world)
+
+    def amounts(self):
+        return control_amounts(self.armature(), self.control_names)
+
+    def solve(self, warm=True):
+        if not warm:
+            self.solver.reset()
+        angles, contacts, touching = self.solver.solve(self.hand_matrix())
+        return angles * self.amounts()
+
+    def finish(self, result, amounts=None):
+
+        # The curl angles to apply, from a result the prop's session solved
+
+        return result[0] * (self.amounts() if amounts is None else amounts)
+
+    def screen_detail(self, projection, near, far, margin=0.1):
+
+        # Level of detail for every finger on this hand, from how long it is
+        # through a camera projection (see camera_projection). Fingers with
+        # both ends off screen (by more than margin) are held.
+
+        armature = self.armature()
+        world = np.array(armature.matrix_world @ armature.pose.bones[self.hand_name].matrix)
+        points = self.solver.anchors @ world[:3, :3].T + world[:3, 3]
+        frame, depth = core.geometry.screen_points(projection, points)
+        sizes = np.linalg.norm(frame[:, 1] - frame[:, 0], axis=-1)
+        inside = (depth > 0.0) & np.all((frame >= -margin) & (frame <= 1.0 + margin), axis=-1)
+        return core.contact.detail_levels(sizes, inside.any(axis=1), near, far)
+
+    def input_key(self, matrix, amounts):
+
+        # What the solve cache knows an answer by: the hand in the prop's space
+        # (so the prop and hand moving together still hits), how closed each
+        # finger is, and which prop, as its mesh stood when use_target last
+        # checked it (every frame, on a live hand)
+
+        return core.cache.input_key(matrix, amounts, self.target_name, repr(self.stamp),
+                                    self.self_collision)
+
+    def apply(self, angles, frame=None):
+
+        # Poses every phalange at its solved curl, keying it if given a frame
+
+        bones = self.armature().pose.bones
+        for i, names in enumerate(self.phalange_names):
+            for j, name in enumerate(names):
+                bone = bones[name]
+                path = set_bone_rotation(bone, mathutils.Quaternion(self.local_axes[i][j], angles[i]))
+                if frame is not None:
+                    bone.keyframe_insert(path, frame=frame, group=name)
+
+    def channels(self, angles):
+
+        # Rotation channel values for every phalange over a whole bake, from the
+        # (frames, fingers) curl angles, in whatever rotation mode each bone
+        # uses. Yields (bone name, data path, (frames, channels) values, how far
+        # each channel can drift per radian of rotation).
+
+        bones = self.armature().pose.bones
+        for i, names in enumerate(self.phalange_names):
+            half = angles[:, i] * 0.5
+            for j, name in enumerate(names):
+                bone = bones[name]
+                axis = np.array(self.local_axes[i][j])
+                if bone.rotation_mode == 'QUATERNION':
+                    # A quaternion component moves about half as far as the
+                    # rotation does
+                    values = np.column_stack((np.cos(half), np.sin(half)[:, None] * axis))
+                    yield name, 'rotation_quaternion', values, 0.5
+                elif bone.rotation_mode == 'AXIS_ANGLE':
+                    # The axis never changes, only the angle along it
+                    values = np.column_stack((angles[:, i], np.broadcast_to(axis, (len(angles), 3))))
+                    yield name, 'rotation_axis_angle', values, 1.0
+                else:
+                    values = np.empty((len(angles), 3))
+                    euler = None
+                    for k, angle in enumerate(angles[:, i]):
+                        quaternion = mathutils.Quaternion(self.local_axes[i][j], angle)
+                        euler = quaternion.to_euler(bone.rotation_mode, euler) if euler is not None \
+                            else quaternion.to_euler(bone.rotation_mode)
+                        values[k] = euler
+                    yield name, 'rotation_euler', values, 1.0
+
+def bake_action(armature):
+
+    # The armature's action, made and assigned if it doesn't have one
+
+    if armature.animation_data is None:
+        armature.animation_data_create()
+    if armature.animation_data.action is None:
+        armature.animation_data.action = bpy.data.actions.new(armature.name + "Action")
+    return armature.animation_data.action
+
+# Everything a keyframe carries, as (property, width, dtype), so keys outside
+# a baked range come through a rebuilt curve unchanged
+key_attributes = (("co", 2, 'f4'), ("handle_left", 2, 'f4'),
+    ("handle_right", 2, 'f4'), ("interpolation", 1, 'i4'),
+    ("handle_left_type", 1, 'i4'), ("handle_right_type", 1, 'i4'),
+    ("easing", 1, 'i4'), ("type", 1, 'i4'), ("amplitude", 1, 'f4'),
+    ("back", 1, 'f4'), ("period", 1, 'f4'))
+
+def read_key_attributes(points):
+    count = len(points)
+    result = {}
+    for name, width, dtype in key_attributes:
+        values = np.empty(count * width, dtype=dtype)
+        points.foreach_get(name, values)
+        result[name] = values.reshape(count, width)
+    return result
+
+def write_keys(action, data_path, index, group, frames, values, frame_start, frame_end):
+
+    # Replaces an F-curve's keys in the baked range with new ones, rebuilding
+    # the curve with bulk reads and writes instead of touching keys one at a
+    # time. Keys outside the range keep everything they had. The new keys are
+    # linear so playback follows the baked values to within the reduction's
+    # tolerance.
+
+    fcurve = action.fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = action.fcurves.new(data_path, index=index, action_group=group)
+    points = fcurve.keyframe_points
+
+    old = read_key_attributes(points)
+    keep = (old["co"][:, 0] < frame_start) | (old["co"][:, 0] > frame_end)
+    kept = int(keep.sum())
+    total = kept + len(frames)
+
+    # Fresh keys give the defaults for everything the new ones don't set
+    points.clear()
+    points.add(total)
+    merged = read_key_attributes(points)
+
+    times = np.concatenate([old["co"][keep, 0], np.asarray(frames, dtype=np.float32)])
+    slots = np.empty(total, dtype=np.int64)
+    slots[np.argsort(times, kind='stable')] = np.arange(total)
+    for name, width, dtype in key_attributes:
+        merged[name][slots[:kept]] = old[name][keep]
+
+    co = np.stack([frames, values], axis=1)
+    added = slots[kept:]
+    merged["co"][added] = co
+    merged["handle_left"][added] = co
+    merged["handle_right"][added] = co
+    merged["interpolation"][added] = \
+        bpy.types.Keyframe.bl_rna.properties['interpolation'].enum_items['LINEAR'].value
+
+    for name, width, dtype in key_attributes:
+        points.foreach_set(name, merged[name].ravel())
+    fcurve.update()
+    return len(frames)
+
+def key_channels(armature, channels, frames, frame_start, frame_end, key_tolerance=None):
+
+    # Keys a whole bake at once from (bone name, data path, values, scale)
+    # channels, the way gripsolver.channels gives them. With a key_tolerance
+    # (radians), every channel only keeps the keys it needs to stay within that
+    # of the solve, which on a grip that holds still most of the time is a
+    # small fraction of them. Frames either side of a gap always keep their keys.
+
+    frames = np.asarray(frames, dtype=np.float64)
+    action = bake_action(armature)
+    fixed = np.zeros(len(frames), dtype=bool)
+    if len(frames):
+        gap = np.diff(frames) > 1
+        fixed[1:] |= gap
+        fixed[:-1] |= gap
+
+    written = 0
+    total = 0
+    for name, data_path, values, scale in channels:
+        if key_tolerance is None:
+            keep = np.ones(values.shape, dtype=bool)
+        else:
+            keep = core.keys.reduce_keys(frames, values, key_tolerance * scale, fixed)
+        path = 'pose.bones["' + name + '"].' + data_path
+        for index in range(values.shape[1]):
+            written += write_keys(action, path, index, name, frames[keep[:, index]],
+                                  values[keep[:, index], index], frame_start, frame_end)
+        total += values.size
+    return written, total
+
+def key_grip(solver, frames, angles, frame_start, frame_end, key_tolerance=None):
+    return key_channels(solver.armature(), solver.channels(np.asarray(angles, dtype=np.float64)),
+                        frames, frame_start, frame_end, key_tolerance)
+
+def bake_grip(handroot, target, frame_start, frame_end, warm=True, tolerance=None,
+        self_collision=True, key_tolerance=None, workers=None):
+
+    # Bakes the grip over the frame range in three passes: everything the solve
+    # needs (hand placement, control bones, which prop) is read off each frame
+    # here on the main thread, the solving runs on a thread pool over chunks of
+    # frames (core.contact.solve_frames, workers threads), and the answers are
+    # keyed all at once back here (see key_channels for key_tolerance). With
+    # warm on, each frame starts from the last one, so a hand that's barely
+    # moving costs next to nothing per frame.
+
+    # A hand with a target schedule follows it, and frames where it isn't
+    # holding anything are left unkeyed
+
+    scene = bpy.context.scene
+    side = handroot.name[-1].upper()
+    schedule = hand_schedule(side)
+    if target is None and len(schedule):
+        target = bpy.data.objects[schedule.targets[0]]
+    solver = gripsolver(handroot, target, tolerance, self_collision)
+    mute_grip_constraints(solver.fingers, True)
+
+    # Every scheduled prop's grid is built before the first frame
+    slots = None
+    if len(schedule):
+        props = [bpy.data.objects[name] for name in schedule.targets]
+        stamps = [mesh_stamp(prop) for prop in props]
+        for prop, stamp in zip(props, stamps):
+            solver.prepare(prop, stamp)
+        slots = schedule.frame_slots(frame_start, frame_end)
+
+    previous = scene.frame_current
+    frames = []
+    targets = []
+    matrices = []
+    amounts = []
+    for frame in range(frame_start, frame_end + 1):
+        if slots is not None:
+            slot = slots[frame - frame_start]
+            if slot < 0:
+                continue
+            solver.use_target(props[slot], stamps[slot])
+        scene.frame_set(frame)
+        frames.append(frame)
+        targets.append(solver.target_name)
+        matrices.append(solver.hand_matrix())
+        amounts.append(solver.amounts())
+
+    # Each run of frames on the same prop is solved against that prop's grid
+    angles = np.zeros((len(frames), len(solver.fingers)))
+    requeried = 0
+    start = 0
+    while start < len(frames):
+        end = start
+        while end < len(frames) and targets[end] == targets[start] and \
+                (end == start or frames[end] == frames[end - 1] + 1):
+            end += 1
+        grid = solver.prepare(bpy.data.objects[targets[start]])[0]
+        run, run_requeried = core.contact.solve_frames(grid, solver.probe, matrices[start:end],
+            solver.tolerance, warm, self_collision, workers=workers)
+        angles[start:end] = run * np.asarray(amounts[start:end])
+        requeried += run_requeried
+        start = end
+    solver.release()
+
+    written, total = key_grip(solver, frames, angles, frame_start, frame_end, key_tolerance)
+    scene.frame_set(previous)
+
+    activeArmature[prefix + 'baked_' + side] = str(frame_start) + "-" + str(frame_end)
+    invalidate_panel()
+
+    print("Baked " + str(len(frames)) + " frames, re-solved " + str(requeried) + " of " +
+        str(len(frames) * len(solver.fingers)) + " finger solves, kept " + str(written) + " of " +
+        str(total) + " keys")
+    return solver
+
+def quaternion_channels(bone, quaternions):
+
+    # (frames, 4) local rotations as one bone's rotation channels, in the form
+    # gripsolver.channels gives them
+
+    if bone.rotation_mode == 'QUATERNION':
+        return 'rotation_quaternion', quaternions, 0.5
+    values = np.empty((len(quaternions), 4 if bone.rotation_mode == 'AXIS_ANGLE' else 3))
+    euler = None
+    for k, q in enumerate(quaternions):
+        q = mathutils.Quaternion(q)
+        if bone.rotation_mode == 'AXIS_ANGLE':
+            axis, angle = q.to_axis_angle()
+            values[k] = (angle, axis[0], axis[1], axis[2])
+        else:
+            euler = q.to_euler(bone.rotation_mode, euler) if euler is not None \
+                else q.to_euler(bone.rotation_mode)
+            values[k] = euler
+    return ('rotation_axis_angle', values, 1.0) if bone.rotation_mode == 'AXIS_ANGLE' \
+        else ('rotation_euler', values, 1.0)
+
+def hand_mapping(armature, side):
+
+    # The core.canonical.RigMapping for one side ('L'/'R') of an armature
+
+    rig = armature.global_rig_choice
+    return core.canonical.mapping(rig, rigs.hand_root_name(rig, side)[-1])
+
+rotation_channels = {'QUATERNION': ('rotation_quaternion', 4), 'AXIS_ANGLE': ('rotation_axis_angle', 4)}
+
+def channel_values(action, bone, frames):
+
+    # (frames, components) of a pose bone's rotation channel straight off its
+    # F-curves, without moving the scene, or None if any component isn't keyed.
+    # Linear curves (what a bake writes) are interpolated from the keys in one
+    # go; anything else is evaluated curve by curve.
+
+    path, width = rotation_channels.get(bone.rotation_mode, ('rotation_euler', 3))
+    path = bone.path_from_id(path)
+    fcurves = [action.fcurves.find(path, index=i) for i in range(width)]
+    if any(fcurve is None or fcurve.mute or not len(fcurve.keyframe_points) for fcurve in fcurves):
+        return None
+
+    frames = np.asarray(frames, dtype=np.float64)
+    linear = bpy.types.Keyframe.bl_rna.properties['interpolation'].enum_items['LINEAR'].value
+    values = np.empty((len(frames), width))
+    for i, fcurve in enumerate(fcurves):
+        points = fcurve.keyframe_points
+        co = np.empty(2 * len(points), dtype=np.float32)
+        points.foreach_get("co", co)
+        interpolation = np.empty(len(points), dtype=np.int32)
+        points.foreach_get("interpolation", interpolation)
+        if (np.all(interpolation[:-1] == linear) and fcurve.extrapolation == 'CONSTANT'
+                and not len(fcurve.modifiers)):
+            values[:, i] = np.interp(frames, co[0::2], co[1::2])
+        else:
+            values[:, i] = [fcurve.evaluate(frame) for frame in frames]
+    return values
+
+def channel_quaternions(rotation_mode, values):
+
+    # (frames, 4) quaternions from a rotation channel's values in rotation_mode
+
+    if rotation_mode == 'QUATERNION':
+        return values
+    elif rotation_mode == 'AXIS_ANGLE':
+        return np.array([mathutils.Quaternion(v[1:], v[0]) for v in values])
+    return np.array([mathutils.Euler(v, rotation_mode).to_quaternion() for v in values])
+
+def read_rotations(armature, mappings, frames=None):
+
+    # Local rotations of each mapping's phalanges, (frames, phalanges, 4) per
+    # mapping, on the current frame or on each of frames. Bones with their
+    # rotation keyed in the armature's action (a bake) are read off the
+    # F-curves; only the rest need the scene stepped through the frames, which
+    # every mapping then shares. Bones the armature doesn't have read as rest.
+
+    bones = [[armature.pose.bones.get(name) for name in m.phalange_names] for m in mappings]
+    scene = bpy.context.scene
+    previous = scene.frame_current
+    frames = [previous] if frames is None else list(frames)
+    animation = armature.animation_data
+    action = animation.action if animation is not None else None
+
+    rotations = [np.zeros((len(frames), len(m), 4)) for m in mappings]
+    unbaked = []
+    for quaternions, hand in zip(rotations, bones):
+        quaternions[..., 0] = 1.0
+        for i, bone in enumerate(hand):
+            if bone is None:
+                continue
+            values = channel_values(action, bone, frames) if action is not None else None
+            if values is None:
+                unbaked.append((quaternions, i, bone))
+            else:
+                quaternions[:, i] = channel_quaternions(bone.rotation_mode, values)
+
+    if not unbaked:
+        return frames, rotations
+    for k, frame in enumerate(frames):
+        if frame != scene.frame_current:
+            scene.frame_set(frame)
+        for quaternions, i, bone in unbaked:
+            quaternions[k, i] = bone_rotation(bone)
+    if scene.frame_current != previous:
+        scene.frame_set(previous)
+    return frames, rotations
+
+def read_canonical(armature, side, frames=None):
+
+    # One hand's pose as a core.canonical.CanonicalPose, on the current frame or
+    # on each of frames
+
+    mapping = hand_mapping(armature, side)
+    frames, (quaternions,) = read_rotations(armature, [mapping], frames)
+    return core.canonical.CanonicalPose.read(mapping, frames, quaternions)
+
+def apply_canonical(armature, side, pose, key=False, key_tolerance=None):
+
+    # Puts a CanonicalPose on one hand of any supported rig. Unkeyed, only its
+    # first frame is posed; keyed, every frame goes in the way a bake does and
+    # the AutoGrip IK on those bones is muted so the keys show. Returns the
+    # number of keys written.
+
+    mapping = hand_mapping(armature, side)
+    rotations = pose.rotations(mapping)
+    found = [(i, armature.pose.bones[name]) for i, name in enumerate(mapping.phalange_names)
+             if name in armature.pose.bones]
+
+    if not key:
+        for i, bone in found:
+            set_bone_rotation(bone, mathutils.Quaternion(rotations[0, i]))
+        return 0
+
+    channels = ((bone.name,) + quaternion_channels(bone, rotations[:, i]) for i, bone in found)
+    written, total = key_channels(armature, channels, pose.frames, int(pose.frames.min()),
+                                  int(pose.frames.max()), key_tolerance)
+    for i, bone in found:
+        for c in bone.constraints:
+            if prefix in c.name:
+                c.mute = True
+    return written
+
+def retarget_grip(source, target, frames=None, key_tolerance=None):
+
+    # Copies both hands' grip from one armature to another through the
+    # canonical hand, whatever rig type each one is. On the current frame by
+    # default, or keyed over frames.
+
+    written = 0
+    for side in ('L', 'R'):
+        pose = read_canonical(source, side, frames)
+        written += apply_canonical(target, side, pose, frames is not None, key_tolerance)
+    invalidate_panel()
+    return written
+
+def export_grip_stream(armature, path, frame_start, frame_end):
+
+    # Writes both hands' rotations over a frame range to a core.stream pose
+    # stream at path. Returns the number of frames written.
+
+    mappings = [hand_mapping(armature, side) for side in ('L', 'R')]
+    frames, rotations = read_rotations(armature, mappings, range(frame_start, frame_end + 1))
+    quaternions = np.stack([core.stream.canonical_quaternions(m, r)
+                            for m, r in zip(mappings, rotations)], axis=1)
+    render = bpy.context.scene.render
+    core.stream.write_stream(bpy.path.abspath(path), quaternions, frame_start,
+                             render.fps / render.fps_base, mappings)
+    return len(frames)
+
+# Hands being solved live while scrubbing, by (armature name, side)
+live_grips = {}
+
+# How many solved frames each live hand keeps for scrubbing back over
+solve_cache_size = 1024
+
+def camera_projection(scene, depsgraph):
+
+    # The scene camera's world to frame projection, as an array, or None
+    # without a camera
+
+    camera = scene.camera
+    if camera is None:
+        return None
+    render = scene.render
+    matrix = camera.calc_matrix_camera(depsgraph, x=render.resolution_x, y=render.resolution_y,
+        scale_x=render.pixel_aspect_x, scale_y=render.pixel_aspect_y)
+    return np.array(matrix @ camera.matrix_world.inverted())
+
+def update_detail(solver, scene, projection):
+
+    # Sets how much detail each finger on a live hand gets this frame. Per shot,
+    # it's only worked out again when the scene camera changes.
+
+    armature = solver.armature()
+    if not armature.autogrip_lod or projection is None:
+        solver.solver.detail = None
+        solver.detail_camera = None
+        return
+    if armature.autogrip_lod_update == 'SHOT' and solver.detail_camera == scene.camera.name \
+            and solver.solver.detail is not None:
+        return
+    solver.solver.detail = solver.screen_detail(projection, armature.autogrip_lod_near,
+                                                armature.autogrip_lod_far)
+    solver.detail_camera = scene.camera.name
+
+@bpy.app.handlers.persistent
+def live_grip_update(scene, depsgraph=None):
+
+    # Every live hand gripping the same prop is solved in one go by its session.
+    # Hands whose inputs match a frame they've already solved (scrubbing back
+    # over a shot, usually) just get that answer again, with no solve at all.
+    # With level of detail on, fingers small on screen are solved less often.
+
+    projection = None
+    if live_grips and scene.camera is not None:
+        projection = camera_projection(scene, depsgraph or bpy.context.evaluated_depsgraph_get())
+
+    by_target = {}
+    # Each prop's mesh is stamped once a frame, however many hands grip it, so
+    # an edit rebuilds its session and every hand on it rejoins
+    stamps = {}
+    for key, solver in list(live_grips.items()):
+        try:
+            scheduled = scheduled_hands.get(key)
+            name = solver.target_name
+            if scheduled is not None:
+                name = scheduled[0].target(scene.frame_current)
+                if name is None:
+                    continue
+            target = bpy.data.objects[name]
+            if name not in stamps:
+                stamps[name] = mesh_stamp(target)
+            solver.use_target(target, stamps[name])
+            update_detail(solver, scene, projection)
+            matrix = solver.hand_matrix()
+            amounts = solver.amounts()
+            cached = None
+            if solver.armature().autogrip_solve_cache:
+                input_key = solver.input_key(matrix, amounts)
+                cached = solver.cache.get(input_key)
+            else:
+                input_key = None
+                solver.cache.clear()
+            if cached is not None:
+                solver.apply(cached)
+                continue
+            by_target.setdefault(solver.target_name, []).append(
+                (key, solver, matrix, amounts, input_key))
+        except (KeyError, ReferenceError):
+            print("Live grip on " + key[0] + " lost its bones or target, turning it off")
+            del live_grips[key]
+
+    for name, hands in by_target.items():
+        try:
+            session = grip_sessions[name][1]
+            results = session.solve({hand[1].key(): hand[2] for hand in hands})
+        except (KeyError, ReferenceError):
+            # Turns off whichever hands it was down to, below
+            results = {}
+        for key, solver, matrix, amounts, input_key in hands:
+            try:
+                angles = solver.finish(results[solver.key()], amounts)
+                solver.apply(angles)
+                # Held fingers depend on what came before, not just the inputs
+                detail = solver.solver.detail
+                if input_key is not None and (detail is None or (detail == core.contact.FULL).all()):
+                    solver.cache.put(input_key, angles)
+            except (KeyError, ReferenceError):
+                print("Live grip on " + key[0] + " lost its bones, turning it off")
+                solver.release()
+                del live_grips[key]
+
+def toggle_live_grip(handroot, side, target):
+
+    # Turns live solving on for a hand if it's off and vice versa.
+    # Returns True if it's now on.
+
+    invalidate_panel()
+    key = (obj.name, side)
+    if key in live_grips:
+        solver = live_grips.pop(key)
+        solver.release()
+        mute_grip_constraints(solver.fingers, False)
+        return False
+
+    if key in detail_hands:
+        detail_hands[key].release()
+    solver = gripsolver(handroot, target)
+    mute_grip_constraints(solver.fingers, True)
+    live_grips[key] = solver
+    solver.apply(solver.solve())
+    return True
+
+# Level of detail for hands running on their constraints, by (armature name,
+# side). Live Grip does its own in the solver; these are the hands that aren't
+# on it. Armed for every set up hand when "Level of Detail" is ticked, and
+# again when a file loads.
+detail_hands = {}
+
+class stackdetail:
+
+    # One hand's constraint stack at the three levels of detail, finger by
+    # finger:
+    #  FULL: every phalange's projector shrinkwraps onto the prop
+    #  COARSE: one projector per finger, on its first phalange, which puts the
+    #    finger against the prop; the rest of its phalanges have their
+    #    constraints off and curl from the curl table (core.contact.CurlTable)
+    #    of what the constraints gave them at each amount of closing while the
+    #    finger was in full detail
+    #  HOLD: all of the finger's constraints are off and it's posed from the
+    #    curl table
+    # Fingers with nothing in the table yet stay at FULL. Levels only touch
+    # the constraints when they change, and a phalange's own rotations are put
+    # back when it comes off the table.
+
+    def __init__(self, armature, handroot, side):
+        self.armature_name = armature.name
+        self.side = side
+        model = hand_model(handroot)
+        self.phalange_names = [list(model.phalange_names[model.rows(i)]) for i in range(len(model))]
+        self.control_names = [name if name in armature.pose.bones else None
+                              for name in model.control_names()]
+        self.table = core.contact.CurlTable(len(model),
+                                            max(len(names) for names in self.phalange_names))
+        self.levels = np.full(len(model), core.contact.FULL, dtype=np.int8)
+        self.held = {}
+        self.detail_camera = None
+
+    def armature(self):
+        return bpy.data.objects[self.armature_name]
+
+    def screen_levels(self, projection, near, far, margin=0.1):
+
+        # Level for every finger from how long it is through the camera, root
+        # to tip as it's posed, the way gripsolver.screen_detail does it
+
+        armature = self.armature()
+        bones = armature.pose.bones
+        world = np.array(armature.matrix_world)
+        points = np.array([[bones[names[0]].head, bones[names[-1]].tail]
+                           for names in self.phalange_names])
+        points = points @ world[:3, :3].T + world[:3, 3]
+        frame, depth = core.geometry.screen_points(projection, points)
+        sizes = np.linalg.norm(frame[:, 1] - frame[:, 0], axis=-1)
+        inside = (depth > 0.0) & np.all((frame >= -margin) & (frame <= 1.0 + margin), axis=-1)
+        return core.contact.detail_levels(sizes, inside.any(axis=1), near, far)
+
+    def record(self, depsgraph, amounts):
+
+        # Adds what the constraints just gave every finger in full detail to
+        # the curl table, as rotations in each phalange's own space
+
+        evaluated = self.armature().evaluated_get(depsgraph)
+        bones = evaluated.pose.bones
+        for i in np.flatnonzero(self.levels == core.contact.FULL):
+            rotations = []
+            for name in self.phalange_names[i]:
+                bone = bones[name]
+                local = evaluated.convert_space(pose_bone=bone, matrix=bone.matrix,
+                                                from_space='POSE', to_space='LOCAL')
+                rotations.append(tuple(local.to_quaternion()))
+            self.table.record(i, amounts[i], rotations)
+
+    def live_phalanges(self, finger, level):
+
+        # How many of the finger's phalanges, from the first, keep their
+        # constraints at a level. The rest are posed from the curl table.
+
+        if level == core.contact.FULL:
+            return len(self.phalange_names[finger])
+        return 1 if level == core.contact.COARSE else 0
+
+    def set_level(self, finger, level):
+
+        # Mutes or unmutes each phalange's constraints (its IK and its
+        # projector's) for a level, and saves or puts back its own rotations
+        # as it goes on or comes off the curl table
+
+        bones = self.armature().pose.bones
+        live = self.live_phalanges(finger, level)
+        held = self.held.setdefault(finger, {})
+        for j, name in enumerate(self.phalange_names[finger]):
+            mute = j >= live
+            for c in list(bones[name].constraints) + list(bones["projector_" + name].constraints):
+                if prefix in c.name and c.mute != mute:
+                    c.mute = mute
+            if mute and name not in held:
+                held[name] = bone_rotation(bones[name])
+            elif not mute and name in held:
+                set_bone_rotation(bones[name], held.pop(name))
+        self.levels[finger] = level
+
+    def update(self, scene, depsgraph, projection):
+
+        # Records this frame's full detail fingers, then moves every finger to
+        # the level it should be at now and poses the held ones
+
+        armature = self.armature()
+        amounts = control_amounts(armature, self.control_names)
+        self.record(depsgraph, amounts)
+
+        if armature.autogrip_lod_update == 'SHOT' and self.detail_camera == scene.camera.name:
+            levels = self.levels.copy()
+        else:
+            levels = self.screen_levels(projection, armature.autogrip_lod_near,
+                                        armature.autogrip_lod_far)
+            self.detail_camera = scene.camera.name
+
+        bones = armature.pose.bones
+        for i, level in enumerate(levels):
+            if not self.table.known(i):
+                level = core.contact.FULL
+            if level != self.levels[i]:
+                self.set_level(i, level)
+            live = self.live_phalanges(i, level)
+            if live < len(self.phalange_names[i]):
+                rotations = self.table.lookup(i, amounts[i])
+                for name, rotation in list(zip(self.phalange_names[i], rotations))[live:]:
+                    set_bone_rotation(bones[name], mathutils.Quaternion(rotation))
+
+    def release(self):
+
+        # Back to full detail on every finger
+
+        for i in np.flatnonzero(self.levels != core.contact.FULL):
+            self.set_level(i, core.contact.FULL)
+        self.detail_camera = None
+
+def arm_stack_detail(armature):
+
+    # Level of detail on every set up hand of an armature that isn't on Live Grip
+
+    use_armature(armature)
+    for side in ('L', 'R'):
+        key = (armature.name, side)
+        if armature.data.get(prefix + 'hand_' + side) and key not in detail_hands:
+            try:
+                detail_hands[key] = stackdetail(armature, find_hand_root(side), side)
+            except (KeyError, RuntimeError):
+                print("Couldn't set up level of detail on " + armature.name + " hand " + side)
+
+def disarm_stack_detail(armature):
+    for key in [key for key in detail_hands if key[0] == armature.name]:
+        try:
+            detail_hands.pop(key).release()
+        except (KeyError, ReferenceError):
+            pass
+
+def update_lod_toggle(self, context):
+    if self.type != 'ARMATURE':
+        return
+    if self.autogrip_lod:
+        arm_stack_detail(self)
+    else:
+        disarm_stack_detail(self)
+
+@bpy.app.handlers.persistent
+def stack_detail_update(scene, depsgraph=None):
+
+    # Runs after Live Grip's handler. Without a camera there's nothing to
+    # measure fingers against, so every hand goes back to full detail.
+
+    if not detail_hands:
+        return
+    depsgraph = depsgraph or bpy.context.evaluated_depsgraph_get()
+    projection = camera_projection(scene, depsgraph)
+
+    for key, hand in list(detail_hands.items()):
+        try:
+            # Live Grip and baked keys have the constraints muted already
+            if key in live_grips or hand.armature().data.get(prefix + 'baked_' + key[1]):
+                continue
+            if projection is None:
+                hand.release()
+            else:
+                hand.update(scene, depsgraph, projection)
+        except (KeyError, ReferenceError):
+            print("Level of detail on " + key[0] + " lost its bones, turning it off")
+            del detail_hands[key]
+
+@bpy.app.handlers.persistent
+def stack_detail_load_post(*args):
+    detail_hands.clear()
+    for candidate in bpy.data.objects:
+        if candidate.type == 'ARMATURE' and candidate.autogrip_lod:
+            arm_stack_detail(candidate)
+
+# Scheduled hands, switched over on frame change, by (armature name, side):
+# [schedule, shrinkwrap target name for each of its slots, projector names,
+# slot last applied]. Everything's looked up when the schedule is armed, so
+# a frame change only indexes the schedule's frame table.
+scheduled_hands = {}
+
+def hand_schedule(side):
+
+    # The hand's target schedule, saved on the armature as JSON
+
+    return core.schedule.TargetSchedule.from_json(activeArmature.get(prefix + 'schedule_' + side, ""))
+
+def arm_schedule(handroot, side):
+
+    # Gets a hand's schedule ready for playback: grip proxies built for every
+    # scheduled prop (when proxies are on), projectors found, and the current
+    # frame's target applied
+
+    key = (obj.name, side)
+    schedule = hand_schedule(side)
+    scheduled_hands.pop(key, None)
+    if not len(schedule):
+        return None
+
+    wraps = []
+    for name in schedule.targets:
+        target = bpy.data.objects[name]
+        if obj.autogrip_use_proxy:
+            target = grip_proxy(target)
+        wraps.append(target.name)
+
+    model = core.hand.HandModel.plan(obj.global_rig_choice, handroot.name[-1])
+    projectors = [n for n in model.projector_names() if n in obj.pose.bones]
+
+    scheduled_hands[key] = [schedule, wraps, projectors, None]
+    apply_schedule(key, bpy.context.scene.frame_current)
+    return schedule
+
+def apply_schedule(key, frame):
+    entry = scheduled_hands[key]
+    slot = entry[0].slot(frame)
+    if slot == entry[3]:
+        return
+    armature = bpy.data.objects[key[0]]
+    target = None if slot < 0 else bpy.data.objects[entry[1][slot]]
+    for name in entry[2]:
+        for c in armature.pose.bones[name].constraints:
+            if 'hrinkwrap' in c.name:
+                c.target = target
+    entry[3] = slot
+
+@bpy.app.handlers.persistent
+def schedule_update(scene, depsgraph=None):
+    for key in list(scheduled_hands):
+        try:
+            apply_schedule(key, scene.frame_current)
+        except (KeyError, ReferenceError):
+            print("Target schedule on " + key[0] + " lost its bones or props, turning it off")
+            del scheduled_hands[key]
+
+@bpy.app.handlers.persistent
+def schedule_load_post(*args):
+
+    # Schedules are saved with the file, but the lookups need redoing
+
+    scheduled_hands.clear()
+    for candidate in bpy.data.objects:
+        if candidate.type != 'ARMATURE':
+            continue
+        for side in ('L', 'R'):
+            if candidate.data.get(prefix + 'schedule_' + side):
+                use_armature(candidate)
+                try:
+                    arm_schedule(find_hand_root(side), side)
+                except (KeyError, RuntimeError):
+                    print("Couldn't arm the target schedule on " + candidate.name)
+
+def schedule_hand_target(side, target, first, last, clear=False):
+
+    # Adds a frame range to a hand's schedule (or clears it) and arms it again
+
+    if clear:
+        activeArmature.pop(prefix + 'schedule_' + side, None)
+    else:
+        activeArmature[prefix + 'schedule_' + side] = hand_schedule(side).added(first, last,
+            target.name).to_json()
+    invalidate_panel()
+    return arm_schedule(find_hand_root(side), side)
+
+class ScheduleTargetLeft(bpy.types.Operator):
+    """Have the left hand hold the selected mesh over a range of frames"""
+    bl_idname = "object.autogrip_schedule_l"
+    bl_label = "Schedule Target L"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    first: bpy.props.IntProperty(name="First Frame")
+    last: bpy.props.IntProperty(name="Last Frame")
+    clear: bpy.props.BoolProperty(name="Clear Schedule", default=False,
+        description="Forget the whole schedule instead of adding to it")
+
+    def invoke(self, context, event):
+        self.first = context.scene.frame_current
+        self.last = context.scene.frame_end
+        return self.execute(context)
+
+    def execute(self, context):
+
+        global obj
+        obj = bpy.context.active_object
+
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+
+        target = grasp_target()
+        if target is None and not self.clear:
+            self.report({'ERROR'}, "Select a mesh to schedule")
+            return {'CANCELLED'}
+
+        schedule = schedule_hand_target('L', target, self.first, self.last, self.clear)
+        if schedule is None:
+            self.report({'INFO'}, "Left hand has no schedule")
+        else:
+            self.report({'INFO'}, "Left hand switches target " + str(len(schedule.switches())) +
+                " times")
+        return {'FINISHED'}
+
+class ScheduleTargetRight(bpy.types.Operator):
+    """Have the right hand hold the selected mesh over a range of frames"""
+    bl_idname = "object.autogrip_schedule_r"
+    bl_label = "Schedule Target R"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    first: bpy.props.IntProperty(name="First Frame")
+    last: bpy.props.IntProperty(name="Last Frame")
+    clear: bpy.props.BoolProperty(name="Clear Schedule", default=False,
+        description="Forget the whole schedule instead of adding to it")
+
+    def invoke(self, context, event):
+        self.first = context.scene.frame_current
+        self.last = context.scene.frame_end
+        return self.execute(context)
+
+    def execute(self, context):
+
+        global obj
+        obj = bpy.context.active_object
+
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+
+        target = grasp_target()
+        if target is None and not self.clear:
+            self.report({'ERROR'}, "Select a mesh to schedule")
+            return {'CANCELLED'}
+
+        schedule = schedule_hand_target('R', target, self.first, self.last, self.clear)
+        if schedule is None:
+            self.report({'INFO'}, "Right hand has no schedule")
+        else:
+            self.report({'INFO'}, "Right hand switches target " + str(len(schedule.switches())) +
+                " times")
+        return {'FINISHED'}
+
+class BakeGripLeft(bpy.types.Operator):
+    """Solve and keyframe the left hand's grip over the scene's frame range"""
+    bl_idname = "object.autogrip_bake_l"
+    bl_label = "Bake Grip L"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    warm_start: bpy.props.BoolProperty(name="Warm Start", default=True,
+        description="Start each frame from the last frame's answer instead of from scratch")
+    mute_constraints: bpy.props.BoolProperty(name="Mute Constraints", default=True,
+        description="Leave the AutoGrip constraints muted afterwards so the baked keys show")
+    self_collision: bpy.props.BoolProperty(name="Finger Collision", default=True,
+        description="Open fingers back up where they'd sink into each other")
+    reduce_keys: bpy.props.BoolProperty(name="Reduce Keys", default=True,
+        description="Only keep the keys needed to stay within Key Tolerance of the solve")
+    key_tolerance: bpy.props.FloatProperty(name="Key Tolerance", default=0.005, min=0.0,
+        max=0.1, subtype='ANGLE',
+        description="How far a reduced curve may drift from the baked rotation")
+
+    def execute(self, context):
+
+        global obj
+        obj = bpy.context.active_object
+
+        global activeArmature
+        activeArmature = bpy.context.active_object.data
+
+        lefthandroot = find_hand_root('L')
+        fingers = assemble_hand(lefthandroot)
+        for f in fingers:
+            f.reconstruct()
+
+        target = hand_target(fingers)
+        if target is None:
+            target = grasp_target()
+        if target is None and not len(hand_schedule('L')):
+            self.report({'ERROR'}, "Set a grip target or select a mesh to bake against")
+            return {'CANCELLED'}
+
+        scene = bpy.context.scene
+        solver = bake_grip(lefthandroot, target, scene.frame_start, scene.frame_end, self.warm_start,
+            self_collision=self.self_collision,
+            key_tolerance=self.key_tolerance if self.reduce_keys else None)
+        if not self.mute_constraints:
+            mute_grip_constraints(solver.fingers, False)
+
+        return {'FINISHED'}
+
+class BakeGripRight(bpy.types.Operator):
+    """Solve and keyframe the right hand's grip over the scene's frame range"""
+    bl_idname = "object.autogrip_bake_r"
+    bl_label = "Bake Grip R"
+    bl_options = {'REGISTER', 'UNDO'}
+
+    warm_start: bpy.props.BoolProperty(name="Warm Start", default=True,
+        description="Start each frame from the last frame's answer instead of from scratch")
+    mute_constraints: bpy.props.BoolProperty(name="Mute Constraints", default=True,
+        description="Leave the AutoGrip constraints muted afterwards so the baked keys show")
+    self_collision: bpy.props.BoolProperty(name="Finger Collision", default=True,
+        description="Open fingers back up where they'd sink into each other")
+    reduce_keys: bpy.props.BoolProperty(name="Reduce Keys", default=True,
+        description="Only keep the keys needed to stay within Key Tolerance of the solve")
+    key_tolerance: bpy.props.FloatProperty(name="Key Tolerance", default=0.005, min=0.0,
+        max=0.1, subtype='ANGLE',
+        description="How far a reduced curve may drift from the baked rotation")
+
+    def execute(self, context):
+
+        global obj
         obj = bpy.context.active_object
-        
+
         global activeArmature
         activeArmature = bpy.context.active_object.data
-        
-        print("skeleton is " + activeArmature.name)
-        
-        if (prefix + 'hand_L') in activeArmature:
-            if activeArmature[(prefix + 'hand_L')] == True:
-                print("Left hand already set up.")
-                return {'FINISHED'}
-            
-        # I'm gonna wrap this up better into a find_handroot function
-        
-        lefthandroot = find_hand_root('l')
-        
-        setup_hand(lefthandroot)
-        
-        activeArmature[(prefix + 'hand_L')] = True
-        
+
+        righthandroot = find_hand_root('R')
+        fingers = assemble_hand(righthandroot)
+        for f in fingers:
+            f.reconstruct()
+
+        target = hand_target(fingers)
+        if target is None:
+            target = grasp_target()
+        if target is None and not len(hand_schedule('R')):
+            self.report({'ERROR'}, "Set a grip target or select a mesh to bake against")
+            return {'CANCELLED'}
+
+        scene = bpy.context.scene
+        solver = bake_grip(righthandroot, target, scene.frame_start, scene.frame_end, self.warm_start,
+            self_collision=self.self_collision,
+            key_tolerance=self.key_tolerance if self.reduce_keys else None)
+        if not self.mute_constraints:
+            mute_grip_constraints(solver.fingers, False)
+
         return {'FINISHED'}
-    
 
-            
-class AutoGripRight(bpy.types.Operator):
-    """Set up AutoGrip rig for right hand only"""
-    bl_idname = "object.autogrip_setup_right"
-    bl_label = "Setup Right"
-    bl_options = {'REGISTER', 'UNDO'}
+class LiveGripLeft(bpy.types.Operator):
+    """Solve the left hand's grip on every frame change instead of using the constraints"""
+    bl_idname = "object.autogrip_live_l"
+    bl_label = "Live Grip L"
 
     def execute(self, context):
-        print("\n~~~~~~~~~~~START~~~~~~~~~~~~\n")
-        
-        global obj 
+
+        global obj
         obj = bpy.context.active_object
-        
+
         global activeArmature
         activeArmature = bpy.context.active_object.data
-        print("skeleton is " + activeArmature.name)
-        
-        if (prefix + 'hand_R') in activeArmature:
-            if activeArmature[(prefix + 'hand_R')] == True:
-                print("Right hand already set up.")
-                return {'FINISHED'}
 
-        righthandroot = find_hand_root('r')
-        
-        setup_hand(righthandroot)
-        
-        activeArmature[(prefix + 'hand_R')] = True
-        
+        lefthandroot = find_hand_root('L')
+        fingers = assemble_hand(lefthandroot)
+        for f in fingers:
+            f.reconstruct()
+
+        target = hand_target(fingers)
+        if target is None:
+            target = grasp_target()
+        if target is None and (obj.name, 'L') not in live_grips:
+            self.report({'ERROR'}, "Set a grip target or select a mesh to grip")
+            return {'CANCELLED'}
+
+        if toggle_live_grip(lefthandroot, 'L', target):
+            self.report({'INFO'}, "Live grip on for left hand")
+        else:
+            self.report({'INFO'}, "Live grip off for left hand")
         return {'FINISHED'}
-            
-class TargetLeft(bpy.types.Operator):
-    """Set Grip Target for left hand"""
-    bl_idname = "object.autogrip_target_l"
-    bl_label = "Grip Target L"
-    bl_options = {'REGISTER', 'UNDO'}
+
+class LiveGripRight(bpy.types.Operator):
+    """Solve the right hand's grip on every frame change instead of using the constraints"""
+    bl_idname = "object.autogrip_live_r"
+    bl_label = "Live Grip R"
 
     def execute(self, context):
-        
-        #print(obj.name)
-        
-        global obj 
+
+        global obj
         obj = bpy.context.active_object
-        
+
         global activeArmature
         activeArmature = bpy.context.active_object.data
-        print("skeleton is " + activeArmature.name)
-        
-        target = None
 
-        lefthandroot = find_hand_root('L')
+        righthandroot = find_hand_root('R')
+        fingers = assemble_hand(righthandroot)
+        for f in fingers:
+            f.reconstruct()
 
-        for t in bpy.context.selected_objects:
-            if t != obj:
-                target = t
-                break
-        print("Grip target is " + target.name)
-        
-        left_hand_list = assemble_hand(lefthandroot)
-        
-        for i in left_hand_list:
-            i.reconstruct()
-            print("set target for left hand finger " + i.name)
-            i.target_shrinkwraps(target)
-        
+        target = hand_target(fingers)
+        if target is None:
+            target = grasp_target()
+        if target is None and (obj.name, 'R') not in live_grips:
+            self.report({'ERROR'}, "Set a grip target or select a mesh to grip")
+            return {'CANCELLED'}
+
+        if toggle_live_grip(righthandroot, 'R', target):
+            self.report({'INFO'}, "Live grip on for right hand")
+        else:
+            self.report({'INFO'}, "Live grip off for right hand")
         return {'FINISHED'}
-    
-class TargetRight(bpy.types.Operator):
-    """Set Grip Target for right hand"""
-    bl_idname = "object.autogrip_target_r"
-    bl_label = "Grip Target R"
+
+
+class RetargetGrip(bpy.types.Operator):
+    """Copy both hands' grip from the other selected armature onto the active one, whatever rig each is"""
+    bl_idname = "object.autogrip_retarget"
+    bl_label = "Retarget Grip"
     bl_options = {'REGISTER', 'UNDO'}
 
+    whole_range: bpy.props.BoolProperty(name="Whole Range", default=True,
+        description="Key the grip over the scene's frame range instead of posing the current frame")
+    reduce_keys: bpy.props.BoolProperty(name="Reduce Keys", default=True,
+        description="Only keep the keys needed to stay within Key Tolerance of the source")
+    key_tolerance: bpy.props.FloatProperty(name="Key Tolerance", default=0.005, min=0.0,
+        max=0.1, subtype='ANGLE',
+        description="How far a reduced curve may drift from the source's rotation")
+
     def execute(self, context):
-        
-        #print(obj.name)
-        
-        global obj 
+
+        target = bpy.context.active_object
+        sources = [o for o in bpy.context.selected_objects
+                   if o is not target and o.type == 'ARMATURE']
+        if not sources:
+            self.report({'ERROR'}, "Select the armature to copy from, then the one to copy onto")
+            return {'CANCELLED'}
+
+        scene = bpy.context.scene
+        frames = range(scene.frame_start, scene.frame_end + 1) if self.whole_range else None
+        written = retarget_grip(sources[0], target, frames,
+                                self.key_tolerance if self.reduce_keys else None)
+        if self.whole_range:
+            self.report({'INFO'}, "Retargeted grip from " + sources[0].name + ", " +
+                        str(written) + " keys")
+        return {'FINISHED'}
+
+class ExportGripStream(bpy.types.Operator):
+    """Write both hands' grip over the scene's frame range to a binary pose stream for other tools"""
+    bl_idname = "object.autogrip_export_stream"
+    bl_label = "Export Pose Stream"
+
+    filepath: bpy.props.StringProperty(name="Stream", subtype='FILE_PATH',
+        default="//autogrip.agps", description="Where to write the pose stream")
+
+    def execute(self, context):
+
+        armature = bpy.context.active_object
+        scene = bpy.context.scene
+        frames = export_grip_stream(armature, self.filepath, scene.frame_start, scene.frame_end)
+        self.report({'INFO'}, "Wrote " + str(frames) + " frames to " + self.filepath)
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
+
+def deform_only(meshobj):
+
+    # Turns off every modifier after the last Armature one, so the evaluated
+    # mesh keeps its original vertex order. Returns the ones it turned off.
+
+    last = -1
+    for i, m in enumerate(meshobj.modifiers):
+        if m.type == 'ARMATURE':
+            last = i
+    disabled = []
+    for m in list(meshobj.modifiers)[last + 1:]:
+        if m.show_viewport:
+            m.show_viewport = False
+            disabled.append(m)
+    return disabled
+
+def qa_report(frame_start, frame_end, path=None, markers=10, threshold=0.0005):
+
+    # Steps through the frame range and checks every finger of every set up hand
+    # against its grip target, using the deformed hand mesh. For each frame and
+    # finger it records how deep the skin goes into the prop (penetration) and
+    # how far the closest bit of skin is from it otherwise (gap, None if it's out
+    # of reach). Writes JSON or CSV depending on path's extension, and drops
+    # timeline markers on the worst frames.
+    # Returns the report as a dict.
+
+    scene = bpy.context.scene
+    meshes = skinned_meshes()
+
+    hands = []
+    for side in ('L', 'R'):
+        if not activeArmature.get(prefix + 'hand_' + side):
+            continue
+        handroot = find_hand_root(side)
+        fingers = assemble_hand(handroot)
+        for f in fingers:
+            f.reconstruct()
+        target = proxy_source(hand_target(fingers))
+        if target is None:
+            print("Hand " + side + " has no grip target, skipping it")
+            continue
+
+        radii = finger_radii(fingers)
+        scale = float(np.mean(list(radii.values()))) if radii else default_thickness
+
+        # Always the full mesh for QA, in its local space, and never thinned:
+        # the tangent plane at a thinned out vertex can sit millimetres off
+        # the real surface, which would read as clipping on a clean grip
+        verts, normals = mesh_arrays(target, world=False)
+        grid = core.contact.SurfaceGrid(verts, normals, cell_size=4.0 * scale, resolution=0.0)
+
+        model = finger_model(fingers)
+        phalanges = model.phalange_names
+        finger_of = model.finger_of.astype(np.int64)
+
+        # Finger vertices on each skinned mesh, sorted by finger
+        parts = []
+        for meshobj in meshes:
+            rows, members = phalange_vertices(meshobj, phalanges)
+            if len(members):
+                owner = finger_of[rows]
+                order = np.argsort(owner, kind='stable')
+                parts.append((meshobj, members[order], owner[order]))
+
+        hands.append({'side': side, 'fingers': [f.name for f in fingers], 'target': target,
+            'grid': grid, 'parts': parts})
+
+    if not hands:
+        raise RuntimeError("No set up hands with grip targets and skinned meshes to check")
+
+    rows = []
+    disabled = []
+    previous = scene.frame_current
+    try:
+        for meshobj in meshes:
+            disabled += deform_only(meshobj)
+
+        for frame in range(frame_start, frame_end + 1):
+            scene.frame_set(frame)
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+
+            positions = {}
+            for meshobj in meshes:
+                evaluated = meshobj.evaluated_get(depsgraph)
+                mesh = evaluated.to_mesh()
+                co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+                mesh.vertices.foreach_get("co", co)
+                evaluated.to_mesh_clear()
+                if len(co) != len(meshobj.data.vertices) * 3:
+                    raise RuntimeError(meshobj.name + " changes vertex count when evaluated, " +
+                        "can't match its vertices to fingers")
+                positions[meshobj.name] = co.reshape(-1, 3)
+
+            for hand in hands:
+                finger_count = len(hand['fingers'])
+                closest = np.full(finger_count, np.inf)
+                to_prop = np.array(hand['target'].matrix_world.inverted())
+
+                for meshobj, members, owner in hand['parts']:
+                    local = to_prop @ np.array(meshobj.matrix_world)
+                    points = positions[meshobj.name][members] @ local[:3, :3].T + local[:3, 3]
+                    signed = hand['grid'].signed_distance(points)
+                    np.minimum.at(closest, owner, signed)
+
+                for i, name in enumerate(hand['fingers']):
+                    rows.append({
+                        'frame': frame,
+                        'hand': hand['side'],
+                        'finger': name,
+                        'penetration': float(max(-closest[i], 0.0)),
+                        'gap': float(max(closest[i], 0.0)) if np.isfinite(closest[i]) else None,
+                    })
+    finally:
+        for m in disabled:
+            m.show_viewport = True
+        scene.frame_set(previous)
+
+    # Worst frames by deepest penetration of any finger
+    worst = {}
+    for row in rows:
+        if row['penetration'] > worst.get(row['frame'], (0.0, None))[0]:
+            worst[row['frame']] = (row['penetration'], row['hand'] + ' ' + row['finger'])
+    ranked = sorted(worst.items(), key=lambda item: -item[1][0])
+    ranked = [(frame, depth, finger) for frame, (depth, finger) in ranked if depth > threshold]
+
+    for marker in list(scene.timeline_markers):
+        if marker.name.startswith(prefix + "QA"):
+            scene.timeline_markers.remove(marker)
+    for frame, depth, finger in ranked[:markers]:
+        scene.timeline_markers.new(prefix + "QA " + finger + " " + str(round(depth, 4)), frame=frame)
+
+    report = {
+        'armature': obj.name,
+        'frame_start': frame_start,
+        'frame_end': frame_end,
+        'threshold': threshold,
+        'worst': [{'frame': f, 'penetration': d, 'finger': n} for f, d, n in ranked[:markers]],
+        'rows': rows,
+    }
+
+    if path:
+        write_qa_report(report, bpy.path.abspath(path))
+    print("QA checked " + str(frame_end - frame_start + 1) + " frames, " + str(len(ranked)) +
+        " with penetration over " + str(threshold))
+    return report
+
+def write_qa_report(report, path):
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=['frame', 'hand', 'finger', 'penetration', 'gap'])
+            writer.writeheader()
+            writer.writerows(report['rows'])
+    else:
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=1)
+    print("Wrote QA report to " + path)
+
+class GripQA(bpy.types.Operator):
+    """Check every finger for clipping into its grip target over the scene's frame range"""
+    bl_idname = "object.autogrip_qa"
+    bl_label = "Grip QA Report"
+
+    filepath: bpy.props.StringProperty(name="Report", subtype='FILE_PATH',
+        default="//autogrip_qa.json", description="Where to write the report (.json or .csv)")
+    markers: bpy.props.IntProperty(name="Markers", default=10, min=0,
+        description="How many of the worst frames to mark on the timeline")
+    threshold: bpy.props.FloatProperty(name="Threshold", default=0.0005, min=0.0,
+        subtype='DISTANCE', description="Penetration below this doesn't count as clipping")
+
+    def execute(self, context):
+
+        global obj
         obj = bpy.context.active_object
-        
+
         global activeArmature
         activeArmature = bpy.context.active_object.data
-        print("skeleton is " + activeArmature.name)
-        
-        target = None
 
-        righthandroot = find_hand_root('R')
+        scene = bpy.context.scene
+        try:
+            report = qa_report(scene.frame_start, scene.frame_end, self.filepath,
+                self.markers, self.threshold)
+        except RuntimeError as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
 
-        for t in bpy.context.selected_objects:
-            if t != obj:
-                target = t
-                break
-        print("Grip target is " + target.name)
-        
-        right_hand_list = assemble_hand(righthandroot)
-        
-        for i in right_hand_list:
-            i.reconstruct()
-            print("set target for right hand finger " + i.name)
-            i.target_shrinkwraps(target)
-        
+        if report['worst']:
+            first = report['worst'][0]
+            self.report({'WARNING'}, str(len(report['worst'])) + " bad frames marked, worst is " +
+                str(first['frame']) + " (" + first['finger'] + ")")
+        else:
+            self.report({'INFO'}, "No clipping found")
         return {'FINISHED'}
 
+    def invoke(self, context, event):
+        return context.window_manager.invoke_props_dialog(self)
 
-def reset_hand(wristroot):
+def generated_bones(model):
+    
+    # Names of every projector and control bone AutoGrip made for this hand that
+    # the armature still has, including ones Blender renamed to .001 and so on
+    
+    expected = set(model.projector_names()) | set(model.control_names())
+    found = []
+    for name in obj.data.bones.keys():
+        base = name
+        if len(name) > 4 and name[-4] == '.' and name[-3:].isdigit():
+            base = name[:-4]
+        if base in expected:
+            found.append(name)
+    return found
+
+def driver_bone(data_path):
     
-    global obj 
-    obj = bpy.context.active_object
+    # Which pose bone a driver's data path points into, or None
     
-    global activeArmature
-    activeArmature = obj.data
+    if not data_path.startswith('pose.bones["'):
+        return None
+    return data_path[len('pose.bones["'):data_path.find('"]')]
+
+def strip_hand(model):
     
-    fingers_list = assemble_hand(wristroot)
-    for f in fingers_list:
-        f.reconstruct()
+    # Strips everything AutoGrip added to the fingers in a hand model. Works
+    # straight off the bone names they should have, so nothing has to be
+    # assembled first: one pass over the drivers, one over the phalanges'
+    # constraints, and one trip into edit mode to delete the generated bones.
+    
+    doomed = generated_bones(model)
+    touched = set(model.phalange_names) | set(doomed)
+    
+    print("removing drivers")
+    drivers = existing_drivers()
+    if drivers is not None:
+        stale = [d for d in drivers if prefix in d.data_path and driver_bone(d.data_path) in touched]
+        for d in stale:
+            drivers.remove(d)
     
     print("removing constraints")
+    posebones = obj.pose.bones
+    for name in model.phalange_names:
+        p = posebones.get(name)
+        if p is None:
+            continue
+        # Collected first, so removing doesn't skip the one after
+        for c in [c for c in p.constraints if prefix in c.name]:
+            p.constraints.remove(c)
     
-    for f in fingers_list:
-            for p in f.phalanges:
-                for c in p.constraints:
-                    if prefix in c.name:
-                        """drivercurves = c.influence.drivers
-                        for d in drivercurves:
-                            drivercurves.remove(drivercurves[0])"""
-                        obj.driver_remove('pose.bones["' + p.name + '"].constraints["' + c.name + '"].influence')
-                        # Exception may be thrown here if bone does not have constraint
-                        p.constraints.remove(c)   
-            for j in f.projectors:
-                for c in j.constraints:
-                    if prefix in c.name:
-                        obj.driver_remove('pose.bones["' + j.name + '"].constraints["' + c.name + '"].distance')
-                        # Exception may be thrown if bone does not have constraint
-                        # No point in removing the constraint because I'll delete the whole bone
-                        
-    print('entering edit mode')
-    bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+    # Projectors' and control bones' own constraints go with the bones
+    if doomed:
+        print("deleting " + str(len(doomed)) + " projectors and control bones")
+        bpy.ops.object.mode_set(mode='EDIT', toggle=False)
+        ebs = activeArmature.edit_bones
+        for name in doomed:
+            ebs.remove(ebs[name])
+        bpy.ops.object.mode_set(mode='OBJECT', toggle=False)       
+
+def reset_hand(wristroot):
     
-    ebs = activeArmature.edit_bones
+    # Takes everything AutoGrip added off the hand hanging off wristroot, on
+    # whichever armature the operator (or use_armature) pointed things at
     
-    print("deleting projectors")
-    for f in fingers_list:
-        for j in f.projectors:
-            try:
-                projectorname = j.name
-                ebs.remove(ebs[projectorname])
-            except:
-                print("!!! failed to delete " + j.name)
-        
-    print("deleting control bones")
-    for f in fingers_list:
-        if f.control_bone == None:
-            print(f.name + " has no control bone")
-            continue
-        try:
-            controlname = f.control_bone.name
-            ebs.remove(ebs[controlname])
-        except:
-            print("!!! failed to delete " + f.control_bone.name)
+    direction = wristroot.name[-1]
+    
+    # A live solve on this hand would only lose its bones next frame, and level
+    # of detail would go on posing it from its curl table
+    live = live_grips.pop((obj.name, direction.upper()), None)
+    if live is not None:
+        live.release()
+    detail = detail_hands.pop((obj.name, direction.upper()), None)
+    if detail is not None:
+        detail.release()
+    activeArmature.pop(prefix + 'baked_' + direction.upper(), None)
+    scheduled_hands.pop((obj.name, direction.upper()), None)
+    activeArmature.pop(prefix + 'schedule_' + direction.upper(), None)
+    invalidate_panel()
     
-    print('entering object mode')
-    bpy.ops.object.mode_set(mode='OBJECT', toggle=False)       
+    strip_hand(core.hand.HandModel.plan(obj.global_rig_choice, direction))
     
 class ResetHandLeft(bpy.types.Operator):
     """Reset all autogrip stuff on left hand"""
@@ -1048,6 +3393,7 @@ class QuickPose(bpy.types.Operator):
         
         global activeArmature
         activeArmature = bpy.context.active_object.data
+        before = undo_snapshot()
         
         rig_choice = obj.global_rig_choice
         
@@ -1127,6 +3473,7 @@ class QuickPose(bpy.types.Operator):
         else:
             print('right hand not set up')
             
+        log_changes(self.bl_label, before)
         return {'FINISHED'}
         
 class github_link(bpy.types.Operator):
@@ -1138,7 +3485,6 @@ class github_link(bpy.types.Operator):
     def execute(self, context):
         
         import webbrowser
-        import imp
         webbrowser.open("https://github.com/Jetpack-Crow/autogrip")  
         
         return {'FINISHED'}
@@ -1152,7 +3498,6 @@ class kofi_link(bpy.types.Operator):
     def execute(self, context):
         
         import webbrowser
-        import imp
         webbrowser.open("https://ko-fi.com/jetpackcrow")  
         
         return {'FINISHED'}
@@ -1181,8 +3526,8 @@ class guess_rig_type(bpy.types.Operator):
         
         print("guessing rig type for", obj.name)
         
-        dictionaries_list = [makehuman_dictionary, rigify_dictionary, autorig_dictionary]
-        type_names_list = ['MHX', 'RFY', 'ARP']
+        dictionaries_list = list(rigs.dictionaries.values())
+        type_names_list = list(rigs.dictionaries.keys())
         
         rig_type = None
         
@@ -1217,6 +3562,86 @@ class guess_rig_type(bpy.types.Operator):
         return {'FINISHED'}
 
         
+# What the panel shows, worked out once and kept until something changes, so
+# drawing it doesn't walk the selection or the armature on every redraw.
+# 'target' goes stale when the selection changes, 'hands' when the armature
+# or anything AutoGrip does to it changes, and the lot when the active object does.
+panel_cache = {}
+
+def invalidate_panel(*args):
+    panel_cache.clear()
+
+def selected_target(active):
+    
+    # First selected mesh that isn't the active object, by name
+    
+    for t in bpy.context.selected_objects:
+        if t != active and t.type == 'MESH':
+            return t.name
+    return None
+
+def hand_status(armature):
+    
+    # Set up, grip target, bake and live state of each hand, read off the
+    # set up flags and the first projector's shrinkwrap rather than the whole hand
+    
+    status = {}
+    for side in ('L', 'R'):
+        hand = {'setup': bool(armature.data.get(prefix + 'hand_' + side)), 'target': None,
+            'baked': armature.data.get(prefix + 'baked_' + side),
+            'live': (armature.name, side) in live_grips,
+            'scheduled': bool(armature.data.get(prefix + 'schedule_' + side))}
+        if hand['setup']:
+            direction = rigs.hand_root_name(armature.global_rig_choice, side)[-1]
+            for plan in rigs.plan_hand(armature.global_rig_choice, direction):
+                projector = armature.pose.bones.get("projector_" + plan.phalanges[0])
+                if projector is None:
+                    continue
+                for c in projector.constraints:
+                    if 'hrinkwrap' in c.name and c.target is not None:
+                        hand['target'] = proxy_source(c.target).name
+                break
+        status[side] = hand
+    return status
+
+def panel_state(context):
+    active = context.active_object
+    name = None if active is None else active.name
+    if panel_cache.get('active') != name:
+        panel_cache.clear()
+        panel_cache['active'] = name
+    if 'target' not in panel_cache:
+        panel_cache['target'] = selected_target(active)
+    if 'hands' not in panel_cache and active is not None and active.type == 'ARMATURE':
+        panel_cache['hands'] = hand_status(active)
+    return panel_cache
+
+@bpy.app.handlers.persistent
+def panel_depsgraph_update(scene, depsgraph):
+    
+    # Selecting things only updates the scene; edits to the armature update it
+    
+    if not panel_cache:
+        return
+    for update in depsgraph.updates:
+        if isinstance(update.id, bpy.types.Scene):
+            panel_cache.pop('target', None)
+        elif isinstance(update.id, bpy.types.Object) and update.id.name == panel_cache.get('active'):
+            panel_cache.pop('hands', None)
+
+# Owner for the message bus subscription that catches the active object changing
+panel_owner = object()
+
+def subscribe_panel():
+    bpy.msgbus.clear_by_owner(panel_owner)
+    bpy.msgbus.subscribe_rna(key=(bpy.types.LayerObjects, "active"), owner=panel_owner,
+        args=(), notify=invalidate_panel)
+
+@bpy.app.handlers.persistent
+def panel_load_post(*args):
+    panel_cache.clear()
+    subscribe_panel()
+
 class PANEL_PT_Autogrip(bpy.types.Panel):
     """Creates a sub tab in the N-panel"""
     bl_label = "AutoGrip Tools"
@@ -1226,47 +3651,54 @@ class PANEL_PT_Autogrip(bpy.types.Panel):
     #bl_context = "objectmode"
     
     def draw(self, context):
-        global obj
-        obj = context.active_object 
-        
         layout = self.layout
         
-        global activeArmature
+        state = panel_state(context)
+        obj = context.active_object
+        target = None if state['target'] is None else bpy.data.objects.get(state['target'])
         
-        try:
-            activeArmature = obj.data
-                
-            target = None
-            for t in bpy.context.selected_objects:
-                if t != obj and type(t.data) is bpy.types.Mesh:
-                    target = t
-                    break
-            
-
-        except:
+        if obj is None:
             row = layout.row()
             row.label(text="No active object.")
-            
-            row = layout.row()
-            row.label(text="Links (Open in browser)")
-            
-            row = layout.row()
-            row.operator(github_link.bl_idname)
-            row.operator(kofi_link.bl_idname)
-
         
         """Provide setup options only if armature selected, provide target options only
         if there is a valid target to attach them to."""
         
-        if type(activeArmature) is bpy.types.Armature:
+        if obj is not None and obj.type == 'ARMATURE':
+            activeArmature = obj.data
             
             row = layout.row()
             row.label(text="Active armature: {}".format(activeArmature.name))
             
+            for side, label in (('R', "Right"), ('L', "Left")):
+                hand = state['hands'][side]
+                text = label + ": "
+                if not hand['setup']:
+                    text += "not set up"
+                else:
+                    text += "set up"
+                    if hand['target'] is not None:
+                        text += ", gripping " + hand['target']
+                    if hand['scheduled']:
+                        text += ", scheduled"
+                    if hand['live']:
+                        text += ", live"
+                    elif hand['baked'] is not None:
+                        text += ", baked " + hand['baked']
+                row = layout.row()
+                row.label(text=text)
+            
             row = layout.row()
             #row.label(text = "enum choice")
             row.prop(obj, "global_rig_choice")
             
+            row = layout.row()
+            row.prop(obj, "autogrip_use_proxy")
+            if obj.autogrip_use_proxy:
+                row.prop(obj, "autogrip_proxy_method", text="")
+                row = layout.row()
+                row.prop(obj, "autogrip_proxy_budget")
+            
             row = layout.row()
             row.operator(guess_rig_type.bl_idname)
             
@@ -1274,6 +3706,7 @@ class PANEL_PT_Autogrip(bpy.types.Panel):
             
             row = layout.row()
             row.operator(AutoGripSetup.bl_idname)
+            row.operator(AutoGripSync.bl_idname)
             
             setuprow = layout.row()
             setupright = setuprow.operator(AutoGripRight.bl_idname)
@@ -1281,11 +3714,40 @@ class PANEL_PT_Autogrip(bpy.types.Panel):
             
             QProw = layout.row()
             QProw.operator(QuickPose.bl_idname)
+            QProw.operator(MeasureFingers.bl_idname)
             
             resetrow = layout.row()
             resetrow.operator(ResetHandRight.bl_idname)
             resetrow.operator(ResetHandLeft.bl_idname)
             
+            undorow = layout.row()
+            undorow.operator(UndoAutoGrip.bl_idname)
+            undorow.prop(obj, "autogrip_light_undo")
+            
+            bakerow = layout.row()
+            bakerow.operator(BakeGripRight.bl_idname)
+            bakerow.operator(BakeGripLeft.bl_idname)
+            
+            liverow = layout.row()
+            liverow.operator(LiveGripRight.bl_idname, depress=(obj.name, 'R') in live_grips)
+            liverow.operator(LiveGripLeft.bl_idname, depress=(obj.name, 'L') in live_grips)
+            row = layout.row()
+            if (obj.name, 'R') in live_grips or (obj.name, 'L') in live_grips:
+                row.prop(obj, "autogrip_solve_cache")
+            row.prop(obj, "autogrip_lod")
+            if obj.autogrip_lod:
+                row = layout.row()
+                row.prop(obj, "autogrip_lod_near")
+                row.prop(obj, "autogrip_lod_far")
+                row = layout.row()
+                row.prop(obj, "autogrip_lod_update")
+            
+            row = layout.row()
+            row.operator(GripQA.bl_idname)
+            row.operator(RetargetGrip.bl_idname)
+            row = layout.row()
+            row.operator(ExportGripStream.bl_idname)
+            
             if (target is not None) and (type(target.data) is bpy.types.Mesh):
                 row = layout.row()
                 row.label(text = "Target object: {}".format(target.name))
@@ -1293,7 +3755,15 @@ class PANEL_PT_Autogrip(bpy.types.Panel):
                 row = layout.row()
                 row.operator(TargetRight.bl_idname)
                 row.operator(TargetLeft.bl_idname)
-        else:
+                
+                row = layout.row()
+                row.operator(FindGraspRight.bl_idname)
+                row.operator(FindGraspLeft.bl_idname)
+                
+                row = layout.row()
+                row.operator(ScheduleTargetRight.bl_idname)
+                row.operator(ScheduleTargetLeft.bl_idname)
+        elif obj is not None:
             row = layout.row()
             row.label(text = "Active object is not armature.")   
         
@@ -1310,7 +3780,9 @@ class PANEL_PT_Autogrip(bpy.types.Panel):
         
 classes = [AutoGripSetup, AutoGripLeft, AutoGripRight, TargetRight, TargetLeft,
     ResetHandLeft, ResetHandRight, QuickPose, PANEL_PT_Autogrip, github_link, guess_rig_type,
-    kofi_link]        
+    kofi_link, FindGraspLeft, FindGraspRight, BakeGripLeft, BakeGripRight, LiveGripLeft,
+    LiveGripRight, MeasureFingers, GripQA, AutoGripSync, UndoAutoGrip, ScheduleTargetLeft,
+    ScheduleTargetRight, RetargetGrip, ExportGripStream]        
         
 def register():
     
@@ -1324,21 +3796,88 @@ def register():
     for item in classes:
         bpy.utils.register_class(item)
     
+    bpy.app.handlers.frame_change_pre.append(schedule_update)
+    bpy.app.handlers.frame_change_post.append(live_grip_update)
+    bpy.app.handlers.frame_change_post.append(stack_detail_update)
+    bpy.app.handlers.load_post.append(stack_detail_load_post)
+    bpy.app.handlers.load_post.append(schedule_load_post)
+    bpy.app.handlers.depsgraph_update_post.append(panel_depsgraph_update)
+    bpy.app.handlers.load_post.append(panel_load_post)
+    subscribe_panel()
+    
     bpy.types.Object.global_rig_choice = bpy.props.EnumProperty(
         name="Rig selection",
         description="Select an option",
         
-        items = [ 
-            ('MHX', "MHX", "MakeHuman Exchange\n" + 
-            "Puts control bones on layers 7 and 23 for Fingers" +
-            "\nPuts projectors on layer 24"),
-            ('RFY', "Rigify", "Modular armature from the Rigify add-on.\n" + 
-            "Puts control bones on layer 6 for Fingers (Detail)\n" + 
-            "Puts projectors on layer 23"),
-            ('ARP', "Auto-Rig Pro", "Armature from the Auto-Rig Pro add-on.\n" + 
-            "Puts control bones and projectors on layer 16")
-            #('GUESS', "Best Guess", "This will do its best to reconstruct some hands from\n" + 
-            #"any given armature. Not implemented yet"),
+        items = rigs.rig_items
+    )
+    
+    bpy.types.Object.autogrip_use_proxy = bpy.props.BoolProperty(
+        name="Use Grip Proxy",
+        description="Point the shrinkwraps at a low poly stand-in for the grip target instead of\n" +
+        "the full mesh. Turn off for final bakes",
+        default=False,
+        update=update_proxy_toggle
+    )
+    
+    bpy.types.Object.autogrip_proxy_budget = bpy.props.IntProperty(
+        name="Proxy Triangles",
+        description="Most triangles a grip proxy is allowed to have",
+        default=5000,
+        min=16
+    )
+    
+    bpy.types.Object.autogrip_light_undo = bpy.props.BoolProperty(
+        name="Light Undo",
+        description="Also keep AutoGrip's own record of what setup, sync, targeting and quick pose\n" +
+        "changed, so Undo AutoGrip can take back just the last of them, even after other edits.\n" +
+        "Makes each of them a little slower",
+        default=False
+    )
+    
+    bpy.types.Object.autogrip_solve_cache = bpy.props.BoolProperty(
+        name="Cache Live Solves",
+        description="Keep Live Grip's answers for frames it's already solved, so scrubbing\n" +
+        "back over them doesn't solve them again",
+        default=True
+    )
+    
+    bpy.types.Object.autogrip_lod = bpy.props.BoolProperty(
+        name="Level of Detail",
+        description="Spend less on fingers the smaller they are through the scene camera. Live\n" +
+        "Grip solves them less often; on the constraints they drop to one projector per\n" +
+        "finger, then to a curl table. Off screen, they hold",
+        default=False,
+        update=update_lod_toggle
+    )
+    
+    bpy.types.Object.autogrip_lod_near = bpy.props.FloatProperty(
+        name="Full Detail",
+        description="Fingers at least this long on screen (as a fraction of the frame) get\n" +
+        "solved whenever they move",
+        default=0.05, min=0.0, max=1.0
+    )
+    
+    bpy.types.Object.autogrip_lod_far = bpy.props.FloatProperty(
+        name="Hold Below",
+        description="Fingers shorter than this on screen keep their last grip",
+        default=0.01, min=0.0, max=1.0
+    )
+    
+    bpy.types.Object.autogrip_lod_update = bpy.props.EnumProperty(
+        name="Update",
+        description="How often the level of detail is worked out",
+        items=[('FRAME', "Every Frame", "Work it out again on every frame"),
+               ('SHOT', "Per Shot", "Only work it out again when the scene camera changes")],
+        default='FRAME'
+    )
+    
+    bpy.types.Object.autogrip_proxy_method = bpy.props.EnumProperty(
+        name="Proxy type",
+        description="How to build the grip proxy",
+        items = [
+            ('DECIMATE', "Decimated", "Decimated copy of the prop. Keeps holes and handles"),
+            ('HULL', "Convex Hull", "Convex hull of the prop. Cheapest, but fills in any concave parts"),
         ]
     )
 
@@ -1348,7 +3887,37 @@ def unregister():
     for item in classes:
         bpy.utils.unregister_class(item)
         
+    if live_grip_update in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(live_grip_update)
+    if stack_detail_update in bpy.app.handlers.frame_change_post:
+        bpy.app.handlers.frame_change_post.remove(stack_detail_update)
+    if stack_detail_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(stack_detail_load_post)
+    live_grips.clear()
+    if schedule_update in bpy.app.handlers.frame_change_pre:
+        bpy.app.handlers.frame_change_pre.remove(schedule_update)
+    if schedule_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(schedule_load_post)
+    scheduled_hands.clear()
+    grip_sessions.clear()
+    if panel_depsgraph_update in bpy.app.handlers.depsgraph_update_post:
+        bpy.app.handlers.depsgraph_update_post.remove(panel_depsgraph_update)
+    if panel_load_post in bpy.app.handlers.load_post:
+        bpy.app.handlers.load_post.remove(panel_load_post)
+    bpy.msgbus.clear_by_owner(panel_owner)
+    panel_cache.clear()
+        
     del bpy.types.Object.global_rig_choice
+    del bpy.types.Object.autogrip_use_proxy
+    del bpy.types.Object.autogrip_proxy_budget
+    del bpy.types.Object.autogrip_proxy_method
+    del bpy.types.Object.autogrip_light_undo
+    del bpy.types.Object.autogrip_solve_cache
+    del bpy.types.Object.autogrip_lod
+    del bpy.types.Object.autogrip_lod_near
+    del bpy.types.Object.autogrip_lod_far
+    del bpy.types.Object.autogrip_lod_update
+    change_log.clear()
     
     
 if __name__ == "__main__":
@@ -0,0 +1,189 @@
+# Command line entry points for running AutoGrip in a background Blender, e.g.
+#
+#   blender -b shot.blend --python-expr "import autogrip.headless; autogrip.headless.main()" \
+#       -- qa --armature Rig --out //qa.json
+#
+# Everything after the "--" is ours. Exits with status 1 if QA finds clipping
+# and --strict is given, so it can gate a render or publish step.
+#
+# "regress" runs the golden pose regression in regress.py over every rig type,
+# and exits with status 1 if any pose or timing budget is off.
+#
+# "bench-drivers" times building a set-up armature's drivers the old way (a
+# driver_add per driver) against build_drivers, and playback with each.
+#
+# "export" writes a baked grip out as a binary pose stream (see core/stream.py)
+# for game and crowd tools to read without Blender.
+
+import argparse
+import sys
+import time
+
+import bpy
+
+from . import handrig
+from .core import rigs
+
+
+def parse(argv):
+    parser = argparse.ArgumentParser(prog="autogrip")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    qa = commands.add_parser("qa", help="Check fingers for clipping into grip targets")
+    qa.add_argument("--armature", required=True, help="Name of the armature object")
+    qa.add_argument("--start", type=int, help="First frame (default: scene start)")
+    qa.add_argument("--end", type=int, help="Last frame (default: scene end)")
+    qa.add_argument("--out", default="//autogrip_qa.json", help="Report path, .json or .csv")
+    qa.add_argument("--markers", type=int, default=10, help="Timeline markers on the worst frames")
+    qa.add_argument("--threshold", type=float, default=0.0005,
+                    help="Penetration below this doesn't count as clipping")
+    qa.add_argument("--save", action="store_true", help="Save the .blend with the markers")
+    qa.add_argument("--strict", action="store_true", help="Exit with status 1 if anything clips")
+
+    regress = commands.add_parser("regress", help="Check grips against golden poses and budgets")
+    regress.add_argument("--rig", action="append", choices=list(rigs.dictionaries),
+                         help="Rig type to run (default: all of them), can be given more than once")
+    regress.add_argument("--update", action="store_true", help="Write the current poses as golden")
+    regress.add_argument("--tolerance", type=float, default=1e-4,
+                         help="Largest matrix difference from the golden pose that still passes")
+    regress.add_argument("--budget-scale", type=float, default=1.0,
+                         help="Multiply every timing budget by this, for slower machines")
+
+    bench = commands.add_parser("bench-drivers", help="Time driver setup and evaluation")
+    bench.add_argument("--armature", required=True, help="Name of an armature that's been set up")
+    bench.add_argument("--frames", type=int, default=50, help="Frames of playback to time")
+    bench.add_argument("--repeats", type=int, default=3, help="Best of this many runs")
+
+    export = commands.add_parser("export", help="Write baked grips out as a binary pose stream")
+    export.add_argument("--armature", required=True, help="Name of the armature object")
+    export.add_argument("--start", type=int, help="First frame (default: scene start)")
+    export.add_argument("--end", type=int, help="Last frame (default: scene end)")
+    export.add_argument("--out", default="//autogrip.agps", help="Pose stream path")
+
+    return parser.parse_args(argv)
+
+
+def run_qa(args):
+    scene = bpy.context.scene
+    handrig.use_armature(bpy.data.objects[args.armature])
+
+    start = scene.frame_start if args.start is None else args.start
+    end = scene.frame_end if args.end is None else args.end
+    report = handrig.qa_report(start, end, args.out, args.markers, args.threshold)
+
+    if args.save:
+        bpy.ops.wm.save_mainfile()
+    return 1 if (args.strict and report['worst']) else 0
+
+
+def run_regress(args):
+    from . import regress
+    results = regress.run(args.rig, args.update, args.tolerance, args.budget_scale)
+    failed = [rig for rig, failures in results.items() if failures]
+    print("Regression: " + str(len(results) - len(failed)) + " of " + str(len(results)) +
+          " rig types passed")
+    return 1 if failed else 0
+
+
+def hand_driver_specs(armature):
+
+    # Driver specs for every set-up hand on the armature, as control_drivers
+    # would make them now
+
+    specs = []
+    for side in "LR":
+        if not armature.data.get(handrig.prefix + 'hand_' + side):
+            continue
+        fingers = handrig.assemble_hand(handrig.find_hand_root(side))
+        for f in fingers:
+            f.reconstruct()
+        specs += handrig.driver_specs(fingers, handrig.finger_radii(fingers))
+    return specs
+
+
+def remove_drivers(armature, specs):
+    paths = {spec[0] for spec in specs}
+    drivers = armature.animation_data.drivers
+    for fcurve in [fc for fc in drivers if fc.data_path in paths]:
+        drivers.remove(fcurve)
+
+
+def add_drivers_one_by_one(armature, specs):
+
+    # How control_drivers used to do it, for comparison
+
+    for path, template, control, expression in specs:
+        name, channel, _ = handrig.driver_templates[template]
+        driver = armature.driver_add(path).driver
+        v = driver.variables.new()
+        v.name = name
+        v.targets[0].id = armature
+        v.targets[0].data_path = 'pose.bones["' + control + '"].' + channel
+        driver.expression = expression
+
+
+def time_playback(scene, frames):
+    start = time.perf_counter()
+    for frame in range(scene.frame_start, scene.frame_start + frames):
+        scene.frame_set(frame)
+    return (time.perf_counter() - start) / frames
+
+
+def run_bench_drivers(args):
+    scene = bpy.context.scene
+    armature = bpy.data.objects[args.armature]
+    handrig.use_armature(armature)
+    specs = hand_driver_specs(armature)
+    if not specs:
+        print("No set-up hands on " + armature.name)
+        return 1
+
+    builders = (("driver_add", lambda: add_drivers_one_by_one(armature, specs)),
+                ("build_drivers", lambda: handrig.build_drivers(specs)))
+    results = {}
+    for name, build in builders:
+        setup = playback = float("inf")
+        for _ in range(args.repeats):
+            remove_drivers(armature, specs)
+            start = time.perf_counter()
+            build()
+            setup = min(setup, time.perf_counter() - start)
+            playback = min(playback, time_playback(scene, args.frames))
+        results[name] = (setup, playback)
+
+    print(str(len(specs)) + " drivers on " + armature.name)
+    for name, (setup, playback) in results.items():
+        print("  {:<14} setup {:8.2f} ms   playback {:7.3f} ms/frame".format(
+            name, setup * 1000.0, playback * 1000.0))
+    old, new = results["driver_add"], results["build_drivers"]
+    print("  speedup        setup {:8.2f}x     playback {:7.2f}x".format(
+        old[0] / max(new[0], 1e-9), old[1] / max(new[1], 1e-9)))
+    return 0
+
+
+def run_export(args):
+    from . import api
+    armature = bpy.data.objects[args.armature]
+    start = time.perf_counter()
+    frames = api.export_stream(armature, args.out, args.start, args.end)
+    print("Wrote " + str(frames) + " frames to " + bpy.path.abspath(args.out) + " in " +
+          format(time.perf_counter() - start, '.3f') + "s")
+    return 0
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    args = parse(argv)
+
+    if args.command == "qa":
+        status = run_qa(args)
+    elif args.command == "regress":
+        status = run_regress(args)
+    elif args.command == "bench-drivers":
+        status = run_bench_drivers(args)
+    elif args.command == "export":
+        status = run_export(args)
+
+    if status:
+        sys.exit(status)
@@ -0,0 +1,205 @@
+# Golden pose regression run for AutoGrip, in a background Blender. For every
+# rig type it builds a bare armature with that rig's hand bones, grips a bar
+# with both hands (setup, target, quick pose), and checks the posed phalanges
+# against the golden pose stored for that rig, then resets and checks nothing
+# was left behind. Every step is timed against a budget as well, so a change
+# that breaks the grip or makes it slow fails the same way.
+#
+#   blender -b --python-expr "import autogrip.headless; autogrip.headless.main()" -- regress
+#
+# --update writes the current poses out as the new golden ones. Golden poses
+# live in golden/<rig type>.json next to this file.
+
+import json
+import os
+import time
+
+import bmesh
+import bpy
+import mathutils
+
+from . import api
+from . import handrig
+from .core import hand
+from .core import rigs
+
+
+golden_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "golden")
+
+# Seconds each step may take on a rig this size
+budgets = {'setup': 2.0, 'target': 0.5, 'quickpose': 0.5, 'reset': 1.0}
+
+
+def build_rig(rig_type):
+
+    # A bare armature with just the hand bones rig_type's dictionary names,
+    # both hands pointing down +Y with the fingers side by side. Bones have no
+    # roll, so their Z axis is world +Z.
+
+    data = bpy.data.armatures.new("AutoGrip_regress_" + rig_type)
+    armature = bpy.data.objects.new(data.name, data)
+    bpy.context.scene.collection.objects.link(armature)
+    armature.global_rig_choice = rig_type
+
+    with api.armature_context(armature):
+        bpy.ops.object.mode_set(mode='EDIT')
+        edit_bones = data.edit_bones
+        for side, sign in (('L', 1.0), ('R', -1.0)):
+            root = edit_bones.new(rigs.hand_root_name(rig_type, side))
+            root.head = (sign * 0.5, -0.08, 1.0)
+            root.tail = (sign * 0.5, 0.0, 1.0)
+
+            direction = rigs.hand_root_name(rig_type, side)[-1]
+            plans = rigs.plan_hand(rig_type, direction)
+            for k, plan in enumerate(plans):
+                thumb = 'thumb' in plan.name
+                x = sign * (0.5 + (-0.045 if thumb else 0.03 * k - 0.045))
+                palm = edit_bones.new(plan.palm)
+                palm.head = (x, 0.0, 1.0)
+                palm.tail = (x, 0.04 if thumb else 0.08, 1.0)
+                palm.parent = root
+
+                parent = palm
+                y = palm.tail[1]
+                for j, name in enumerate(plan.phalanges):
+                    bone = edit_bones.new(name)
+                    bone.head = (x, y, 1.0)
+                    y += 0.03 - 0.005 * j
+                    bone.tail = (x, y, 1.0)
+                    bone.parent = parent
+                    bone.use_connect = True
+                    parent = bone
+        bpy.ops.object.mode_set(mode='OBJECT')
+    return armature
+
+
+def build_bar(rig_type):
+
+    # A bar across both hands on the side they grip toward
+
+    grip_side = -1.0 if rigs.finger_axes[rig_type].startswith('-') else 1.0
+    mesh = bpy.data.meshes.new("AutoGrip_regress_bar_" + rig_type)
+    bm = bmesh.new()
+    bmesh.ops.create_cone(bm, cap_ends=True, segments=24, radius1=0.02, radius2=0.02, depth=1.4,
+                          matrix=mathutils.Matrix.Rotation(1.5708, 4, 'Y'))
+    bm.to_mesh(mesh)
+    bm.free()
+    bar = bpy.data.objects.new(mesh.name, mesh)
+    bar.location = (0.0, 0.12, 1.0 + grip_side * 0.035)
+    bpy.context.scene.collection.objects.link(bar)
+    return bar
+
+
+def phalange_names(rig_type):
+    return [name for phalanges in rigs.dictionaries[rig_type].values() for name in phalanges]
+
+
+def posed_matrices(armature, names):
+
+    # Armature space matrices of the named pose bones, fully evaluated
+
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    depsgraph.update()
+    bones = armature.evaluated_get(depsgraph).pose.bones
+    return {name: [v for row in bones[name].matrix for v in row] for name in names}
+
+
+def compare_poses(golden, current, tolerance):
+
+    # Bones whose matrices differ from the golden ones by more than tolerance,
+    # with the largest difference, worst first
+
+    failures = []
+    for name, expected in golden.items():
+        found = current.get(name)
+        if found is None:
+            failures.append((name, float('inf')))
+            continue
+        error = max(abs(a - b) for a, b in zip(expected, found))
+        if error > tolerance:
+            failures.append((name, error))
+    return sorted(failures, key=lambda f: -f[1])
+
+
+def run_rig(rig_type, update=False, tolerance=1e-4, budget_scale=1.0):
+
+    # Builds, grips, checks and resets one rig type. Returns a list of
+    # failure messages, empty if it passed. budget_scale None times the steps
+    # without holding them to a budget, for checking poses alone.
+
+    failures = []
+    timings = {}
+    armature = build_rig(rig_type)
+    bar = build_bar(rig_type)
+    names = phalange_names(rig_type)
+
+    try:
+        start = time.perf_counter()
+        api.setup(armature, "LR")
+        timings['setup'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for side in "LR":
+            api.target(armature, side, bar, proxy=False)
+        timings['target'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with api.armature_context(armature):
+            bpy.ops.object.autogrip_quickpose()
+        timings['quickpose'] = time.perf_counter() - start
+
+        current = posed_matrices(armature, names)
+        path = os.path.join(golden_dir, rig_type + ".json")
+        if update:
+            os.makedirs(golden_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump({'rig': rig_type, 'bones': current}, f, indent=1, sort_keys=True)
+            print("Wrote golden pose " + path)
+        elif not os.path.exists(path):
+            failures.append("no golden pose at " + path + " (run with --update to make one)")
+        else:
+            with open(path) as f:
+                golden = json.load(f)['bones']
+            for name, error in compare_poses(golden, current, tolerance):
+                failures.append(name + " is off its golden pose by " + format(error, '.6f'))
+
+        start = time.perf_counter()
+        api.reset(armature, "LR")
+        timings['reset'] = time.perf_counter() - start
+
+        for side in "LR":
+            direction = rigs.hand_root_name(rig_type, side)[-1]
+            model = hand.HandModel.plan(rig_type, direction)
+            with api.armature_context(armature):
+                left = handrig.generated_bones(model)
+            if left:
+                failures.append("reset left " + str(len(left)) + " bones behind, like " + left[0])
+    except Exception as error:
+        failures.append("raised " + type(error).__name__ + ": " + str(error))
+    finally:
+        bpy.data.objects.remove(armature)
+        bpy.data.objects.remove(bar)
+
+    for step, seconds in timings.items():
+        if budget_scale is None:
+            print("  {:<10} {:7.1f} ms".format(step, seconds * 1000.0))
+            continue
+        budget = budgets[step] * budget_scale
+        print("  {:<10} {:7.1f} ms (budget {:.0f} ms)".format(step, seconds * 1000.0, budget * 1000.0))
+        if seconds > budget:
+            failures.append(step + " took " + format(seconds, '.3f') + "s, over its " +
+                            format(budget, '.3f') + "s budget")
+    return failures
+
+
+def run(rig_types=None, update=False, tolerance=1e-4, budget_scale=1.0):
+
+    # Every rig type in turn. Returns {rig type: failure messages}.
+
+    results = {}
+    for rig_type in rig_types or list(rigs.dictionaries):
+        print("Regression run on " + rig_type)
+        results[rig_type] = run_rig(rig_type, update, tolerance, budget_scale)
+        for message in results[rig_type]:
+            print("  FAIL " + message)
+    return results
@@ -0,0 +1,29 @@
+# The core package doesn't need Blender, so the tests import it on its own
+# rather than through the add-on.
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+
+@pytest.fixture(scope="session")
+def addon():
+
+    # The whole add-on, registered, for tests that need Blender. Skipped
+    # unless bpy is importable (Blender's Python, or the bpy module).
+
+    pytest.importorskip("bpy")
+    spec = importlib.util.spec_from_file_location("autogrip", os.path.join(root, "__init__.py"),
+                                                  submodule_search_locations=[root])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules["autogrip"] = module
+    spec.loader.exec_module(module)
+    module.register()
+    yield module
+    module.unregister()
@@ -0,0 +1,104 @@
+import numpy as np
+
+from core import contact
+
+
+def crossing_fingers():
+
+    # Two fingers side by side whose grip directions lean toward each other,
+    # so curling both far enough runs one into the other
+
+    fingers, joints = 2, 3
+    heads = np.zeros((fingers, joints, 3))
+    for f, x in enumerate((-0.012, 0.012)):
+        for j in range(joints):
+            heads[f, j] = (x, 0.03 + 0.025 * j, 0.0)
+    tails = heads + (0.0, 0.025, 0.0)
+    grip = np.repeat(np.array([[0.6, 0.0, 1.0], [-0.6, 0.0, 1.0]])[:, None], joints, axis=1)
+    return contact.HandProbe(['a', 'b'], heads, tails, grip, np.full((fingers, joints), 0.008),
+                             np.ones((fingers, joints), dtype=bool), [[0.0, 0.0, 0.0]])
+
+
+def straight_fingers(count=4):
+
+    # Fingers side by side, all curling toward +Z
+
+    joints = 3
+    heads = np.zeros((count, joints, 3))
+    for f in range(count):
+        for j in range(joints):
+            heads[f, j] = (0.02 * f - 0.03, 0.03 + 0.025 * j, 0.0)
+    tails = heads + (0.0, 0.025, 0.0)
+    return contact.HandProbe([str(f) for f in range(count)], heads, tails,
+                             np.tile([0.0, 0.0, 1.0], (count, joints, 1)),
+                             np.full((count, joints), 0.008), np.ones((count, joints), dtype=bool),
+                             [[0.0, 0.0, 0.0]])
+
+
+def ball(centre, radius, count=4000):
+    normals = np.random.default_rng(0).normal(size=(count, 3))
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return normals * radius + centre, normals
+
+
+def test_separation_keeps_fingers_out_of_the_prop():
+
+    # A small prop sitting where the second finger passes half way through its
+    # curl. The curl solve closes both fingers past it, then they run into each
+    # other; backing the second one off has to stop short of the prop as well.
+
+    probe = crossing_fingers()
+    tip = probe.curl(np.array([[0.0, 0.7]]))[0, 1, -1]
+    grid = contact.SurfaceGrid(*ball(tip, 0.004), cell_size=0.02)
+
+    solver = contact.WarmStartSolver(grid, probe, self_collision=True)
+    angles = solver.solve(np.eye(4))[0]
+    assert np.any(angles < solver.angles)
+
+    opened = angles < solver.angles
+    gaps = contact.finger_gaps(grid, probe, np.eye(4), angles[None])[0][0]
+    assert np.all(gaps[opened] > 0.0)
+
+    posed = probe.curl(angles[None])
+    excess = contact.finger_penetration(probe, posed, posed[0])[0] - solver.rest
+    assert np.all(excess <= 0.0)
+
+
+def test_chunked_solve_matches_sequential():
+
+    # A hand sliding onto a ball, speeding up and coming to a stop in turn so
+    # the warm start holds fingers for a while and then solves them again.
+    # Solving in chunks on threads has to give what one solve from the first
+    # frame to the last does, to within the bisection's precision, with no
+    # seam where chunks meet.
+
+    probe = straight_fingers()
+    grid = contact.SurfaceGrid(*ball((0.0, 0.0, 0.0), 0.05, 40000), cell_size=0.024)
+    matrices = np.tile(np.eye(4), (160, 1, 1))
+    slide = 0.0004 * (np.arange(160) + 8.0 * np.sin(np.arange(160) / 6.0))
+    matrices[:, 1, 3] = -0.06 + slide
+    matrices[:, 2, 3] = -0.065 + 0.5 * slide
+
+    sequential, _ = contact.solve_sequence(grid, probe, matrices)
+    chunked, _ = contact.solve_frames(grid, probe, matrices, chunk=32, workers=4)
+    assert np.abs(chunked - sequential).max() < 5e-4
+
+
+def test_curl_table_blends_recorded_amounts():
+    table = contact.CurlTable(2, 3, bins=5)
+    assert not table.known(0)
+    assert table.lookup(0, 0.5) is None
+
+    open_hand = np.tile([1.0, 0.0, 0.0, 0.0], (3, 1))
+    half = np.sin(np.pi / 4)
+    closed = np.tile([half, half, 0.0, 0.0], (3, 1))
+    table.record(0, 0.0, open_hand)
+    table.record(0, 1.0, closed)
+
+    assert table.known(0) and not table.known(1)
+    assert np.allclose(table.lookup(0, 0.0), open_hand)
+    assert np.allclose(table.lookup(0, 1.0), closed)
+    # Halfway between two recorded bins is halfway round, a 45 degree curl
+    middle = table.lookup(0, 0.5)
+    assert np.allclose(np.linalg.norm(middle, axis=-1), 1.0)
+    assert np.allclose(middle[:, :2], [np.cos(np.pi / 8), np.sin(np.pi / 8)], atol=1e-6)
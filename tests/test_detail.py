@@ -0,0 +1,61 @@
+import numpy as np
+
+
+def test_constraint_hands_keep_their_pose_at_every_level(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+    from autogrip.core import contact
+
+    armature = regress.build_rig('RFY')
+    bar = regress.build_bar('RFY')
+    scene = bpy.context.scene
+    camera = bpy.data.objects.new("AutoGrip_test_camera", bpy.data.cameras.new("AutoGrip_test_camera"))
+    scene.collection.objects.link(camera)
+    previous_camera = scene.camera
+    scene.camera = camera
+    try:
+        api.setup(armature, "L")
+        api.target(armature, 'L', bar, proxy=False)
+        with api.armature_context(armature):
+            hand = handrig.stackdetail(armature, handrig.find_hand_root('L'), 'L')
+            handrig.detail_hands[(armature.name, 'L')] = hand
+        for name in hand.control_names:
+            armature.pose.bones[name].rotation_euler[0] = 1.2
+        armature.autogrip_lod_near = 0.2
+        armature.autogrip_lod_far = 0.02
+
+        def posed():
+            depsgraph = bpy.context.evaluated_depsgraph_get()
+            depsgraph.update()
+            bones = armature.evaluated_get(depsgraph).pose.bones
+            return np.array([[np.array(bones[name].matrix) for name in names]
+                             for names in hand.phalange_names[:4]])
+
+        def at_distance(height, frame):
+            camera.location = (0.5, 0.1, height)
+            scene.frame_set(frame)
+            handrig.stack_detail_update(scene)
+
+        at_distance(1.2, 1)
+        assert (hand.levels[:4] == contact.FULL).all()
+        full = posed()
+
+        for height, level in ((3.0, contact.COARSE), (40.0, contact.HOLD)):
+            at_distance(height, 2)
+            assert (hand.levels[:4] == level).all()
+            assert np.abs(posed() - full).max() < 1e-4
+            names = hand.phalange_names[0]
+            live = hand.live_phalanges(0, level)
+            for j, name in enumerate(names):
+                ik = armature.pose.bones[name].constraints[0]
+                assert ik.mute == (j >= live)
+
+        # Resetting the hand stops it being posed from its table
+        with api.armature_context(armature):
+            handrig.reset_hand(handrig.find_hand_root('L'))
+        assert (armature.name, 'L') not in handrig.detail_hands
+    finally:
+        handrig.detail_hands.pop((armature.name, 'L'), None)
+        scene.camera = previous_camera
+        for thing in (armature, bar, camera):
+            bpy.data.objects.remove(thing)
@@ -0,0 +1,37 @@
+import numpy as np
+
+
+def test_find_grasp_moves_the_hand_through_its_control(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature = regress.build_rig('RFY')
+    bar = regress.build_bar('RFY')
+    try:
+        # The deform hand follows an IK control, the way it does on Rigify
+        with api.armature_context(armature):
+            bpy.ops.object.mode_set(mode='EDIT')
+            root = armature.data.edit_bones['DEF-hand.L']
+            control = armature.data.edit_bones.new('hand_ik.L')
+            control.head, control.tail, control.roll = root.head, root.tail, root.roll
+            root.parent = None
+            bpy.ops.object.mode_set(mode='OBJECT')
+        follow = armature.pose.bones['DEF-hand.L'].constraints.new('COPY_TRANSFORMS')
+        follow.target = armature
+        follow.subtarget = 'hand_ik.L'
+
+        with api.armature_context(armature):
+            for other in bpy.context.selected_objects:
+                other.select_set(other == armature)
+            bar.select_set(True)
+            assert bpy.ops.object.autogrip_find_grasp_l() == {'FINISHED'}
+            matrices, scores = handrig.find_grasp(handrig.find_hand_root('L'), bar)
+
+        depsgraph = bpy.context.evaluated_depsgraph_get()
+        depsgraph.update()
+        hand = armature.evaluated_get(depsgraph).pose.bones['DEF-hand.L']
+        placed = np.array(armature.matrix_world @ hand.matrix)
+        assert np.allclose(placed, matrices[0], atol=1e-4)
+    finally:
+        bpy.data.objects.remove(armature)
+        bpy.data.objects.remove(bar)
@@ -0,0 +1,76 @@
+import numpy as np
+
+
+def live_rig(bpy, api, regress):
+    armature = regress.build_rig('RFY')
+    bar = regress.build_bar('RFY')
+    api.setup(armature, "LR")
+    for side in "LR":
+        api.target(armature, side, bar, proxy=False)
+    return armature, bar
+
+
+def test_live_hands_follow_a_prop_edit(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature, bar = live_rig(bpy, api, regress)
+    scene = bpy.context.scene
+    try:
+        with api.armature_context(armature):
+            handrig.toggle_live_grip(handrig.find_hand_root('L'), 'L', bar)
+            left = handrig.live_grips[(armature.name, 'L')]
+            scene.frame_set(1)
+            scene.frame_set(2)
+            assert len(left.cache)
+
+            # Moving a vertex rebuilds the prop's session when the right hand
+            # goes live, and the left hand has to rejoin it
+            bar.data.vertices[0].co.z += 0.01
+            handrig.toggle_live_grip(handrig.find_hand_root('R'), 'R', bar)
+            # Called directly, since frame_set only prints what a handler raises
+            handrig.live_grip_update(scene)
+            assert (armature.name, 'L') in handrig.live_grips
+            session = handrig.grip_sessions[bar.name][1]
+            assert left.key() in session.solvers
+            assert left.stamp == handrig.mesh_stamp(bar)
+
+            # And an edit while both are live drops what was solved on the old mesh
+            scene.frame_set(2)
+            stale = left.input_key(left.hand_matrix(), left.amounts())
+            assert left.cache.get(stale) is not None
+            bar.data.vertices[0].co.z -= 0.01
+            handrig.live_grip_update(scene)
+            assert left.cache.get(stale) is None
+            assert handrig.grip_sessions[bar.name][1] is not session
+            assert all(hand in handrig.live_grips for hand in ((armature.name, 'L'), (armature.name, 'R')))
+    finally:
+        for side in "LR":
+            solver = handrig.live_grips.pop((armature.name, side), None)
+            if solver is not None:
+                solver.release()
+        bpy.data.objects.remove(armature)
+        bpy.data.objects.remove(bar)
+
+
+def test_bake_after_a_prop_edit_leaves_live_hands_running(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature, bar = live_rig(bpy, api, regress)
+    scene = bpy.context.scene
+    try:
+        with api.armature_context(armature):
+            handrig.toggle_live_grip(handrig.find_hand_root('L'), 'L', bar)
+            scene.frame_set(1)
+            bar.data.vertices[0].co.z += 0.01
+            api.bake(armature, 'R', 1, 3)
+            handrig.live_grip_update(scene)
+            assert (armature.name, 'L') in handrig.live_grips
+            assert np.isfinite(handrig.live_grips[(armature.name, 'L')].solve()).all()
+    finally:
+        solver = handrig.live_grips.pop((armature.name, 'L'), None)
+        if solver is not None:
+            solver.release()
+        bpy.data.objects.remove(armature)
+        bpy.data.objects.remove(bar)
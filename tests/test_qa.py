@@ -0,0 +1,30 @@
+import numpy as np
+
+from core import contact
+
+
+def sphere(count, radius):
+
+    # Evenly spread points on a sphere, with their normals
+
+    k = np.arange(count) + 0.5
+    z = 1.0 - 2.0 * k / count
+    ring = np.sqrt(1.0 - z * z)
+    theta = np.pi * (1.0 + 5.0 ** 0.5) * k
+    normals = np.stack([ring * np.cos(theta), ring * np.sin(theta), z], axis=1)
+    return normals * radius, normals
+
+
+def test_on_surface_points_pass_qa():
+
+    # The same grid qa_report builds, on a dense prop: points lying on the
+    # surface have to stay inside the default 0.5 mm penetration threshold
+
+    verts, normals = sphere(200000, 0.05)
+    grid = contact.SurfaceGrid(verts, normals, cell_size=4.0 * 0.005, resolution=0.0)
+    assert len(grid.verts) == len(verts)
+
+    directions = np.random.default_rng(0).normal(size=(500, 3))
+    directions /= np.linalg.norm(directions, axis=1, keepdims=True)
+    distance = grid.signed_distance(directions * 0.05)
+    assert np.all(np.abs(distance) < 0.0005)
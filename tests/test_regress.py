@@ -0,0 +1,30 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from core import rigs
+
+
+golden_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "golden")
+
+
+@pytest.mark.parametrize("rig_type", list(rigs.dictionaries))
+def test_golden_pose_for_every_rig(rig_type):
+    with open(os.path.join(golden_dir, rig_type + ".json")) as f:
+        golden = json.load(f)
+
+    assert golden['rig'] == rig_type
+    names = [name for phalanges in rigs.dictionaries[rig_type].values() for name in phalanges]
+    assert sorted(golden['bones']) == sorted(names)
+    matrices = np.array(list(golden['bones'].values()))
+    assert matrices.shape == (len(names), 16)
+    assert np.all(np.isfinite(matrices))
+
+
+def test_grips_match_golden_poses(addon):
+    from autogrip import regress
+
+    # Poses only; timing budgets are for headless regress on a known machine
+    assert regress.run(budget_scale=None) == {rig_type: [] for rig_type in rigs.dictionaries}
@@ -0,0 +1,36 @@
+def test_schedule_follows_proxy_toggle_and_reset(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature = regress.build_rig('RFY')
+    bar = regress.build_bar('RFY')
+    scene = bpy.context.scene
+    key = (armature.name, 'L')
+    proxy = None
+    try:
+        api.setup(armature, "L")
+        with api.armature_context(armature):
+            handrig.schedule_hand_target('L', bar, 1, 10)
+
+            def target_on(frame):
+                scene.frame_set(frame)
+                wrap = armature.pose.bones[handrig.scheduled_hands[key][2][0]].constraints
+                return [c.target for c in wrap if 'hrinkwrap' in c.name][0]
+
+            armature.autogrip_use_proxy = True
+            proxy = handrig.grip_proxy(bar)
+            scene.frame_set(20)
+            assert target_on(5) == proxy
+
+            armature.autogrip_use_proxy = False
+            scene.frame_set(20)
+            assert target_on(5) == bar
+
+            handrig.reset_hand(handrig.find_hand_root('L'))
+            assert key not in handrig.scheduled_hands
+            assert not handrig.hand_status(armature)['L']['scheduled']
+    finally:
+        handrig.scheduled_hands.pop(key, None)
+        for thing in (armature, bar, proxy):
+            if thing is not None:
+                bpy.data.objects.remove(thing)
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def test_baked_rotations_read_off_the_fcurves_match_the_scene(addon):
+    import bpy
+    import mathutils
+    from autogrip import api, handrig, regress
+
+    armature = regress.build_rig('RFY')
+    scene = bpy.context.scene
+    try:
+        with api.armature_context(armature):
+            mapping = handrig.hand_mapping(armature, 'L')
+            names = [name for name in mapping.phalange_names if name in armature.pose.bones]
+            bones = [armature.pose.bones[name] for name in names]
+            modes = ['QUATERNION', 'XYZ', 'ZXY', 'AXIS_ANGLE']
+            for k, bone in enumerate(bones):
+                bone.rotation_mode = modes[k % len(modes)]
+                # The last bone's left unkeyed, so it has to come off the scene
+                if k == len(bones) - 1:
+                    continue
+                for frame, angle in ((1, 0.0), (7, 0.4 + 0.05 * k), (20, 1.1)):
+                    rotation = mathutils.Quaternion((1.0, 0.0, 0.0), angle)
+                    handrig.set_bone_rotation(bone, rotation)
+                    bone.keyframe_insert(handrig.rotation_channels.get(
+                        bone.rotation_mode, ('rotation_euler', 3))[0], frame=frame)
+            # Half the keyed curves linear, so both ways of reading them are used
+            for n, fcurve in enumerate(armature.animation_data.action.fcurves):
+                if n % 2:
+                    for point in fcurve.keyframe_points:
+                        point.interpolation = 'LINEAR'
+
+            frames = list(range(0, 23))
+            _, (read,) = handrig.read_rotations(armature, [mapping], frames)
+
+            rows = [list(mapping.phalange_names).index(name) for name in names]
+            for k, frame in enumerate(frames):
+                scene.frame_set(frame)
+                expected = np.array([tuple(handrig.bone_rotation(bone)) for bone in bones])
+                assert np.allclose(read[k, rows], expected, atol=1e-5)
+    finally:
+        bpy.data.objects.remove(armature)
@@ -0,0 +1,33 @@
+import pytest
+
+
+@pytest.mark.parametrize("proxy", [False, True])
+def test_grip_target_only_takes_a_mesh(addon, proxy):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature = regress.build_rig('RFY')
+    bar = regress.build_bar('RFY')
+    empty = bpy.data.objects.new("AutoGrip_test_empty", None)
+    bpy.context.scene.collection.objects.link(empty)
+    try:
+        api.setup(armature, "L")
+        with api.armature_context(armature):
+            armature.autogrip_use_proxy = proxy
+            for other in bpy.context.selected_objects:
+                other.select_set(other == armature)
+            with pytest.raises(RuntimeError, match="Select a mesh"):
+                bpy.ops.object.autogrip_target_l()
+
+            # An empty picked up along with the prop is passed over
+            empty.select_set(True)
+            bar.select_set(True)
+            assert bpy.ops.object.autogrip_target_l() == {'FINISHED'}
+            fingers = handrig.assemble_hand(handrig.find_hand_root('L'))
+            for finger in fingers:
+                finger.reconstruct()
+            target = handrig.hand_target(fingers)
+            assert target is not None and target.type == 'MESH'
+    finally:
+        for thing in (armature, bar, empty):
+            bpy.data.objects.remove(thing)
@@ -0,0 +1,70 @@
+import numpy as np
+
+
+def test_undo_autogrip_takes_back_exactly_one_setup(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature = regress.build_rig('RFY')
+    try:
+        with api.armature_context(armature):
+            armature.autogrip_light_undo = True
+            bpy.ops.object.autogrip_setup_left()
+            before = handrig.autogrip_state()
+
+            bpy.ops.object.autogrip_setup_right()
+            assert len(handrig.logged_steps(armature)) == 2
+            bpy.ops.object.autogrip_undo()
+            after = handrig.autogrip_state()
+
+            # Only the right hand's setup came off; the left's is still logged
+            assert len(handrig.logged_steps(armature)) == 1
+            assert after['bones'] == before['bones']
+            assert after['constraints'] == before['constraints']
+            assert after['drivers'] == before['drivers']
+            assert after['flags'] == before['flags']
+            for channel, values in before['channels'].items():
+                assert np.array_equal(after['channels'][channel], values)
+    finally:
+        bpy.data.objects.remove(armature)
+
+
+def test_steps_taken_back_by_file_undo_are_not_offered(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature = regress.build_rig('RFY')
+    try:
+        with api.armature_context(armature):
+            armature.autogrip_light_undo = True
+            bpy.ops.object.autogrip_setup_left()
+            assert len(handrig.logged_steps(armature)) == 1
+
+            # What Ctrl+Z does to the serial stored on the armature
+            armature.data[handrig.prefix + 'undo_serial'] -= 1
+            assert not handrig.logged_steps(armature)
+            assert not bpy.ops.object.autogrip_undo.poll()
+    finally:
+        bpy.data.objects.remove(armature)
+
+
+def test_renaming_the_armature_keeps_its_steps(addon):
+    import bpy
+    from autogrip import api, handrig, regress
+
+    armature = regress.build_rig('RFY')
+    try:
+        with api.armature_context(armature):
+            assert not armature.autogrip_light_undo
+            bpy.ops.object.autogrip_setup_left()
+            assert not handrig.logged_steps(armature)
+
+            armature.autogrip_light_undo = True
+            bpy.ops.object.autogrip_setup_right()
+            armature.name = "Renamed"
+            assert len(handrig.logged_steps(armature)) == 1
+            assert bpy.ops.object.autogrip_undo() == {'FINISHED'}
+            assert not armature.data.get(handrig.prefix + 'hand_R')
+            assert armature.data.get(handrig.prefix + 'hand_L')
+    finally:
+        bpy.data.objects.remove(armature)